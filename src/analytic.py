@@ -0,0 +1,165 @@
+"""
+Analytical (quadratic) initial placement. Requires NumPy.
+Nets are modelled as springs: nets of up to CLIQUE_MAX_PINS cells as cliques with weight 1/(k-1) per pair, larger
+nets as stars around an extra movable node. Minimizing the total squared spring length alone would pull every cell
+onto one point, so every cell is also tied to an anchor. Anchors start at a random legal placement with a weak pull.
+Each round solves the quadratic problem in x and y by preconditioned conjugate gradients, then spreads the solution
+onto the grid, keeping the cells' relative order. The next round anchors the cells to that legal placement, pulling
+harder. The legal placement with the lowest HPWL is returned.
+"""
+
+import numpy as np
+
+import netlist
+
+CLIQUE_MAX_PINS = 16  # Nets with more cells are modelled as stars, keeping the number of springs linear
+NUM_ROUNDS = 20  # Number of solve and spread rounds
+ANCHOR_WEIGHT = 0.01  # Pull of the anchors in the first round, relative to a two-cell net
+ANCHOR_GROWTH = 1.3  # Factor the anchor pull grows by each round
+CG_MAX_ITERS = 200  # Most conjugate gradient iterations per solve
+CG_TOLERANCE = 1e-4  # Stop once the residual falls below this fraction of the right-hand side
+
+
+def get_springs(circuit: netlist.Netlist) -> (np.ndarray, np.ndarray, np.ndarray, int):
+    """
+    Build the springs of the net model
+    :param circuit: Parsed netlist
+    :return: (ndarray, ndarray, ndarray, int) - first node, second node and weight of each spring, number of nodes
+             (cells, then one star node per large net)
+    """
+    first = []
+    second = []
+    weight = []
+    num_nodes = circuit.num_cells
+    net_start = circuit.net_start
+    net_pins = circuit.net_pins
+    for net in range(circuit.num_nets):
+        cells = sorted(set(net_pins[net_start[net]:net_start[net+1]]))
+        num_pins = len(cells)
+        if num_pins < 2:
+            continue
+        if num_pins <= CLIQUE_MAX_PINS:
+            pair_weight = 1/(num_pins-1)
+            for i in range(num_pins):
+                for j in range(i+1, num_pins):
+                    first.append(cells[i])
+                    second.append(cells[j])
+                    weight.append(pair_weight)
+        else:
+            # A star with weight k/(k-1) per spring has the same stiffness as the clique
+            star = num_nodes
+            num_nodes += 1
+            star_weight = num_pins/(num_pins-1)
+            for cell in cells:
+                first.append(cell)
+                second.append(star)
+                weight.append(star_weight)
+    return np.array(first, dtype=np.int64), np.array(second, dtype=np.int64), np.array(weight), num_nodes
+
+
+def solve(first: np.ndarray, second: np.ndarray, weight: np.ndarray, anchor_weight: np.ndarray,
+          anchor: np.ndarray, guess: np.ndarray) -> np.ndarray:
+    """
+    Minimize sum(weight*(v[first]-v[second])^2) + sum(anchor_weight*(v-anchor)^2) by Jacobi-preconditioned conjugate
+    gradients
+    :param anchor_weight: Pull of each node's anchor, zero for star nodes
+    :param anchor: Anchor location of each node
+    :param guess: Starting point
+    :return: ndarray - Location of each node
+    """
+    num_nodes = len(anchor)
+    diagonal = np.bincount(first, weight, num_nodes) + np.bincount(second, weight, num_nodes) + anchor_weight
+
+    def multiply(v):
+        return diagonal*v - np.bincount(first, weight*v[second], num_nodes) - \
+            np.bincount(second, weight*v[first], num_nodes)
+
+    rhs = anchor_weight*anchor
+    v = guess.copy()
+    residual = rhs - multiply(v)
+    preconditioned = residual/diagonal
+    direction = preconditioned.copy()
+    rho = residual @ preconditioned
+    limit = CG_TOLERANCE * np.linalg.norm(rhs)
+    for _ in range(CG_MAX_ITERS):
+        if np.linalg.norm(residual) <= limit:
+            break
+        product = multiply(direction)
+        step = rho/(direction @ product)
+        v += step*direction
+        residual -= step*product
+        preconditioned = residual/diagonal
+        new_rho = residual @ preconditioned
+        direction = preconditioned + (new_rho/rho)*direction
+        rho = new_rho
+    return v
+
+
+def spread(x: np.ndarray, y: np.ndarray, grid_width: int, grid_height: int) -> (np.ndarray, np.ndarray):
+    """
+    Legalize a placement by rank: cells are split into equal columns in order of x, then spread evenly down each
+    column in order of y. One cell per site, relative order preserved.
+    :return: (ndarray, ndarray) - Legal x and y of each cell
+    """
+    num_cells = len(x)
+    legal_x = np.empty(num_cells, dtype=np.int64)
+    legal_y = np.empty(num_cells, dtype=np.int64)
+    by_x = np.argsort(x, kind="stable")
+    bounds = (np.arange(grid_width+1)*num_cells) // grid_width
+    for column in range(grid_width):
+        cells = by_x[bounds[column]:bounds[column+1]]
+        if len(cells) == 0:
+            continue
+        cells = cells[np.argsort(y[cells], kind="stable")]
+        legal_x[cells] = column
+        legal_y[cells] = ((2*np.arange(len(cells)) + 1)*grid_height) // (2*len(cells))
+    return legal_x, legal_y
+
+
+def get_hpwl(circuit: netlist.Netlist, x: np.ndarray, y: np.ndarray) -> int:
+    """
+    :return: int - Total HPWL of a placement, with vertical spans counted twice as in the annealer
+    """
+    net_start = np.asarray(circuit.net_start, dtype=np.int64)
+    net_pins = np.asarray(circuit.net_pins, dtype=np.int64)
+    starts = net_start[:-1][net_start[1:] > net_start[:-1]]  # Nets without pins cost nothing
+    pin_x = x[net_pins]
+    pin_y = y[net_pins]
+    return int((np.maximum.reduceat(pin_x, starts) - np.minimum.reduceat(pin_x, starts)).sum() +
+               2*(np.maximum.reduceat(pin_y, starts) - np.minimum.reduceat(pin_y, starts)).sum())
+
+
+def quadratic_placement(circuit: netlist.Netlist, start: list) -> list:
+    """
+    Find a legal placement minimizing quadratic wirelength
+    :param circuit: Parsed netlist
+    :param start: list[(int, int)] - Legal placement the first round's anchors are taken from, indexed by cell ID
+    :return: list[(int, int)] - x,y of each cell, indexed by cell ID
+    """
+    num_cells = circuit.num_cells
+    first, second, weight, num_nodes = get_springs(circuit)
+    start_arr = np.array(start, dtype=np.int64).reshape(num_cells, 2)
+    legal_x = start_arr[:, 0]
+    legal_y = start_arr[:, 1]
+    best_cost = get_hpwl(circuit, legal_x, legal_y)
+    best_x = legal_x
+    best_y = legal_y
+
+    anchor_weight = np.zeros(num_nodes)
+    x = np.full(num_nodes, (circuit.grid_width-1)/2)
+    y = np.full(num_nodes, (circuit.grid_height-1)/2)
+    for round_num in range(NUM_ROUNDS):
+        anchor_weight[:num_cells] = ANCHOR_WEIGHT * ANCHOR_GROWTH**round_num
+        anchor_x = np.zeros(num_nodes)
+        anchor_y = np.zeros(num_nodes)
+        anchor_x[:num_cells] = legal_x
+        anchor_y[:num_cells] = legal_y
+        x = solve(first, second, weight, anchor_weight, anchor_x, x)
+        y = solve(first, second, weight, anchor_weight, anchor_y, y)
+        legal_x, legal_y = spread(x[:num_cells], y[:num_cells], circuit.grid_width, circuit.grid_height)
+        cost = get_hpwl(circuit, legal_x, legal_y)
+        if cost < best_cost:
+            best_cost = cost
+            best_x = legal_x
+            best_y = legal_y
+    return list(zip(best_x.tolist(), best_y.tolist()))
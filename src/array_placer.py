@@ -0,0 +1,576 @@
+"""
+Array-backed Simulated Annealing placement engine.
+Cell positions live in flat integer lists indexed by cell ID, nets are stored as CSR-style pin index arrays
+and the placement grid is a flat occupancy array, avoiding object attribute chains and dict lookups per move.
+Uses the same random number stream as the object engine, so a given seed produces the same placement.
+"""
+
+from itertools import chain
+from math import exp, ceil
+
+import netlist
+from sim_anneal import Placer, COST_TRANSITION_RATIO
+
+ACCEPTANCE_TABLE_RANGE = 37  # Tabulate deltas up to this multiple of the temperature, past it exp(-delta/T) < 2^-53
+ACCEPTANCE_TABLE_MAX_SIZE = 4096  # Largest acceptance table, larger deltas fall back to exp()
+
+
+class ArrayPlacer(Placer):
+    """
+    A Simulated Annealing placer whose netlist and placement are stored in flat integer arrays.
+    Cells are referred to by integer ID rather than by Cell object. Headless only.
+    """
+    engine = "array"  # Name of the annealing engine, see sim_anneal.get_placer_class
+
+    def __init__(self, *args, **kwargs):
+        self.net_start = [0]  # Index into net_pins of each net's first pin, plus a final end index
+        self.net_pins = []  # Cell ID of every pin, net by net, source first
+        self.cell_net_start = [0]  # Index into cell_nets of each cell's first net, plus a final end index
+        self.cell_nets = []  # Net ID of every net of every cell, cell by cell
+        self.cell_net_lists = []  # Net IDs of each cell as a list per cell, to avoid slicing cell_nets
+        self.cell_x = []  # x location of each cell, -1 if unplaced
+        self.cell_y = []  # y location of each cell, -1 if unplaced
+        self.site_occupant = []  # Cell ID occupying each site (row-major, y*width+x), -1 if empty
+        # Cached bounding box of each net, kept up to date incrementally as cells move
+        self.net_cost = []  # HPWL of each net
+        self.net_min_x = []  # Leftmost pin x location of each net
+        self.net_max_x = []  # Rightmost pin x location of each net
+        self.net_min_y = []  # Highest pin y location of each net
+        self.net_max_y = []  # Lowest pin y location of each net
+        self.net_num_min_x = []  # Number of pins on the left edge of each net
+        self.net_num_max_x = []  # Number of pins on the right edge of each net
+        self.net_num_min_y = []  # Number of pins on the top edge of each net
+        self.net_num_max_y = []  # Number of pins on the bottom edge of each net
+        self.net_stamp = []  # Per-net marker used to find nets shared by both cells of a swap
+        self.stamp = 0  # Current marker value
+        # Acceptance probability of each integer cost increase at the current temperature
+        self.acceptance_table = []  # exp(-delta/T) indexed by delta
+        self.acceptance_table_temp = None  # Temperature the table was built for
+        super().__init__(*args, **kwargs)
+
+    def create_placement_grid(self, circuit: netlist.Netlist) -> list[int]:
+        """
+        Create the flat placement grid and the netlist arrays
+        :param circuit: Parsed netlist
+        :return: list[int] - Site occupancy array
+        """
+        # Create the routing grid
+        self.num_cells_to_place = circuit.num_cells
+        self.num_cell_connections = circuit.num_declared_nets
+        self.grid_height = circuit.grid_height
+        self.grid_width = circuit.grid_width
+        if self.grid_height >= self.grid_width:
+            self.half_grid_max_dim = ceil(self.grid_height/2)
+        else:
+            self.half_grid_max_dim = ceil(self.grid_width/2)
+        self.range_window_half_length = self.half_grid_max_dim
+        self.site_occupant = [-1] * (self.grid_width*self.grid_height)
+        self.cell_x = [-1] * self.num_cells_to_place
+        self.cell_y = [-1] * self.num_cells_to_place
+
+        # Copy the netlist arrays into lists, which are faster to index
+        self.num_nets = circuit.num_nets
+        self.net_start = circuit.net_start.tolist()
+        self.net_pins = circuit.net_pins.tolist()
+        cell_net_start, cell_nets = circuit.get_cell_nets()
+        self.cell_net_start = cell_net_start.tolist()
+        self.cell_nets = cell_nets.tolist()
+        self.cell_net_lists = [self.cell_nets[self.cell_net_start[cell]:self.cell_net_start[cell+1]]
+                               for cell in range(self.num_cells_to_place)]
+        self.net_cost = [0] * self.num_nets
+        self.net_min_x = [0] * self.num_nets
+        self.net_max_x = [0] * self.num_nets
+        self.net_min_y = [0] * self.num_nets
+        self.net_max_y = [0] * self.num_nets
+        self.net_num_min_x = [0] * self.num_nets
+        self.net_num_max_x = [0] * self.num_nets
+        self.net_num_min_y = [0] * self.num_nets
+        self.net_num_max_y = [0] * self.num_nets
+        self.net_stamp = [0] * self.num_nets
+
+        return self.site_occupant
+
+    def place_cells(self, free_sites: list):
+        """
+        Place every cell into sites popped from a list of free sites: net by net, source first, then any cells on no
+        net in order of cell ID
+        :param free_sites: list[(int, int)] - Coordinates of unoccupied sites
+        """
+        cell_x = self.cell_x
+        cell_y = self.cell_y
+        for cell in chain(self.net_pins, range(self.num_cells_to_place)):
+            if cell_x[cell] < 0:
+                place_x, place_y = free_sites.pop()
+                cell_x[cell] = place_x
+                cell_y[cell] = place_y
+                self.site_occupant[place_y*self.grid_width + place_x] = cell
+
+    def get_occupant(self, x: int, y: int):
+        """
+        Get the cell occupying a site
+        :return: int - ID of the occupant, or None if the site is empty
+        """
+        occupant = self.site_occupant[y*self.grid_width + x]
+        if occupant < 0:
+            return None
+        return occupant
+
+    def get_placement(self) -> list:
+        """
+        Get the current location of every cell
+        :return: list[(int, int)] - x,y of each cell, indexed by cell ID
+        """
+        return list(zip(self.cell_x, self.cell_y))
+
+    def set_placement(self, placement: list):
+        """
+        Move every cell to a given location and recalculate the cost from scratch
+        :param placement: list[(int, int)] - x,y of each cell, indexed by cell ID
+        """
+        grid_width = self.grid_width
+        site_occupant = [-1] * (grid_width*self.grid_height)
+        for cell, (x, y) in enumerate(placement):
+            self.cell_x[cell] = x
+            self.cell_y[cell] = y
+            site_occupant[y*grid_width + x] = cell
+        self.site_occupant = site_occupant
+        self.current_cost = self.calculate_total_cost()
+
+    def net_hpwl(self, net: int) -> int:
+        """
+        Calculate the Half-Perimeter Wire Length of a net
+        :param net: ID of net to calculate HPWL for
+        :return: int - HPWL
+        """
+        cell_x = self.cell_x
+        cell_y = self.cell_y
+        pins = self.net_pins[self.net_start[net]:self.net_start[net+1]]
+        leftmost_x = rightmost_x = cell_x[pins[0]]
+        highest_y = lowest_y = cell_y[pins[0]]
+        for pin in pins:
+            pin_x = cell_x[pin]
+            pin_y = cell_y[pin]
+            if pin_x < leftmost_x:
+                leftmost_x = pin_x
+            elif pin_x > rightmost_x:
+                rightmost_x = pin_x
+            if pin_y > lowest_y:  # Recall that y values increase going "down" the grid
+                lowest_y = pin_y
+            elif pin_y < highest_y:
+                highest_y = pin_y
+        return (rightmost_x-leftmost_x) + 2*(lowest_y-highest_y)
+
+    def calculate_total_cost(self):
+        """
+        Calculate, from scratch, the total estimated cost of the circuit as currently placed.
+        Estimation done with HPWL
+        :return: float - HPWL cost for all nets
+        """
+        total_cost = 0
+        for net in range(self.num_nets):
+            self.reset_net_bounds(net)
+            total_cost += self.net_cost[net]
+        return float(total_cost)
+
+    def reset_net_bounds(self, net: int):
+        """
+        Recalculate a net's cached bounding box, edge pin counts and HPWL from scratch
+        :param net: ID of net to rescan
+        """
+        pins = self.net_pins[self.net_start[net]:self.net_start[net+1]]
+        pin_x = [self.cell_x[cell] for cell in pins]
+        pin_y = [self.cell_y[cell] for cell in pins]
+        min_x = self.net_min_x[net] = min(pin_x)
+        max_x = self.net_max_x[net] = max(pin_x)
+        min_y = self.net_min_y[net] = min(pin_y)
+        max_y = self.net_max_y[net] = max(pin_y)
+        self.net_num_min_x[net] = pin_x.count(min_x)
+        self.net_num_max_x[net] = pin_x.count(max_x)
+        self.net_num_min_y[net] = pin_y.count(min_y)
+        self.net_num_max_y[net] = pin_y.count(max_y)
+        self.net_cost[net] = (max_x-min_x) + 2*(max_y-min_y)
+
+    def shift_net_bounds(self, net: int, old_x: int, old_y: int, new_x: int, new_y: int):
+        """
+        Update a net's cached bounding box after one of its pins has moved.
+        Only rescans the net if the pin was alone on an edge and moved inward.
+        :param net: ID of net whose pin moved
+        """
+        min_x = self.net_min_x[net]
+        max_x = self.net_max_x[net]
+        min_y = self.net_min_y[net]
+        max_y = self.net_max_y[net]
+        num_min_x = self.net_num_min_x[net]
+        num_max_x = self.net_num_max_x[net]
+        num_min_y = self.net_num_min_y[net]
+        num_max_y = self.net_num_max_y[net]
+
+        # Remove the pin from its old location
+        if old_x == min_x:
+            num_min_x -= 1
+        if old_x == max_x:
+            num_max_x -= 1
+        if old_y == min_y:
+            num_min_y -= 1
+        if old_y == max_y:
+            num_max_y -= 1
+
+        # Add the pin at its new location
+        if new_x < min_x:
+            min_x = new_x
+            num_min_x = 1
+        elif new_x == min_x:
+            num_min_x += 1
+        if new_x > max_x:
+            max_x = new_x
+            num_max_x = 1
+        elif new_x == max_x:
+            num_max_x += 1
+        if new_y < min_y:
+            min_y = new_y
+            num_min_y = 1
+        elif new_y == min_y:
+            num_min_y += 1
+        if new_y > max_y:
+            max_y = new_y
+            num_max_y = 1
+        elif new_y == max_y:
+            num_max_y += 1
+
+        # An edge with no pins left has moved inward by an unknown amount
+        if num_min_x == 0 or num_max_x == 0 or num_min_y == 0 or num_max_y == 0:
+            self.reset_net_bounds(net)
+        else:
+            self.net_min_x[net] = min_x
+            self.net_max_x[net] = max_x
+            self.net_min_y[net] = min_y
+            self.net_max_y[net] = max_y
+            self.net_num_min_x[net] = num_min_x
+            self.net_num_max_x[net] = num_max_x
+            self.net_num_min_y[net] = num_min_y
+            self.net_num_max_y[net] = num_max_y
+            self.net_cost[net] = (max_x-min_x) + 2*(max_y-min_y)
+
+    def get_nets_delta(self, nets: list[int], cell: int, new_x: int, new_y: int, shared=-1) -> int:
+        """
+        Calculate the cost difference of a set of nets if one of their cells moved, using their cached bounding boxes.
+        A net is only rescanned if the cell is alone on one of its edges and would move inward.
+        :param nets: IDs of nets containing the cell
+        :param cell: ID of cell to move
+        :param shared: Stamp of nets to leave out, see mark_shared_nets
+        :return: int - The cost difference summed over the nets
+        """
+        net_stamp = self.net_stamp
+        net_cost = self.net_cost
+        net_min_x = self.net_min_x
+        net_max_x = self.net_max_x
+        net_min_y = self.net_min_y
+        net_max_y = self.net_max_y
+        net_num_min_x = self.net_num_min_x
+        net_num_max_x = self.net_num_max_x
+        net_num_min_y = self.net_num_min_y
+        net_num_max_y = self.net_num_max_y
+        old_x = self.cell_x[cell]
+        old_y = self.cell_y[cell]
+
+        delta = 0
+        for net in nets:
+            if net_stamp[net] == shared:
+                continue
+            min_x = net_min_x[net]
+            max_x = net_max_x[net]
+            min_y = net_min_y[net]
+            max_y = net_max_y[net]
+            if (old_x == min_x and net_num_min_x[net] == 1 and new_x > min_x) or \
+                    (old_x == max_x and net_num_max_x[net] == 1 and new_x < max_x) or \
+                    (old_y == min_y and net_num_min_y[net] == 1 and new_y > min_y) or \
+                    (old_y == max_y and net_num_max_y[net] == 1 and new_y < max_y):
+                # Edge pin moving inward, rescan with the cell temporarily moved
+                self.cell_x[cell] = new_x
+                self.cell_y[cell] = new_y
+                delta += self.net_hpwl(net) - net_cost[net]
+                self.cell_x[cell] = old_x
+                self.cell_y[cell] = old_y
+                continue
+
+            if new_x < min_x:
+                min_x = new_x
+            elif new_x > max_x:
+                max_x = new_x
+            if new_y < min_y:
+                min_y = new_y
+            elif new_y > max_y:
+                max_y = new_y
+            delta += (max_x-min_x) + 2*(max_y-min_y) - net_cost[net]
+        return delta
+
+    def sa_step(self):
+        """
+        Perform a single iteration of SA
+        :return: void
+        """
+        # Choose move randomly
+        if self.prev_temp_cost_ratio < COST_TRANSITION_RATIO:
+            cell_a, target_x, target_y = self.pick_ranged_move()
+        else:
+            cell_a, target_x, target_y = self.pick_random_move()
+
+        # Check if target site is occupied by a cell
+        cell_b = self.site_occupant[target_y*self.grid_width + target_x]
+        if cell_b >= 0:
+            delta = self.get_swap_delta(cell_a, cell_b)
+        else:
+            delta = self.get_move_delta(cell_a, target_x, target_y)
+
+        # Check if move will be taken, improving moves are always taken without drawing a random number.
+        # Thresholds -T*ln(u) drawn in bulk per temperature would need their own random stream, which would break
+        # parity with the object engine, and were no faster than the table here. The batch engine uses them.
+        if delta <= 0:
+            accept = True
+        else:
+            table = self.acceptance_table
+            if self.acceptance_table_temp != self.sa_temp:
+                table = self.get_acceptance_table()
+            if delta < len(table):
+                accept = self.rng.random() < table[delta]
+            else:
+                accept = self.rng.random() < exp(-1*delta/self.sa_temp)
+        if accept:
+            self.acceptances_this_temp += 1
+            if cell_b >= 0:
+                self.swap(cell_a, cell_b, delta)
+            else:
+                self.move(cell_a, target_x, target_y, delta)
+
+        # Check for temperature update
+        self.iters_this_temp += 1
+        if self.iters_this_temp >= self.iters_per_temp:
+            self.update_temperature()
+
+    def get_acceptance_table(self) -> list[float]:
+        """
+        Get the acceptance probability exp(-delta/T) of each integer cost increase at the current temperature,
+        rebuilding the table whenever the temperature has changed since it was last built.
+        Costs are integers (HPWL with integer weights), so looking up the table makes the same decisions as exp().
+        :return: list[float] - Acceptance probability indexed by delta, deltas past the end need exp()
+        """
+        if self.acceptance_table_temp != self.sa_temp:
+            sa_temp = self.sa_temp
+            size = min(ceil(ACCEPTANCE_TABLE_RANGE*sa_temp) + 1, ACCEPTANCE_TABLE_MAX_SIZE)
+            self.acceptance_table = [exp(-1*delta/sa_temp) for delta in range(size)]
+            self.acceptance_table_temp = sa_temp
+        return self.acceptance_table
+
+    def get_cell(self, cell_id: int) -> int:
+        """
+        :return: int - The cell with a given ID, which is the ID itself
+        """
+        return cell_id
+
+    def get_cell_id(self, cell: int) -> int:
+        """
+        :return: int - The ID of a cell, which is the cell itself
+        """
+        return cell
+
+    def get_cell_location(self, cell: int) -> (int, int):
+        """
+        :return: (int, int) - x,y of the cell
+        """
+        return self.cell_x[cell], self.cell_y[cell]
+
+    def get_net_bounds_without(self, cell: int) -> list:
+        """
+        Get the bounding box of each of a cell's nets as if the cell were not part of it, skipping nets of one cell.
+        The cached bounding box is used unless the cell is alone on one of its edges.
+        :return: list[(int, int, int, int)] - min_x, max_x, min_y, max_y of each net
+        """
+        cell_x = self.cell_x
+        cell_y = self.cell_y
+        x = cell_x[cell]
+        y = cell_y[cell]
+        bounds = []
+        for net in self.cell_net_lists[cell]:
+            start = self.net_start[net]
+            end = self.net_start[net+1]
+            if end - start < 2:
+                continue
+            min_x = self.net_min_x[net]
+            max_x = self.net_max_x[net]
+            min_y = self.net_min_y[net]
+            max_y = self.net_max_y[net]
+            if (x != min_x or self.net_num_min_x[net] > 1) and (x != max_x or self.net_num_max_x[net] > 1) and \
+                    (y != min_y or self.net_num_min_y[net] > 1) and (y != max_y or self.net_num_max_y[net] > 1):
+                bounds.append((min_x, max_x, min_y, max_y))
+                continue
+            pins = [pin for pin in self.net_pins[start:end] if pin != cell]
+            pin_x = [cell_x[pin] for pin in pins]
+            pin_y = [cell_y[pin] for pin in pins]
+            bounds.append((min(pin_x), max(pin_x), min(pin_y), max(pin_y)))
+        return bounds
+
+    def get_cell_nets(self, cell: int) -> list[int]:
+        """
+        :return: list[int] - IDs of the nets a cell is part of
+        """
+        return self.cell_net_lists[cell]
+
+    def get_net_cell_ids(self, net: int) -> list[int]:
+        """
+        :return: list[int] - IDs of the cells of a net
+        """
+        return self.net_pins[self.net_start[net]:self.net_start[net+1]]
+
+    def move(self, cell: int, x: int, y: int, delta: float):
+        """
+        Move a cell to an empty site
+        """
+        grid_width = self.grid_width
+        old_x = self.cell_x[cell]
+        old_y = self.cell_y[cell]
+        self.site_occupant[old_y*grid_width + old_x] = -1
+        self.site_occupant[y*grid_width + x] = cell
+        self.cell_x[cell] = x
+        self.cell_y[cell] = y
+
+        # Update cached bounding boxes
+        for net in self.cell_net_lists[cell]:
+            self.shift_net_bounds(net, old_x, old_y, x, y)
+
+        # Update total cost
+        self.current_cost += delta
+
+    def swap(self, cell_a: int, cell_b: int, delta: float):
+        """
+        Swap the locations (occupied sites) of two cells
+        """
+        cell_x = self.cell_x
+        cell_y = self.cell_y
+        grid_width = self.grid_width
+        shared = self.mark_shared_nets(cell_a, cell_b)
+        cell_x[cell_a], cell_x[cell_b] = cell_x[cell_b], cell_x[cell_a]
+        cell_y[cell_a], cell_y[cell_b] = cell_y[cell_b], cell_y[cell_a]
+        a_x = cell_x[cell_a]
+        a_y = cell_y[cell_a]
+        b_x = cell_x[cell_b]
+        b_y = cell_y[cell_b]
+        self.site_occupant[a_y*grid_width + a_x] = cell_a
+        self.site_occupant[b_y*grid_width + b_x] = cell_b
+
+        # Update cached bounding boxes, nets shared by both cells keep the same pin locations
+        net_stamp = self.net_stamp
+        for net in self.cell_net_lists[cell_a]:
+            if net_stamp[net] != shared:
+                self.shift_net_bounds(net, b_x, b_y, a_x, a_y)
+        for net in self.cell_net_lists[cell_b]:
+            if net_stamp[net] != shared:
+                self.shift_net_bounds(net, a_x, a_y, b_x, b_y)
+
+        # Update total cost
+        self.current_cost += delta
+
+    def get_move_delta(self, cell: int, x: int, y: int) -> int:
+        """
+        Calculate the cost difference that would be incurred by moving a cell to an unoccupied site
+        :return: int - The cost difference
+        """
+        return self.get_nets_delta(self.cell_net_lists[cell], cell, x, y)
+
+    def get_swap_delta(self, cell_a: int, cell_b: int) -> int:
+        """
+        Calculate the cost difference that would be incurred by swapping two cells
+        :return: int - The cost difference
+        """
+        shared = self.mark_shared_nets(cell_a, cell_b)
+        a_delta = self.get_nets_delta(self.cell_net_lists[cell_a], cell_a, self.cell_x[cell_b], self.cell_y[cell_b],
+                                      shared)
+        b_delta = self.get_nets_delta(self.cell_net_lists[cell_b], cell_b, self.cell_x[cell_a], self.cell_y[cell_a],
+                                      shared)
+        return a_delta + b_delta
+
+    def get_cell_degree(self, cell: int) -> int:
+        """
+        :return: int - Number of nets a cell is part of
+        """
+        return len(self.cell_net_lists[cell])
+
+    def mark_shared_nets(self, cell_a: int, cell_b: int) -> int:
+        """
+        Stamp the nets of two cells so that nets belonging to both can be recognized in constant time.
+        Nets shared by both cells keep the same set of pin locations after a swap, so they can be left out.
+        :return: int - The stamp carried by every net shared by both cells
+        """
+        net_stamp = self.net_stamp
+        self.stamp += 2
+        in_a = self.stamp - 1
+        shared = self.stamp
+        for net in self.cell_net_lists[cell_a]:
+            net_stamp[net] = in_a
+        for net in self.cell_net_lists[cell_b]:
+            if net_stamp[net] == in_a:
+                net_stamp[net] = shared
+        return shared
+
+    def pick_ranged_move(self):
+        """
+        Pick a random cell and a random spot to move that cell to within a range window.
+        The target is drawn directly from the sites of the window other than the cell's own, so no draw is wasted.
+        :return: (int, int, int) - cell,x,y
+        """
+        draw = self.rng.random
+        half_length = self.range_window_half_length
+        # Get random cell
+        cell = int(draw()*self.num_cells_to_place)
+
+        # Get range window centred around the cell
+        cell_x = self.cell_x[cell]
+        cell_y = self.cell_y[cell]
+        min_x = cell_x - half_length
+        if min_x < 0:
+            min_x = 0
+        max_x = cell_x + half_length
+        if max_x >= self.grid_width:
+            max_x = self.grid_width - 1
+        min_y = cell_y - half_length
+        if min_y < 0:
+            min_y = 0
+        max_y = cell_y + half_length
+        if max_y >= self.grid_height:
+            max_y = self.grid_height - 1
+
+        # Get a random site of the window, skipping over the cell's current location
+        window_width = max_x - min_x + 1
+        site = int(draw()*(window_width*(max_y-min_y+1) - 1))
+        if site >= (cell_y-min_y)*window_width + cell_x-min_x:
+            site += 1
+        return cell, min_x + site % window_width, min_y + site // window_width
+
+    def pick_random_move(self):
+        """
+        Pick a random cell and a random spot to move that cell to, other than its current location
+        :return: (int, int, int) - cell,x,y
+        """
+        # Draws come straight from rng, shared with the object engine, rather than from a pre-drawn buffer of floats,
+        # which costs as much to consume as the calls it replaces
+        draw = self.rng.random
+        grid_width = self.grid_width
+        # Get random cell
+        cell = int(draw()*self.num_cells_to_place)
+
+        # Get a random site of the grid, skipping over the cell's current location
+        site = int(draw()*(grid_width*self.grid_height - 1))
+        if site >= self.cell_y[cell]*grid_width + self.cell_x[cell]:
+            site += 1
+        return cell, site % grid_width, site // grid_width
+
+    def pick_random_cell_pair(self):
+        """
+        Pick a random pair of distinct cells
+        :return: (int, int) - cell IDs
+        """
+        draw = self.rng.random
+        cell_a = int(draw()*self.num_cells_to_place)
+        cell_b = int(draw()*(self.num_cells_to_place - 1))
+        if cell_b >= cell_a:
+            cell_b += 1
+        return cell_a, cell_b
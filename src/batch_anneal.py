@@ -0,0 +1,430 @@
+"""
+Batched Simulated Annealing engine using NumPy.
+Each step draws a block of candidate moves at once, with the semantics of pick_random_move or pick_ranged_move,
+evaluates all of their HPWL deltas against the cached net bounding boxes with vectorized NumPy operations, and
+commits the accepted moves that do not conflict with an earlier accepted move of the block, all at once. Two moves
+conflict if they would move the same cell or fill the same empty site. A move that conflicts is discarded without
+being performed, and does not count as an iteration, so the acceptance rate the schedule sees is not skewed by it.
+Moves that share a net are all evaluated against the bounding boxes from the start of the block, so their acceptance
+decisions can be slightly off, but every net touched by a block is rescanned afterwards, so the tracked cost stays
+exact. check_equivalence compares blocks against the scalar path of the array engine.
+
+While annealing, the placement and bounding boxes live in NumPy arrays, and they are copied back into the lists of
+the array engine at the end of every temperature for the greedy final step, checkpoints and the GUI. Blocks grow
+with the netlist, one move per CELLS_PER_BATCH_MOVE cells, so that conflicts stay rare. Netlists too small for
+blocks of MIN_BATCH_SIZE moves anneal with the scalar path of the array engine, and give the same results as it.
+Requires NumPy.
+"""
+
+import contextlib
+import io
+from math import ceil
+
+import numpy as np
+
+import run_log
+from array_placer import ArrayPlacer
+from sim_anneal import COST_TRANSITION_RATIO, PLOT_NONE
+
+CELLS_PER_BATCH_MOVE = 5  # Netlist cells per move of a block
+MIN_BATCH_SIZE = 64  # Smallest block worth vectorizing, smaller netlists take the scalar path
+MAX_BATCH_SIZE = 4096  # Largest block
+
+
+class BatchPlacer(ArrayPlacer):
+    """
+    An array-backed placer that evaluates and commits candidate moves in vectorized blocks. Headless only.
+    """
+    engine = "batch"  # Name of the annealing engine, see sim_anneal.get_placer_class
+
+    def __init__(self, *args, batch_size=None, **kwargs):
+        """
+        :param batch_size: Number of moves in a block, None to scale it with the netlist
+        """
+        self.batch_size = batch_size  # Number of moves in a block, below MIN_BATCH_SIZE for the scalar path
+        self.np_rng = None  # NumPy random number generator for drawing blocks of moves, seeded like rng
+        # NumPy copies of the netlist arrays
+        self.net_start_arr = None  # Copy of net_start
+        self.net_pins_arr = None  # Copy of net_pins
+        self.cell_net_start_arr = None  # Copy of cell_net_start
+        self.cell_nets_arr = None  # Copy of cell_nets
+        # NumPy copies of the placement and bounding boxes, which blocks update instead of the lists
+        self.cell_xy_arr = None  # x,y of each cell, one row per cell
+        self.site_occupant_arr = None  # Copy of site_occupant
+        self.net_cost_arr = None  # Copy of net_cost
+        self.net_bounds_arr = None  # min x, min y, max x, max y of each net, one row per net
+        self.net_edge_counts_arr = None  # Number of pins on each of those edges of each net, one row per net
+        self.arrays_current = False  # Do the NumPy copies match the lists?
+        self.lists_current = True  # Do the lists match the NumPy copies?
+        super().__init__(*args, **kwargs)
+        self.np_rng = np.random.default_rng(self.seed)
+        if self.batch_size is None:
+            self.batch_size = min(self.num_cells_to_place // CELLS_PER_BATCH_MOVE, MAX_BATCH_SIZE)
+
+    def create_placement_grid(self, circuit) -> list[int]:
+        """
+        Create the flat placement grid and the netlist arrays, along with NumPy copies of the netlist arrays
+        :param circuit: Parsed netlist
+        :return: list[int] - Site occupancy array
+        """
+        site_occupant = super().create_placement_grid(circuit)
+        self.net_start_arr = np.array(self.net_start, dtype=np.int64)
+        self.net_pins_arr = np.array(self.net_pins, dtype=np.int64)
+        self.cell_net_start_arr = np.array(self.cell_net_start, dtype=np.int64)
+        self.cell_nets_arr = np.array(self.cell_nets, dtype=np.int64)
+        return site_occupant
+
+    def copy_lists_to_arrays(self):
+        """
+        Rebuild the NumPy copies of the placement and bounding boxes from the lists
+        """
+        self.cell_xy_arr = np.array([self.cell_x, self.cell_y], dtype=np.int64).T.copy()
+        self.site_occupant_arr = np.array(self.site_occupant, dtype=np.int64)
+        self.net_cost_arr = np.array(self.net_cost, dtype=np.int64)
+        self.net_bounds_arr = np.array([self.net_min_x, self.net_min_y, self.net_max_x, self.net_max_y],
+                                       dtype=np.int64).T.copy()
+        self.net_edge_counts_arr = np.array([self.net_num_min_x, self.net_num_min_y, self.net_num_max_x,
+                                             self.net_num_max_y], dtype=np.int64).T.copy()
+        self.arrays_current = True
+
+    def copy_arrays_to_lists(self):
+        """
+        Bring the lists up to date with the blocks committed since they were last copied
+        """
+        if self.lists_current:
+            return
+        self.cell_x[:] = self.cell_xy_arr[:, 0].tolist()
+        self.cell_y[:] = self.cell_xy_arr[:, 1].tolist()
+        self.site_occupant[:] = self.site_occupant_arr.tolist()
+        self.net_cost[:] = self.net_cost_arr.tolist()
+        for column, bounds, edge_counts in [(0, self.net_min_x, self.net_num_min_x),
+                                            (1, self.net_min_y, self.net_num_min_y),
+                                            (2, self.net_max_x, self.net_num_max_x),
+                                            (3, self.net_max_y, self.net_num_max_y)]:
+            bounds[:] = self.net_bounds_arr[:, column].tolist()
+            edge_counts[:] = self.net_edge_counts_arr[:, column].tolist()
+        self.lists_current = True
+
+    def place_cells(self, free_sites: list):
+        """
+        Place every cell into sites popped from a list of free sites, see ArrayPlacer.place_cells
+        """
+        super().place_cells(free_sites)
+        self.arrays_current = False
+
+    def get_placement(self) -> list:
+        """
+        Get the current location of every cell
+        :return: list[(int, int)] - x,y of each cell, indexed by cell ID
+        """
+        self.copy_arrays_to_lists()
+        return super().get_placement()
+
+    def set_placement(self, placement: list):
+        """
+        Move every cell to a given location and recalculate the cost from scratch
+        :param placement: list[(int, int)] - x,y of each cell, indexed by cell ID
+        """
+        super().set_placement(placement)
+        self.lists_current = True
+        self.arrays_current = False
+
+    def get_state(self) -> dict:
+        """
+        Capture the anneal state, including the NumPy random number generator, see Placer.get_state
+        :return: dict - Anneal state
+        """
+        state = super().get_state()
+        state["np_rng_state"] = self.np_rng.bit_generator.state
+        return state
+
+    def set_state(self, state: dict):
+        """
+        Restore an anneal captured by get_state, see Placer.set_state
+        """
+        super().set_state(state)
+        self.np_rng.bit_generator.state = state["np_rng_state"]
+
+    def move(self, cell: int, x: int, y: int, delta: float):
+        """
+        Move a cell to an empty site with the scalar path, see ArrayPlacer.move
+        """
+        super().move(cell, x, y, delta)
+        self.arrays_current = False
+
+    def swap(self, cell_a: int, cell_b: int, delta: float):
+        """
+        Swap the locations of two cells with the scalar path, see ArrayPlacer.swap
+        """
+        super().swap(cell_a, cell_b, delta)
+        self.arrays_current = False
+
+    def sa_step(self):
+        """
+        Perform one block of SA iterations, never crossing a temperature update
+        :return: void
+        """
+        if self.batch_size < MIN_BATCH_SIZE:
+            super().sa_step()
+            return
+        if not self.arrays_current:
+            self.copy_lists_to_arrays()
+
+        num_moves = min(self.batch_size, ceil(self.iters_per_temp - self.iters_this_temp))
+        cells, target_x, target_y = self.draw_moves(num_moves, self.prev_temp_cost_ratio < COST_TRANSITION_RATIO)
+        occupants, deltas = self.get_block_deltas(cells, target_x, target_y)
+        accepted = np.flatnonzero((deltas <= 0) | (deltas < self.draw_thresholds(num_moves)))
+        kept = accepted[self.get_independent_moves(cells[accepted], target_x[accepted], target_y[accepted],
+                                                   occupants[accepted])]
+        self.commit_block(cells[kept], target_x[kept], target_y[kept], occupants[kept])
+        self.acceptances_this_temp += len(kept)
+
+        # Check for temperature update, discarded moves were never performed
+        self.iters_this_temp += num_moves - (len(accepted) - len(kept))
+        if self.iters_this_temp >= self.iters_per_temp:
+            self.copy_arrays_to_lists()
+            self.update_temperature()
+
+    def draw_moves(self, num_moves: int, ranged: bool):
+        """
+        Draw a block of random moves, with the semantics of pick_random_move or pick_ranged_move.
+        Targets are drawn directly from the sites other than each cell's current location.
+        :param ranged: Restrict targets to the range window around each cell?
+        :return: (ndarray, ndarray, ndarray) - cells, target x values, target y values
+        """
+        rng = self.np_rng
+        cells = rng.integers(self.num_cells_to_place, size=num_moves)
+        cell_xy = self.cell_xy_arr[cells]
+        cell_x = cell_xy[:, 0]
+        cell_y = cell_xy[:, 1]
+        if ranged:
+            half_length = self.range_window_half_length
+            min_x = np.maximum(cell_x - half_length, 0)
+            max_x = np.minimum(cell_x + half_length, self.grid_width - 1)
+            min_y = np.maximum(cell_y - half_length, 0)
+            max_y = np.minimum(cell_y + half_length, self.grid_height - 1)
+        else:
+            min_x = min_y = 0
+            max_x = self.grid_width - 1
+            max_y = self.grid_height - 1
+
+        # Draw a site of each window, skipping over the cell's current location
+        window_width = max_x - min_x + 1
+        sites = rng.integers(window_width*(max_y-min_y+1) - 1, size=num_moves)
+        sites += sites >= (cell_y-min_y)*window_width + cell_x-min_x
+        return cells, min_x + sites % window_width, min_y + sites // window_width
+
+    def draw_thresholds(self, num_moves: int):
+        """
+        Draw the acceptance thresholds of a block of moves at the current temperature.
+        A move is accepted if its cost difference is below its threshold -T*ln(u), which happens with probability
+        exp(-delta/T) for delta > 0, so the whole block needs one vectorized log rather than an exp() per move.
+        :return: ndarray - Threshold of each move
+        """
+        # 1-u lies in (0, 1], keeping the logarithm finite
+        return -self.sa_temp * np.log1p(-self.np_rng.random(num_moves))
+
+    def get_block_deltas(self, cells, target_x, target_y):
+        """
+        Calculate the cost difference of every move in a block, each relative to the placement at the start of the
+        block, from the cached bounding boxes. A move to an occupied site is a swap with its occupant.
+        Like get_nets_delta, a net is only rescanned if the moving cell is alone on one of its edges and would move
+        inward.
+        :return: (ndarray, ndarray) - occupants (-1 if none), cost differences
+        """
+        num_moves = len(cells)
+        cell_net_start = self.cell_net_start_arr
+        occupants = self.site_occupant_arr[target_y*self.grid_width + target_x]
+        cell_xy = self.cell_xy_arr[cells]
+        target_xy = np.column_stack((target_x, target_y))
+
+        # (move, net) pairs for the moving cells' nets
+        a_idx, a_counts = _expand_ranges(cell_net_start[cells], cell_net_start[cells+1])
+        a_moves = np.repeat(np.arange(num_moves), a_counts)
+        a_nets = self.cell_nets_arr[a_idx]
+        # (move, net) pairs for the swapped occupants' nets
+        swaps = np.flatnonzero(occupants >= 0)
+        occupied = occupants[swaps]
+        b_idx, b_counts = _expand_ranges(cell_net_start[occupied], cell_net_start[occupied+1])
+        b_moves = np.repeat(swaps, b_counts)
+        b_nets = self.cell_nets_arr[b_idx]
+        pair_moves = np.concatenate((a_moves, b_moves))
+        pair_nets = np.concatenate((a_nets, b_nets))
+        # Nets shared by both cells of a swap keep the same pin locations, drop them
+        keep = ~_find_repeats(pair_moves*self.num_nets + pair_nets, every=True)
+        pair_moves = pair_moves[keep]
+        pair_nets = pair_nets[keep]
+        pair_cells = np.concatenate((cells[a_moves], occupants[b_moves]))[keep]
+        old_xy = np.concatenate((cell_xy[a_moves], target_xy[b_moves]))[keep]
+        new_xy = np.concatenate((target_xy[a_moves], cell_xy[b_moves]))[keep]
+
+        # Grow each bounding box to take in the pin's new location
+        bounds = self.net_bounds_arr[pair_nets]
+        mins = bounds[:, :2]
+        maxs = bounds[:, 2:]
+        spans = np.maximum(maxs, new_xy) - np.minimum(mins, new_xy)
+        new_cost = spans[:, 0] + 2*spans[:, 1]
+
+        # Edge pins moving inward, rescan their nets with the cell moved
+        edge_counts = self.net_edge_counts_arr[pair_nets]
+        inward = np.flatnonzero((((old_xy == mins) & (edge_counts[:, :2] == 1) & (new_xy > mins)) |
+                                 ((old_xy == maxs) & (edge_counts[:, 2:] == 1) & (new_xy < maxs))).any(axis=1))
+        if len(inward) > 0:
+            nets = pair_nets[inward]
+            pin_idx, pin_counts = _expand_ranges(self.net_start_arr[nets], self.net_start_arr[nets+1])
+            pin_cells = self.net_pins_arr[pin_idx]
+            moving = pin_cells == np.repeat(pair_cells[inward], pin_counts)
+            pin_xy = self.cell_xy_arr[pin_cells]
+            pin_xy[moving] = np.repeat(new_xy[inward], pin_counts, axis=0)[moving]
+            offsets = np.cumsum(pin_counts) - pin_counts
+            spans = np.maximum.reduceat(pin_xy, offsets) - np.minimum.reduceat(pin_xy, offsets)
+            new_cost[inward] = spans[:, 0] + 2*spans[:, 1]
+
+        deltas = np.bincount(pair_moves, weights=new_cost - self.net_cost_arr[pair_nets], minlength=num_moves)
+        return occupants, deltas
+
+    def get_independent_moves(self, cells, target_x, target_y, occupants):
+        """
+        Find the moves of a block that do not conflict with an earlier move of the block: the moves that are the
+        first to claim both the cell they move and either the occupant they swap with or the empty site they fill.
+        A move whose only conflict is with a move that is itself discarded is discarded too.
+        :return: ndarray - Mask of the moves to keep
+        """
+        # Cells are claimed by their ID, empty sites by num_cells_to_place plus their site index
+        targets = np.where(occupants >= 0, occupants, self.num_cells_to_place + target_y*self.grid_width + target_x)
+        claims = np.column_stack((cells, targets)).ravel()
+        keep = np.ones(len(cells), dtype=bool)
+        keep[np.flatnonzero(_find_repeats(claims)) // 2] = False
+        return keep
+
+    def commit_block(self, cells, target_x, target_y, occupants):
+        """
+        Commit a set of moves that share no cells or target sites, then rescan the nets of every moved cell and
+        update the total cost by the exact change in their HPWL
+        :param occupants: ndarray - Cell swapped with by each move, -1 for a move to an empty site
+        """
+        if len(cells) == 0:
+            return
+        grid_width = self.grid_width
+        cell_xy = self.cell_xy_arr
+        site_occupant = self.site_occupant_arr
+        old_xy = cell_xy[cells]
+        old_sites = old_xy[:, 1]*grid_width + old_xy[:, 0]
+        swaps = np.flatnonzero(occupants >= 0)
+        swapped = occupants[swaps]
+
+        # Empty the cells' sites, then fill their targets and hand their old sites to the cells they swap with
+        site_occupant[old_sites] = -1
+        site_occupant[target_y*grid_width + target_x] = cells
+        site_occupant[old_sites[swaps]] = swapped
+        cell_xy[cells, 0] = target_x
+        cell_xy[cells, 1] = target_y
+        cell_xy[swapped] = old_xy[swaps]
+
+        # Rescan every net of a moved cell
+        moved = np.concatenate((cells, swapped))
+        idx, _ = _expand_ranges(self.cell_net_start_arr[moved], self.cell_net_start_arr[moved+1])
+        nets = self.cell_nets_arr[idx]
+        nets = nets[~_find_repeats(nets)]
+        if len(nets) > 0:
+            old_cost = int(self.net_cost_arr[nets].sum())
+            self.rescan_nets(nets)
+            self.current_cost += int(self.net_cost_arr[nets].sum()) - old_cost
+        self.lists_current = False
+
+    def rescan_nets(self, nets):
+        """
+        Recalculate the cached bounding boxes, edge pin counts and HPWL of a set of nets from scratch
+        :param nets: ndarray - IDs of distinct nets
+        """
+        pin_idx, pin_counts = _expand_ranges(self.net_start_arr[nets], self.net_start_arr[nets+1])
+        pin_xy = self.cell_xy_arr[self.net_pins_arr[pin_idx]]
+        offsets = np.cumsum(pin_counts) - pin_counts
+        bounds = np.concatenate((np.minimum.reduceat(pin_xy, offsets), np.maximum.reduceat(pin_xy, offsets)), axis=1)
+        on_edge = np.concatenate((pin_xy, pin_xy), axis=1) == np.repeat(bounds, pin_counts, axis=0)
+        self.net_bounds_arr[nets] = bounds
+        self.net_edge_counts_arr[nets] = np.add.reduceat(on_edge, offsets, dtype=np.int64)
+        self.net_cost_arr[nets] = (bounds[:, 2]-bounds[:, 0]) + 2*(bounds[:, 3]-bounds[:, 1])
+
+
+def _expand_ranges(starts, ends):
+    """
+    Concatenate the index ranges [start, end) of a set of CSR rows
+    :return: (ndarray, ndarray) - concatenated indices, length of each range
+    """
+    counts = ends - starts
+    offsets = np.cumsum(counts) - counts
+    indices = np.arange(counts.sum()) - np.repeat(offsets - starts, counts)
+    return indices, counts
+
+
+def _find_repeats(values, every=False):
+    """
+    Find the values of an array that already appeared earlier in it
+    :param every: Also mark the first occurrence of each repeated value
+    :return: ndarray - Mask of every occurrence but the first of each repeated value, or of every occurrence
+    """
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    same = ordered[1:] == ordered[:-1]
+    repeats = np.zeros(len(values), dtype=bool)
+    repeats[order[1:][same]] = True
+    if every:
+        repeats[order[:-1][same]] = True
+    return repeats
+
+
+def check_equivalence(f_name: str, num_blocks=20, batch_size=None, seed=0, ranged=False) -> bool:
+    """
+    Check a batch placer against the scalar path of the array engine.
+    A batch placer and an array placer start from the same initial placement (both draw it from the same seed).
+    For every block, each move's vectorized cost difference must equal the array placer's get_swap_delta or
+    get_move_delta on the same placement. The array placer then performs the moves the block commits one by one,
+    with its own cost differences, after which both placers must agree on the placement, the cached bounding boxes
+    and the cost, and the cost must match a from-scratch calculation.
+    :param batch_size: Moves per block, None to scale it with the netlist
+    :param ranged: Draw moves inside the range window rather than across the whole grid
+    :return: bool - True if the two paths agree
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = BatchPlacer(f_name, seed=seed, plot_mode=PLOT_NONE, log_format=run_log.LOG_NONE,
+                            batch_size=batch_size)
+        scalar = ArrayPlacer(f_name, seed=seed, plot_mode=PLOT_NONE, log_format=run_log.LOG_NONE)
+        batch.initial_placement()
+        scalar.initial_placement()
+    if batch.get_placement() != scalar.get_placement():
+        return False
+    if ranged:
+        batch.range_window_half_length = scalar.range_window_half_length = 2
+    batch.copy_lists_to_arrays()
+
+    for _ in range(num_blocks):
+        cells, target_x, target_y = batch.draw_moves(batch.batch_size, ranged)
+        occupants, deltas = batch.get_block_deltas(cells, target_x, target_y)
+        for cell_a, x, y, cell_b, delta in zip(cells.tolist(), target_x.tolist(), target_y.tolist(),
+                                               occupants.tolist(), deltas.tolist()):
+            if cell_b >= 0:
+                scalar_delta = scalar.get_swap_delta(cell_a, cell_b)
+            else:
+                scalar_delta = scalar.get_move_delta(cell_a, x, y)
+            if delta != scalar_delta:
+                return False
+
+        accepted = np.flatnonzero((deltas <= 0) | (deltas < batch.draw_thresholds(len(cells))))
+        kept = accepted[batch.get_independent_moves(cells[accepted], target_x[accepted], target_y[accepted],
+                                                    occupants[accepted])]
+        batch.commit_block(cells[kept], target_x[kept], target_y[kept], occupants[kept])
+        for cell_a, x, y, cell_b in zip(cells[kept].tolist(), target_x[kept].tolist(), target_y[kept].tolist(),
+                                        occupants[kept].tolist()):
+            if cell_b >= 0:
+                scalar.swap(cell_a, cell_b, scalar.get_swap_delta(cell_a, cell_b))
+            else:
+                scalar.move(cell_a, x, y, scalar.get_move_delta(cell_a, x, y))
+
+        batch.copy_arrays_to_lists()
+        for name in ["cell_x", "cell_y", "site_occupant", "net_cost", "net_min_x", "net_max_x", "net_min_y",
+                     "net_max_y", "net_num_min_x", "net_num_max_x", "net_num_min_y", "net_num_max_y",
+                     "current_cost"]:
+            if getattr(batch, name) != getattr(scalar, name):
+                return False
+    return batch.current_cost == scalar.calculate_total_cost()
@@ -0,0 +1,317 @@
+"""
+Reproducible benchmark suite and regression check.
+Anneals every netlist in the benchmarks directory with fixed seeds and hyperparameters, and measures annealing
+throughput on synthetic netlists of growing size and fanout, one worker process per case so that peak memory is
+measured per case. A forked worker starts out holding its parent's pages, so a case's peak memory is measured as
+the growth of the worker's peak resident memory over its size when it started. Results are written as JSON, and can
+be compared against a previous run (the baseline): the suite fails if throughput or final HPWL regresses by more than
+a tolerance.
+
+Timings are noisy, so every timing sample runs for at least MIN_SAMPLE_TIME, repeating short cases, and a case that
+looks slower than its baseline is sampled again, up to THROUGHPUT_SAMPLES times in all. The fastest sample counts.
+
+Example:
+    python bench_suite.py --update-baseline bench_baseline.json
+    python bench_suite.py --baseline bench_baseline.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import run_log
+import sim_anneal
+import synthetic
+import workers
+
+SUITE_COOLING_FACTOR = 0.8  # Cooling factor of the suite's anneals
+SUITE_INITIAL_TEMP_FACTOR = 10  # Initial temperature factor of the suite's anneals
+SUITE_MOVES_PER_TEMP_FACTOR = 10  # Moves per temperature factor of the suite's anneals
+SUITE_SEEDS = [0]  # Seeds annealed for every benchmark
+SYNTHETIC_SIZES = [1000, 4000, 16000]  # Cell counts of the synthetic netlists
+SYNTHETIC_FANOUTS = [2, 4, 8]  # Mean sinks per net of the synthetic netlists
+SYNTHETIC_MOVES = 100000  # Moves timed on each synthetic netlist
+THROUGHPUT_TOLERANCE = 0.2  # Fail if moves per second drop by more than this fraction of the baseline
+THROUGHPUT_SAMPLES = 5  # Most timing samples taken of a case before its throughput counts as regressed
+MIN_SAMPLE_TIME = 1.0  # Shortest timing sample in seconds, shorter cases are repeated within a sample
+QUALITY_TOLERANCE = 0.02  # Fail if final HPWL rises by more than this fraction of the baseline
+
+BENCH_FIELDS = ["name", "kind", "seed", "num_cells", "num_nets", "status", "final_cost", "total_iters", "runtime",
+                "moves_per_sec", "samples", "peak_memory_mb", "error"]
+
+
+class BenchCase:
+    """
+    A single case of the benchmark suite, along with its measurements once run.
+    "anneal" cases anneal a netlist to completion, "throughput" cases time a fixed number of moves at the initial
+    temperature, where every move is global.
+    """
+    def __init__(self, name: str, file_name: str, kind: str, seed=0, num_moves=None):
+        self.name = name  # Name identifying the case in results and baselines
+        self.file_name = file_name  # Path of the netlist file
+        self.kind = kind  # "anneal" or "throughput"
+        self.seed = seed  # Random seed for the run
+        self.num_moves = num_moves  # Number of moves to time, for throughput cases
+        self.status = "pending"  # One of pending, ok, error
+        self.num_cells = None  # Number of cells in the netlist
+        self.num_nets = None  # Number of nets in the netlist
+        self.final_cost = None  # HPWL cost at the end of the run
+        self.total_iters = None  # Number of moves performed
+        self.runtime = None  # Wall-clock time of the moves in seconds, excluding setup, in the fastest sample
+        self.moves_per_sec = None  # Moves performed per second in the fastest sample
+        self.samples = 0  # Number of timing samples taken
+        # Growth of the worker's peak resident memory over its starting size in MiB, None if unavailable
+        self.peak_memory_mb = None
+        self.error = None  # Description of the failure, if the run did not complete
+
+    @property
+    def key(self) -> str:
+        """
+        :return: str - Identifier used to match the case against a baseline
+        """
+        return self.name + "/" + str(self.seed)
+
+    def as_row(self) -> dict:
+        """
+        :return: dict - Field name to value
+        """
+        return {field: getattr(self, field) for field in BENCH_FIELDS}
+
+
+def get_peak_memory_mb():
+    """
+    :return: float - Peak resident memory of this process in MiB, None if the platform cannot report it
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak/(1024*1024)  # Reported in bytes
+    return peak/1024  # Reported in KiB
+
+
+def _bench_worker(case: BenchCase, engine: str, conn):
+    """
+    Worker process body: take one timing sample of a case, running it as many times as it takes to last at least
+    MIN_SAMPLE_TIME, and send its measurements back through a pipe. Every run is identical, as the seed is fixed.
+    """
+    start_memory_mb = get_peak_memory_mb()  # Includes the pages inherited from the parent when forked
+    workers.silence()
+    try:
+        num_runs = 0
+        runtime = 0.0
+        while runtime < MIN_SAMPLE_TIME:
+            placer = sim_anneal.get_placer_class(engine)(case.file_name, SUITE_COOLING_FACTOR,
+                                                         SUITE_INITIAL_TEMP_FACTOR, SUITE_MOVES_PER_TEMP_FACTOR,
+                                                         case.seed, plot_mode=sim_anneal.PLOT_NONE,
+                                                         log_format=run_log.LOG_NONE)
+            placer.initial_placement()
+            start = time.perf_counter()
+            if case.kind == "anneal":
+                while not placer.placement_done:
+                    placer.sa_step()
+            else:
+                placer.iters_per_temp = case.num_moves  # Time a single temperature of num_moves moves
+                while placer.total_iters == 0:
+                    placer.sa_step()
+            runtime += time.perf_counter() - start
+            num_runs += 1
+        peak_memory_mb = None if start_memory_mb is None else get_peak_memory_mb() - start_memory_mb
+        conn.send(("ok", placer.num_cells_to_place, placer.num_nets, placer.current_cost, placer.total_iters,
+                   runtime/num_runs, peak_memory_mb))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    conn.close()
+
+
+def run_case(case: BenchCase, engine="array") -> BenchCase:
+    """
+    Take a timing sample of a case in a fresh worker process, filling in its measurements.
+    Running a case again takes another sample, keeping the timings of the fastest.
+    :param engine: Placement representation to anneal with, see sim_anneal.get_placer_class
+    :return: BenchCase - The same case
+    """
+    conn, process = workers.start_worker(_bench_worker, (case, engine))
+    result = workers.receive(conn, process)
+    process.join()
+    conn.close()
+
+    if result[0] == "ok":
+        status, case.num_cells, case.num_nets, case.final_cost, case.total_iters, runtime, peak_memory_mb = result
+        moves_per_sec = case.total_iters/runtime
+        case.samples += 1
+        if case.status != "ok" or moves_per_sec > case.moves_per_sec:
+            case.status = status
+            case.runtime = runtime
+            case.moves_per_sec = moves_per_sec
+            case.peak_memory_mb = peak_memory_mb
+    else:
+        case.status, case.error = result
+    return case
+
+
+def build_suite(benchmark_dir: str, synthetic_dir=None, seeds=SUITE_SEEDS, names=None) -> list:
+    """
+    Build the list of cases making up the suite
+    :param benchmark_dir: Directory holding the benchmark netlists (*.txt)
+    :param synthetic_dir: Directory to write synthetic netlists to, None to leave them out
+    :param seeds: Seeds to anneal each benchmark with
+    :param names: Only include cases with these names, None for every case
+    :return: list[BenchCase]
+    """
+    suite = []
+    for file_name in sorted(glob.glob(os.path.join(benchmark_dir, "*.txt"))):
+        name = os.path.splitext(os.path.basename(file_name))[0]
+        for seed in seeds:
+            suite.append(BenchCase(name, file_name, "anneal", seed))
+    if synthetic_dir is not None:
+        for num_cells in SYNTHETIC_SIZES:
+            for fanout in SYNTHETIC_FANOUTS:
+                name = "synthetic-" + str(num_cells) + "-" + str(fanout)
+                if names is None or name in names:
+                    file_name = os.path.join(synthetic_dir, name + ".txt")
+                    synthetic.write_netlist(file_name, num_cells, fanout, seed=0)
+                    suite.append(BenchCase(name, file_name, "throughput", 0, SYNTHETIC_MOVES))
+    if names is not None:
+        suite = [case for case in suite if case.name in names]
+    return suite
+
+
+def get_baseline_row(case: BenchCase, baseline: dict):
+    """
+    :param baseline: Results document of the baseline run, see results_document
+    :return: dict - The case's completed row in the baseline, None if it has none
+    """
+    for row in baseline["results"]:
+        if row["name"] + "/" + str(row["seed"]) == case.key and row["status"] == "ok":
+            return row
+    return None
+
+
+def is_slower(case: BenchCase, row: dict, throughput_tolerance=THROUGHPUT_TOLERANCE) -> bool:
+    """
+    :param row: The case's row in the baseline, see get_baseline_row
+    :return: bool - Has the case's throughput dropped by more than the tolerance?
+    """
+    return case.status == "ok" and case.moves_per_sec < row["moves_per_sec"]*(1-throughput_tolerance)
+
+
+def find_regressions(cases: list, baseline: dict, throughput_tolerance=THROUGHPUT_TOLERANCE,
+                     quality_tolerance=QUALITY_TOLERANCE) -> list:
+    """
+    Compare the measurements of a run of the suite against a baseline run.
+    Cases missing from the baseline are not checked.
+    :param cases: list[BenchCase] - Completed cases
+    :param baseline: Results document of the baseline run, see results_document
+    :return: list[str] - Description of every regression found
+    """
+    regressions = []
+    for case in cases:
+        row = get_baseline_row(case, baseline)
+        if row is None:
+            continue
+        if case.status != "ok":
+            regressions.append(case.key + ": failed (" + str(case.error) + ")")
+            continue
+        if is_slower(case, row, throughput_tolerance):
+            regressions.append(case.key + ": throughput " + str(round(case.moves_per_sec)) + " moves/s (best of " +
+                               str(case.samples) + "), baseline " + str(round(row["moves_per_sec"])) + " moves/s")
+        if case.kind == "anneal" and case.final_cost > row["final_cost"]*(1+quality_tolerance):
+            regressions.append(case.key + ": final cost " + str(case.final_cost) + ", baseline " +
+                               str(row["final_cost"]))
+    return regressions
+
+
+def results_document(cases: list, engine: str) -> dict:
+    """
+    :return: dict - Machine-readable record of a run of the suite, as stored in results and baseline files
+    """
+    return {"engine": engine,
+            "factors": [SUITE_COOLING_FACTOR, SUITE_INITIAL_TEMP_FACTOR, SUITE_MOVES_PER_TEMP_FACTOR],
+            "synthetic_moves": SYNTHETIC_MOVES,
+            "python": sys.version.split()[0],
+            "results": [case.as_row() for case in cases]}
+
+
+def main(argv=None) -> int:
+    """
+    Run the benchmark suite from the command line
+    :param argv: Arguments to parse, defaults to sys.argv[1:]
+    :return: int - Exit status, non-zero if a case failed or regressed
+    """
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and check it against a baseline.")
+    parser.add_argument("--benchmarks", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                             sim_anneal.FILE_DIR),
+                        help="directory holding the benchmark netlists")
+    parser.add_argument("-e", "--engine", default="array", help="annealing engine")
+    parser.add_argument("-s", "--seed", type=int, nargs="+", default=SUITE_SEEDS, help="seed(s) for each benchmark")
+    parser.add_argument("--only", nargs="+", default=None, help="only run the cases with these names")
+    parser.add_argument("--no-synthetic", action="store_true", help="leave out the synthetic netlists")
+    parser.add_argument("-o", "--output", default=None, help="file to write the results to as JSON")
+    parser.add_argument("--baseline", default=None, help="baseline results to check for regressions against")
+    parser.add_argument("--update-baseline", metavar="FILE", default=None, help="write the results as a new baseline")
+    parser.add_argument("--throughput-tolerance", type=float, default=THROUGHPUT_TOLERANCE,
+                        help="largest allowed fractional drop in moves per second")
+    parser.add_argument("--samples", type=int, default=THROUGHPUT_SAMPLES,
+                        help="most timing samples taken of a case that looks slower than its baseline")
+    parser.add_argument("--quality-tolerance", type=float, default=QUALITY_TOLERANCE,
+                        help="largest allowed fractional rise in final HPWL")
+    args = parser.parse_args(argv)
+    if args.samples < 1:
+        parser.error("--samples must be at least 1")
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["engine"] != args.engine or baseline["factors"] != [SUITE_COOLING_FACTOR,
+                                                                         SUITE_INITIAL_TEMP_FACTOR,
+                                                                         SUITE_MOVES_PER_TEMP_FACTOR]:
+            parser.error("baseline was recorded with a different engine or hyperparameters")
+
+    synthetic_dir = None if args.no_synthetic else tempfile.mkdtemp(prefix="bench_synthetic_")
+    try:
+        cases = build_suite(args.benchmarks, synthetic_dir, args.seed, args.only)
+        for case in cases:
+            run_case(case, args.engine)
+            row = None if baseline is None else get_baseline_row(case, baseline)
+            # Sample a case that looks slower again before counting it as regressed, as a sample can be slowed down
+            # by anything else running on the machine
+            while row is not None and is_slower(case, row, args.throughput_tolerance) and \
+                    case.samples < args.samples:
+                run_case(case, args.engine)
+            if case.status == "ok":
+                memory = "unknown" if case.peak_memory_mb is None else str(round(case.peak_memory_mb, 1))
+                print(case.key + ": " + str(round(case.moves_per_sec)) + " moves/s, " + str(round(case.runtime, 2)) +
+                      "s, " + str(case.final_cost) + " HPWL, " + memory + " MiB peak growth, " + str(case.samples) +
+                      " sample(s)", flush=True)
+            else:
+                print(case.key + ": " + case.status + " (" + str(case.error) + ")", flush=True)
+    finally:
+        if synthetic_dir is not None:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+    document = results_document(cases, args.engine)
+    for out_file_name in (args.output, args.update_baseline):
+        if out_file_name is not None:
+            with open(out_file_name, "w") as f:
+                json.dump(document, f, indent=1)
+
+    failed = [case.key for case in cases if case.status != "ok"]
+    regressions = []
+    if baseline is not None:
+        regressions = find_regressions(cases, baseline, args.throughput_tolerance, args.quality_tolerance)
+    for message in ["failed: " + key for key in failed] + regressions:
+        print("REGRESSION " + message)
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
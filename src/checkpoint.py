@@ -0,0 +1,62 @@
+"""
+Checkpoints of anneals in progress.
+A checkpoint holds the full state of a placer at the end of a temperature (see Placer.get_state), pickled and
+compressed, with the placement packed into a flat integer array. Resuming from a checkpoint continues the anneal
+exactly as if it had never stopped. Files are replaced atomically, so a run killed while writing keeps its previous
+checkpoint.
+"""
+
+import os
+import pickle
+import zlib
+from array import array
+
+CHECKPOINT_VERSION = 2  # Bumped whenever the layout of the state changes
+CHECKPOINT_INTERVAL = 60  # Default minimum time between checkpoints in seconds
+COMPRESSION_LEVEL = 1  # zlib level, the placement compresses well even at the fastest level
+
+
+def pack_placement(placement: list) -> bytes:
+    """
+    :param placement: list[(int, int)] - x,y of each cell, indexed by cell ID
+    :return: bytes - x0, y0, x1, y1, ... as native 32-bit integers
+    """
+    return array("i", [coordinate for location in placement for coordinate in location]).tobytes()
+
+
+def unpack_placement(packed: bytes) -> list:
+    """
+    :param packed: Placement packed by pack_placement
+    :return: list[(int, int)] - x,y of each cell, indexed by cell ID
+    """
+    coordinates = array("i")
+    coordinates.frombytes(packed)
+    return list(zip(coordinates[0::2], coordinates[1::2]))
+
+
+def write_checkpoint(state: dict, path: str):
+    """
+    Write a placer's state to a checkpoint file, replacing any previous checkpoint at the same path
+    :param state: dict - Placer state, see Placer.get_state
+    :param path: Path of the checkpoint file
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(zlib.compress(pickle.dumps({"version": CHECKPOINT_VERSION, "state": state},
+                                           protocol=pickle.HIGHEST_PROTOCOL), COMPRESSION_LEVEL))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def read_checkpoint(path: str) -> dict:
+    """
+    Read a placer's state from a checkpoint file
+    :param path: Path of the checkpoint file
+    :return: dict - Placer state, see Placer.set_state
+    """
+    with open(path, "rb") as f:
+        checkpoint = pickle.loads(zlib.decompress(f.read()))
+    if checkpoint.get("version") != CHECKPOINT_VERSION:
+        raise ValueError("Unsupported checkpoint version in " + path + ": " + str(checkpoint.get("version")))
+    return checkpoint["state"]
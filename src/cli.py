@@ -0,0 +1,129 @@
+"""
+Command-line interface for running batches of headless anneals.
+Every combination of the given netlists and hyperparameters is annealed over a pool of worker processes,
+and one result record is streamed out per run as soon as it finishes.
+
+Example:
+    python cli.py cm151a.txt ../my_netlists/design.txt -c 0.8 0.9 -s 0 1 2 -w 4 -f jsonl -o results.jsonl
+"""
+
+import argparse
+import os
+import sys
+
+import grid_search
+import halving
+import netlist
+import run_log
+import sim_anneal
+
+ENGINES = ["object", "array", "batch"]  # Choices for --engine, see sim_anneal.get_placer_class
+SCHEDULES = ["geometric", "adaptive"]  # Choices for --schedule, see sim_anneal.get_schedule
+PLOT_MODES = [sim_anneal.PLOT_SAVE, sim_anneal.PLOT_NONE]  # Choices for --plot, showing a plot is left to the GUI
+
+
+def number(text: str):
+    """
+    Argument type for hyperparameter factors, keeping whole numbers as ints so they print as in main.py
+    :return: int or float
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser for the command-line interface
+    :return: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(description="Anneal netlists without a GUI, streaming one result per run.")
+    parser.add_argument("netlists", nargs="+",
+                        help="benchmark names (looked up in the benchmarks directory) or paths to netlist files")
+    parser.add_argument("-c", "--cooling-factor", type=number, nargs="+", default=[sim_anneal.COOLING_FACTOR],
+                        help="coefficient(s) for rate of anneal cooling")
+    parser.add_argument("-t", "--initial-temp-factor", type=number, nargs="+",
+                        default=[sim_anneal.INITIAL_TEMP_FACTOR], help="coefficient(s) for anneal initial temperature")
+    parser.add_argument("-m", "--moves-per-temp-factor", type=number, nargs="+",
+                        default=[sim_anneal.MOVES_PER_TEMP_FACTOR],
+                        help="coefficient(s) for number of moves performed at each temperature")
+    parser.add_argument("-s", "--seed", type=int, nargs="+", default=[0], help="random seed(s)")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="number of parallel anneals (default: number of CPUs)")
+    parser.add_argument("--timeout", type=float, default=None, help="maximum runtime of a single anneal in seconds")
+    parser.add_argument("-e", "--engine", choices=ENGINES, default="array", help="annealing engine")
+    parser.add_argument("--schedule", choices=SCHEDULES, default="geometric", help="annealing schedule")
+    parser.add_argument("--initial-placer", choices=sim_anneal.INITIAL_PLACERS, default=sim_anneal.INITIAL_RANDOM,
+                        help="place cells randomly before annealing, or by quadratic wirelength minimization")
+    parser.add_argument("-f", "--format", choices=grid_search.RESULT_FORMATS, default="csv",
+                        help="format of the result records")
+    parser.add_argument("-o", "--output", default="-", help="file to write results to (default: standard output)")
+    parser.add_argument("--plot", choices=PLOT_MODES, default=sim_anneal.PLOT_NONE,
+                        help="save a cost plot for each run, or skip it")
+    parser.add_argument("--run-log", choices=run_log.LOG_FORMATS, default=run_log.LOG_CSV,
+                        help="format of the per-temperature log streamed by each run, or none")
+    parser.add_argument("--log-dir", default=".", help="directory to write the per-temperature logs to")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="directory to checkpoint each anneal to; rerunning the same command resumes interrupted "
+                             "anneals from their checkpoints")
+    parser.add_argument("--halving", type=int, default=None, metavar="RATE",
+                        help="search by successive halving, keeping the best 1/RATE of the runs on each netlist at "
+                             "each rung and stopping the rest early (see halving.py)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="keep the console logs of each anneal (interleaved with results if writing to stdout)")
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    Run the command-line interface
+    :param argv: Arguments to parse, defaults to sys.argv[1:]
+    :return: int - Exit status, non-zero if any run timed out or failed
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Check every netlist up front, rather than failing the same way in every run
+    for netlist_name in args.netlists:
+        netlist_path = sim_anneal.get_netlist_path(netlist_name)
+        if not os.path.isfile(netlist_path):
+            parser.error("netlist not found: " + netlist_name)
+        try:
+            netlist.load_cached_netlist(netlist_path)
+        except netlist.NetlistError as e:
+            parser.error(str(e))
+    if args.run_log != run_log.LOG_NONE and not os.path.isdir(args.log_dir):
+        parser.error("log directory not found: " + args.log_dir)
+    if args.checkpoint_dir is not None and not os.path.isdir(args.checkpoint_dir):
+        parser.error("checkpoint directory not found: " + args.checkpoint_dir)
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.halving is not None:
+        if args.halving < 2:
+            parser.error("--halving must be at least 2")
+        if args.timeout is not None or args.checkpoint_dir is not None:
+            parser.error("--halving cannot be combined with --timeout or --checkpoint-dir")
+
+    runs = grid_search.build_grid(args.netlists, args.cooling_factor, args.initial_temp_factor,
+                                  args.moves_per_temp_factor, args.seed, args.engine, args.plot,
+                                  args.schedule, args.run_log, args.log_dir, args.checkpoint_dir,
+                                  args.initial_placer)
+    out_file = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    num_failed = 0
+    try:
+        if args.halving is None:
+            finished_runs = grid_search.iter_grid_search(runs, args.workers, args.timeout, quiet=not args.verbose)
+        else:
+            finished_runs = halving.iter_halving_search(runs, args.workers, args.halving, quiet=not args.verbose)
+        for run in grid_search.stream_results(finished_runs, out_file, args.format):
+            if run.status not in ["ok", "stopped"]:
+                num_failed += 1
+    finally:
+        if out_file is not sys.stdout:
+            out_file.close()
+
+    return 1 if num_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
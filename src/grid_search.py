@@ -0,0 +1,175 @@
+"""
+Parallel hyperparameter grid search for Simulated Annealing.
+Each anneal runs in a fresh worker process, so no annealer state is shared between runs.
+"""
+
+import csv
+import json
+import os
+from itertools import product
+
+import netlist
+import run_log
+import sim_anneal
+import workers
+
+RESULT_FIELDS = ["file_name", "cooling_factor", "initial_temp_factor", "moves_per_temp_factor", "seed",
+                 "engine", "schedule", "initial_placer", "status", "final_cost", "total_iters", "runtime", "error"]
+RESULT_FORMATS = ["csv", "jsonl"]  # Supported formats for streamed results
+
+
+class GridRun:
+    """
+    A single anneal in the grid search, along with its results once complete
+    """
+    def __init__(self, file_name: str, cooling_factor: float, initial_temp_factor: float,
+                 moves_per_temp_factor: float, seed: int, engine="array", plot_mode=sim_anneal.PLOT_SAVE,
+                 schedule="geometric", log_format=run_log.LOG_CSV, log_dir=".", checkpoint_file=None,
+                 initial_placer=sim_anneal.INITIAL_RANDOM):
+        self.file_name = file_name  # Name of the netlist file to anneal
+        self.cooling_factor = cooling_factor  # Coefficient for rate of anneal cooling
+        self.initial_temp_factor = initial_temp_factor  # Coefficient for anneal initial temperature
+        self.moves_per_temp_factor = moves_per_temp_factor  # Coefficient for number of moves per temperature
+        self.seed = seed  # Random seed for the run
+        self.engine = engine  # Placement representation to anneal with, see sim_anneal.get_placer_class
+        self.plot_mode = plot_mode  # How to output the cost plot, see sim_anneal.PLOT_* constants
+        self.schedule = schedule  # Annealing schedule, see sim_anneal.get_schedule
+        self.log_format = log_format  # Format of the run's per-temperature log, see run_log.LOG_FORMATS
+        self.log_dir = log_dir  # Directory to write the run's log to
+        self.checkpoint_file = checkpoint_file  # File to checkpoint the run to and resume it from, None for neither
+        self.initial_placer = initial_placer  # How cells are placed before annealing, see sim_anneal.INITIAL_PLACERS
+        self.status = "pending"  # One of pending, ok, timeout, error, stopped (see halving.py)
+        self.final_cost = None  # Final HPWL cost of the placement
+        self.total_iters = None  # Total number of annealing iterations performed
+        self.runtime = None  # Wall-clock time of the run in seconds
+        self.error = None  # Description of the failure, if the run did not complete
+
+    def as_row(self) -> dict:
+        """
+        Get the run as a row of the results table
+        :return: dict - Field name to value
+        """
+        return {field: getattr(self, field) for field in RESULT_FIELDS}
+
+
+def build_grid(file_names, cooling_factors, initial_temp_factors, moves_per_temp_factors, seeds=(0,),
+               engine="array", plot_mode=sim_anneal.PLOT_SAVE, schedule="geometric", log_format=run_log.LOG_CSV,
+               log_dir=".", checkpoint_dir=None, initial_placer=sim_anneal.INITIAL_RANDOM) -> list:
+    """
+    Build the list of runs making up a grid search
+    :param checkpoint_dir: Directory to checkpoint runs to, None for no checkpoints. Each run's checkpoint is named
+                           after its inputs, so a repeated grid search resumes its interrupted runs
+    :return: list[GridRun] - One run per combination of the inputs
+    """
+    grid = []
+    for file_name, cool_fact, init_temp_fact, move_p_t_fact, seed in product(file_names, cooling_factors,
+                                                                              initial_temp_factors,
+                                                                              moves_per_temp_factors, seeds):
+        checkpoint_file = None
+        if checkpoint_dir is not None:
+            checkpoint_file = os.path.join(checkpoint_dir, str(cool_fact) + "-" + str(init_temp_fact) + "-" +
+                                           str(move_p_t_fact) + "-" + os.path.splitext(os.path.basename(file_name))[0] +
+                                           "-s" + str(seed) + "-" + engine + "-" + schedule + "-" + initial_placer +
+                                           ".ckpt")
+        grid.append(GridRun(file_name, cool_fact, init_temp_fact, move_p_t_fact, seed, engine, plot_mode,
+                            schedule, log_format, log_dir, checkpoint_file, initial_placer))
+    return grid
+
+
+def _run_worker(run: GridRun, quiet, conn):
+    """
+    Worker process body: perform a single anneal and send its results back through a pipe
+    """
+    if quiet:
+        workers.silence()
+    try:
+        final_cost, total_iters, runtime = sim_anneal.quick_anneal(run.file_name, run.cooling_factor,
+                                                                   run.initial_temp_factor,
+                                                                   run.moves_per_temp_factor, seed=run.seed,
+                                                                   engine=run.engine, plot_mode=run.plot_mode,
+                                                                   schedule=run.schedule,
+                                                                   log_format=run.log_format, log_dir=run.log_dir,
+                                                                   checkpoint_file=run.checkpoint_file,
+                                                                   initial_placer=run.initial_placer)
+        conn.send(("ok", final_cost, total_iters, runtime))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    conn.close()
+
+
+def iter_grid_search(runs: list, num_workers=None, timeout=None, quiet=False):
+    """
+    Perform a set of anneals over a pool of worker processes, yielding each run as it finishes.
+    A new process is started for every run, so that runs cannot corrupt each other.
+    :param runs: list[GridRun] - Runs to perform
+    :param num_workers: Maximum number of concurrent worker processes (defaults to the CPU count)
+    :param timeout: Maximum runtime of a single run in seconds, None for no limit
+    :param quiet: Discard the console logs of the anneals
+    :return: Generator of GridRun - Completed runs, in order of completion
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    # Build each netlist's binary cache once up front, so every worker attaches to it instead of re-parsing
+    for file_name in sorted(set(run.file_name for run in runs)):
+        try:
+            netlist.load_cached_netlist(sim_anneal.get_netlist_path(file_name))
+        except (OSError, netlist.NetlistError):
+            pass  # Reported by the runs themselves
+
+    tasks = [(run, (run, quiet)) for run in runs]
+    for run, result, runtime in workers.iter_pool(_run_worker, tasks, num_workers, timeout):
+        if result[0] == "ok":
+            run.status, run.final_cost, run.total_iters, run.runtime = result
+        elif result[0] == "timeout":
+            run.status = "timeout"
+            run.runtime = runtime
+        else:
+            run.status, run.error = result
+        yield run
+
+
+def run_grid_search(runs: list, num_workers=None, timeout=None) -> list:
+    """
+    Perform a set of anneals over a pool of worker processes and gather their results
+    :return: list[GridRun] - The input runs with their results filled in
+    """
+    for _ in iter_grid_search(runs, num_workers, timeout):
+        pass
+    return runs
+
+
+def stream_results(runs, out_file, result_format="csv"):
+    """
+    Write runs to an open file as they arrive, one record per run, flushing after each.
+    Records are CSV rows (after a header row) or JSON objects on separate lines.
+    :param runs: Iterable of GridRun - Completed runs, e.g. from iter_grid_search
+    :param out_file: Open text file to write to
+    :param result_format: One of RESULT_FORMATS
+    :return: Generator of GridRun - Each run once its record has been written
+    """
+    if result_format not in RESULT_FORMATS:
+        raise ValueError("Unknown result format: " + str(result_format))
+    writer = None
+    if result_format == "csv":
+        writer = csv.DictWriter(out_file, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        out_file.flush()
+    for run in runs:
+        if writer is not None:
+            writer.writerow(run.as_row())
+        else:
+            out_file.write(json.dumps(run.as_row()) + "\n")
+        out_file.flush()
+        yield run
+
+
+def write_results_table(runs: list, outfile_name: str):
+    """
+    Write the results of a grid search to a CSV file, one row per run
+    """
+    with open(outfile_name, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for run in runs:
+            writer.writerow(run.as_row())
@@ -0,0 +1,178 @@
+"""
+Interactive annealing with a Tkinter GUI.
+The anneal runs in a background worker thread, so the window stays responsive however long a command takes. Key
+presses are passed to the worker through a command queue. At the end of every temperature and every command, the
+placer publishes a snapshot of its placement through a snapshot queue holding only the latest one (see
+Placer.publish_snapshot). The GUI polls that queue on a timer and only redraws the lines of cells that moved since
+the last frame. Tkinter is only ever called from the GUI thread.
+"""
+
+import queue
+import threading
+from tkinter import Tk, Canvas, N, W, E, S
+
+import sim_anneal
+
+SITE_LENGTH = 7  # Side of a site on the canvas, in pixels. Rows of sites alternate with routing channels
+POLL_INTERVAL = 50  # Time between checks for a new snapshot, in milliseconds
+COMMAND_COMPLETE = 0  # Key command: anneal to completion
+
+
+class AnnealWindow:
+    """
+    A window drawing a placement as it is annealed, with one line from each net's source to each of its sinks
+    """
+    def __init__(self, placer: sim_anneal.Placer):
+        """
+        Create the window and canvas, draw the placer's initial placement and start the anneal worker
+        :param placer: Placer with its initial placement done, annealed from now on by the worker thread only
+        """
+        self.placer = placer  # Placer being annealed
+        self.commands = queue.Queue()  # Key commands waiting for the worker, see run_commands
+        self.snapshots = queue.Queue(maxsize=1)  # Latest snapshot published by the placer
+        placer.snapshot_queue = self.snapshots
+        self.plotted = False  # Has the cost plot of the finished anneal been shown?
+
+        # Create routing canvas in Tkinter
+        self.root = Tk()  # Tkinter root
+        self.root.columnconfigure(0, weight=1)
+        self.root.rowconfigure(0, weight=1)
+        grid_width = placer.grid_width
+        grid_height = placer.grid_height
+        self.routing_canvas = Canvas(self.root, bg='white', width=grid_width*SITE_LENGTH,
+                                     height=grid_height*SITE_LENGTH)  # Tkinter canvas
+        self.routing_canvas.grid(column=0, row=0, sticky=(N, W, E, S))
+        for x in range(grid_width):
+            for y in range(grid_height):
+                # Add a cell site rectangle to the canvas
+                top_left_x = SITE_LENGTH * x
+                top_left_y = SITE_LENGTH * y * 2
+                bottom_right_x = top_left_x + SITE_LENGTH
+                bottom_right_y = top_left_y + SITE_LENGTH
+                self.routing_canvas.create_rectangle((top_left_x, top_left_y, bottom_right_x, bottom_right_y),
+                                                     fill="white")
+                # Add a routing channel rectangle to the canvas
+                if y != grid_height-1:
+                    top_left_y = bottom_right_y
+                    bottom_right_y = top_left_y + SITE_LENGTH
+                    self.routing_canvas.create_rectangle((top_left_x, top_left_y, bottom_right_x, bottom_right_y),
+                                                         fill="black")
+
+        # Draw a line from each net's source to each of its sinks
+        circuit = placer.circuit
+        self.placement = placer.get_placement()  # x,y of each cell as last drawn, indexed by cell ID
+        self.line_ids = []  # Tkinter ID of each line
+        self.line_cells = []  # (source cell ID, sink cell ID) of each line
+        self.cell_lines = [[] for _ in range(circuit.num_cells)]  # Indices of the lines of each cell
+        net_start = circuit.net_start
+        net_pins = circuit.net_pins
+        for net in range(circuit.num_nets):
+            source = net_pins[net_start[net]]
+            for sink in net_pins[net_start[net]+1:net_start[net+1]]:
+                line = len(self.line_ids)
+                self.line_ids.append(self.routing_canvas.create_line(*self.get_line_coords(source, sink),
+                                                                     fill='red', width=0.01))
+                self.line_cells.append((source, sink))
+                self.cell_lines[source].append(line)
+                self.cell_lines[sink].append(line)
+        self.show_status(placer.current_cost, placer.sa_temp, placer.total_iters)
+
+        # Start the worker, as a daemon so that closing the window ends the program mid-anneal
+        self.worker = threading.Thread(target=run_commands, args=(placer, self.commands), daemon=True)  # Annealer
+        self.worker.start()
+
+        # Event bindings
+        self.routing_canvas.focus_set()
+        self.routing_canvas.bind("<Key>", self.key_handler)
+        self.root.after(POLL_INTERVAL, self.poll)
+
+    def get_line_coords(self, source: int, sink: int) -> (float, float, float, float):
+        """
+        :param source: Source cell ID
+        :param sink: Sink cell ID
+        :return: (float, float, float, float) - Canvas coordinates of the centres of both cells' sites, as last drawn
+        """
+        source_x, source_y = self.placement[source]
+        sink_x, sink_y = self.placement[sink]
+        return (SITE_LENGTH*(source_x+0.5), SITE_LENGTH*(2*source_y+0.5),
+                SITE_LENGTH*(sink_x+0.5), SITE_LENGTH*(2*sink_y+0.5))
+
+    def key_handler(self, event):
+        """
+        Pass a key command to the worker.
+        '0' anneals to completion, '1' performs a single iteration and '2' to '9' perform 10^n iterations.
+        Commands sent while the worker is busy are run in order once it is done.
+        :param event: Key event
+        """
+        e_char = event.char
+        if len(e_char) == 1 and str.isdigit(e_char):
+            self.commands.put(int(e_char))
+
+    def poll(self):
+        """
+        Draw the latest snapshot, if there is a new one, then check again after POLL_INTERVAL
+        """
+        try:
+            snapshot = self.snapshots.get_nowait()
+        except queue.Empty:
+            snapshot = None
+        if snapshot is not None:
+            self.redraw(snapshot["placement"])
+            self.show_status(snapshot["cost"], snapshot["temperature"], snapshot["total_iters"])
+            if snapshot["placement_done"] and not self.plotted:
+                # pyplot must run on the GUI thread, see Placer.update_temperature
+                self.plotted = True
+                self.placer.plot_cost_history()
+        self.root.after(POLL_INTERVAL, self.poll)
+
+    def redraw(self, placement: list):
+        """
+        Redraw the lines of every cell whose location differs from the last drawn placement
+        :param placement: list[(int, int)] - x,y of each cell, indexed by cell ID
+        """
+        old_placement = self.placement
+        self.placement = placement
+        moved_lines = set()
+        for cell_id in range(len(placement)):
+            if placement[cell_id] != old_placement[cell_id]:
+                moved_lines.update(self.cell_lines[cell_id])
+        for line in moved_lines:
+            self.routing_canvas.coords(self.line_ids[line], *self.get_line_coords(*self.line_cells[line]))
+
+    def show_status(self, cost: float, temperature: float, total_iters: int):
+        """
+        Show the progress of the anneal in the window title
+        """
+        self.root.title(self.placer.design_name + " - Cost: " + str(cost) + "; Temperature: " +
+                        str(round(temperature, 3)) + "; Iterations: " + str(total_iters))
+
+
+def run_commands(placer: sim_anneal.Placer, commands: queue.Queue):
+    """
+    Worker loop: anneal according to each key command taken from a queue, forever
+    :param placer: Placer to anneal
+    :param commands: Queue of commands, COMMAND_COMPLETE or n to perform 10^n iterations, see Placer.sa_multistep
+    """
+    while True:
+        command = commands.get()
+        if command == COMMAND_COMPLETE:
+            placer.sa_to_completion()
+        else:
+            placer.sa_multistep(command)
+        placer.publish_snapshot()
+
+
+def anneal(f_name: str, engine="object"):
+    """
+    Perform anneal with a GUI.
+    :param f_name: Name of file to open
+    :param engine: Placement representation to anneal with, see sim_anneal.get_placer_class
+    :return: void
+    """
+    placer = sim_anneal.get_placer_class(engine)(f_name)
+
+    # Perform initial placement
+    placer.initial_placement()
+
+    window = AnnealWindow(placer)
+    window.root.mainloop()
@@ -0,0 +1,138 @@
+"""
+Successive-halving hyperparameter search for Simulated Annealing.
+Rather than annealing every combination to completion, all runs on a netlist are annealed for a small budget of
+iterations, and only the best 1/HALVING_RATE of them by cost continue to the next rung, with HALVING_RATE times
+the budget. Once a netlist has at most HALVING_RATE runs left, they are annealed to completion. Runs that finish
+within a rung's budget are complete and leave the search, and the rest are stopped early. Runs are ranked by their
+cost at the end of the rung alone, not by how fast their cost was falling.
+
+Runs stop at the end of the first temperature past their budget, so costs are compared at temperature boundaries,
+as recorded in the cost history. A stopped run hands its full state back (see Placer.get_state), and if it survives
+it resumes from that state in a fresh worker process, exactly as if it had never stopped, appending to the same run
+log. Budgets are in units of
+n^(4/3) iterations for a netlist of n cells, the scale of moves per temperature, so that the same settings suit
+netlists of any size: the default first rung covers 4 to 12 temperatures for moves per temperature factors of 75
+down to 25.
+
+Early costs favour runs that cool quickly, so a run that would have caught up late can be stopped, most often one
+with many moves per temperature. A larger FIRST_RUNG_BUDGET makes this less likely, at the expense of more
+iterations spent on losing runs.
+"""
+
+import os
+import time
+from math import ceil
+
+import netlist
+import run_log
+import sim_anneal
+import workers
+from grid_search import GridRun
+
+HALVING_RATE = 3  # Keep the best 1/HALVING_RATE of the runs on each netlist at each rung
+FIRST_RUNG_BUDGET = 300  # Iterations per run in the first rung, in units of n^(4/3) for a netlist of n cells
+
+
+def _halving_worker(run: GridRun, state, log_path, budget, quiet, conn):
+    """
+    Worker process body: anneal a run until it completes or has performed a number of iterations, then send its
+    results back through a pipe, along with its state and the path of its run log if it is not complete
+    :param state: dict - Placer state to resume from, None to start from an initial placement
+    :param log_path: Path of the run log to append to when resuming, None to start a new log
+    :param budget: Number of iterations after which the run stops at the end of a temperature, None for no limit
+    """
+    if quiet:
+        workers.silence()
+    try:
+        placer = sim_anneal.get_placer_class(run.engine)(run.file_name, run.cooling_factor, run.initial_temp_factor,
+                                                         run.moves_per_temp_factor, run.seed, plot_mode=run.plot_mode,
+                                                         schedule=run.schedule, log_format=run.log_format,
+                                                         log_dir=run.log_dir, initial_placer=run.initial_placer)
+        if state is None:
+            placer.initial_placement()
+        else:
+            placer.set_state(state)
+            if log_path is not None:
+                # The log already holds the history up to the stop, carry on after it
+                placer.run_log = run_log.RunLog(log_path, run.log_format, append=True)
+                placer.num_logged = len(placer.cost_history)
+        start = time.time()
+        while not placer.placement_done and (budget is None or placer.total_iters < budget):
+            placer.sa_step()
+        runtime = time.time() - start
+        log_path = None
+        if not placer.placement_done and placer.run_log is not None:
+            log_path = placer.run_log.path
+            placer.run_log.close()
+        placer.wait_for_output()
+        conn.send(("ok", placer.placement_done, placer.current_cost, placer.total_iters, runtime,
+                   None if placer.placement_done else placer.get_state(), log_path))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    conn.close()
+
+
+def iter_halving_search(runs: list, num_workers=None, halving_rate=HALVING_RATE, first_budget=FIRST_RUNG_BUDGET,
+                        quiet=False):
+    """
+    Perform a set of anneals by successive halving, yielding each run as it leaves the search.
+    Runs are only compared with runs on the same netlist.
+    :param runs: list[GridRun] - Runs to perform, e.g. from grid_search.build_grid. Checkpoint files are ignored
+    :param num_workers: Maximum number of concurrent worker processes (defaults to the CPU count)
+    :param halving_rate: Keep the best 1/halving_rate of the runs on each netlist at each rung, at least 2
+    :param first_budget: Iterations per run in the first rung, in units of n^(4/3) for a netlist of n cells
+    :param quiet: Discard the console logs of the anneals
+    :return: Generator of GridRun - Runs in the order they leave the search: status "ok" once complete, "stopped"
+             if stopped early (with the cost and iterations at that point), or "error"
+    """
+    if halving_rate < 2:
+        raise ValueError("Halving rate must be at least 2, got " + str(halving_rate))
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+
+    # Budget unit of each netlist, also building each netlist's binary cache once up front
+    units = {}
+    for file_name in sorted(set(run.file_name for run in runs)):
+        try:
+            units[file_name] = netlist.load_cached_netlist(sim_anneal.get_netlist_path(file_name)).num_cells**(4/3)
+        except (OSError, netlist.NetlistError):
+            units[file_name] = 0  # Reported by the runs themselves
+
+    states = {}  # Run -> state to resume it from
+    log_paths = {}  # Run -> path of its run log
+    for run in runs:
+        run.runtime = 0.0
+        states[run] = None
+        log_paths[run] = None
+    searching = list(runs)  # Runs still in the search, in their original order
+    rung_budget = first_budget
+    while searching:
+        # Netlists with few runs left anneal them to completion
+        tasks = []
+        for run in searching:
+            num_left = sum(1 for other in searching if other.file_name == run.file_name)
+            budget = None if num_left <= halving_rate else ceil(rung_budget*units[run.file_name])
+            tasks.append((run, (run, states[run], log_paths[run], budget, quiet)))
+
+        for run, result, _ in workers.iter_pool(_halving_worker, tasks, num_workers):
+            if result[0] != "ok":
+                run.status, run.error = result
+                searching.remove(run)
+                yield run
+                continue
+            _, done, run.final_cost, run.total_iters, runtime, states[run], log_paths[run] = result
+            run.runtime += runtime
+            if done:
+                run.status = "ok"
+                searching.remove(run)
+                yield run
+
+        # Keep the best of the unfinished runs on each netlist
+        for file_name in sorted(set(run.file_name for run in searching)):
+            group = sorted([run for run in searching if run.file_name == file_name], key=lambda run: run.final_cost)
+            for run in group[ceil(len(group)/halving_rate):]:
+                run.status = "stopped"
+                searching.remove(run)
+                states[run] = None
+                yield run
+        rung_budget *= halving_rate
@@ -1,6 +1,5 @@
-import cProfile
-import pstats
-import sim_anneal
+import grid_search
+import halving
 
 # Experimental grid search parameters (do not alter)
 FILE_NAMES = ["alu2.txt", "apex1.txt", "apex4.txt", "C880.txt", "cm138a.txt", "cm150a.txt", "cm151a.txt",
@@ -8,6 +7,14 @@ FILE_NAMES = ["alu2.txt", "apex1.txt", "apex4.txt", "C880.txt", "cm138a.txt", "c
 COOLING_FACTORS = [0.8, 0.85, 0.9]
 INITIAL_TEMP_FACTORS = [10, 20, 30]
 MOVES_PER_TEMP_FACTORS = [25, 50, 75]
+SEEDS = [0]
+
+# Grid search execution parameters
+NUM_WORKERS = None  # Number of parallel anneals, None to use every core
+RUN_TIMEOUT = None  # Maximum runtime of a single anneal in seconds, None for no limit
+SUCCESSIVE_HALVING = False  # Stop the worst runs on each netlist early rather than running every one to completion
+ENGINE = "array"  # Annealing engine for the grid search, see sim_anneal.get_placer_class
+RESULTS_FILE_NAME = "grid_search_results.csv"
 
 # File name for interactive program (with GUI). Edit this to change the netlist being annealed.
 USER_FILE_NAME = "test.txt"
@@ -20,19 +27,20 @@ def main():
     experimental_mode = False
 
     if experimental_mode:
-        profiler = cProfile.Profile()
-        profiler.enable()
-        for file_name in FILE_NAMES:
-            for cooling_factor in COOLING_FACTORS:
-                for initial_temp_factor in INITIAL_TEMP_FACTORS:
-                    for moves_per_temp_factor in MOVES_PER_TEMP_FACTORS:
-                        sim_anneal.quick_anneal(file_name, cooling_factor, initial_temp_factor, moves_per_temp_factor)
-        profiler.disable()
-        stats = pstats.Stats(profiler).sort_stats('cumtime')
-        stats.print_stats()
+        runs = grid_search.build_grid(FILE_NAMES, COOLING_FACTORS, INITIAL_TEMP_FACTORS, MOVES_PER_TEMP_FACTORS,
+                                      SEEDS, ENGINE)
+        if SUCCESSIVE_HALVING:
+            finished_runs = halving.iter_halving_search(runs, NUM_WORKERS)
+        else:
+            finished_runs = grid_search.iter_grid_search(runs, NUM_WORKERS, RUN_TIMEOUT)
+        for run in finished_runs:
+            print("Finished: " + run.file_name + "-" + str(run.cooling_factor) + "-" +
+                  str(run.initial_temp_factor) + "-" + str(run.moves_per_temp_factor) + " (" + run.status + ")")
+        grid_search.write_results_table(runs, RESULTS_FILE_NAME)
         print("end")
     else:
-        sim_anneal.anneal(USER_FILE_NAME)
+        import gui  # Imported here as gui imports Tkinter
+        gui.anneal(USER_FILE_NAME)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+"""
+Micro-benchmarks for the inner loops of the annealing engines.
+Run directly to time swap delta evaluation on the largest benchmarks, both with the engines' cached bounding boxes
+and with a baseline that rescans every pin of every net before and after a temporary swap, as get_swap_delta used to.
+"""
+
+import time
+
+import sim_anneal
+
+BENCH_FILE_NAMES = ["apex4.txt", "pairb.txt"]
+BENCH_ENGINES = ["object", "array"]
+NUM_HIGH_DEGREE_CELLS = 40  # Number of highest-degree cells to swap between
+NUM_REPEATS = 20  # Number of passes over every pair of those cells
+
+
+def full_recompute_swap_delta(placer, cell_a, cell_b) -> float:
+    """
+    Calculate the cost difference of a swap the way get_swap_delta did before nets cached their bounding boxes:
+    collect the nets of both cells without repeats by scanning a list, then rescan every pin of each of them before
+    and after temporarily swapping the cells
+    :return: float - The cost difference
+    """
+    unique_nets = list(placer.get_cell_nets(cell_a))
+    for net_b in placer.get_cell_nets(cell_b):
+        if net_b not in unique_nets:
+            unique_nets.append(net_b)
+    net_hpwl = sim_anneal.hpwl if placer.engine == "object" else placer.net_hpwl
+    starting_cost = sum(net_hpwl(net) for net in unique_nets)
+    _exchange_locations(placer, cell_a, cell_b)
+    final_cost = sum(net_hpwl(net) for net in unique_nets)
+    _exchange_locations(placer, cell_a, cell_b)
+    return final_cost - starting_cost
+
+
+def _exchange_locations(placer, cell_a, cell_b):
+    """
+    Exchange the locations of two cells, leaving the grid and the cached bounding boxes untouched
+    """
+    if placer.engine == "object":
+        cell_a.site, cell_b.site = cell_b.site, cell_a.site
+    else:
+        cell_x = placer.cell_x
+        cell_y = placer.cell_y
+        cell_x[cell_a], cell_x[cell_b] = cell_x[cell_b], cell_x[cell_a]
+        cell_y[cell_a], cell_y[cell_b] = cell_y[cell_b], cell_y[cell_a]
+
+
+def bench_swap_delta(f_name: str, engine="object", num_cells=NUM_HIGH_DEGREE_CELLS, repeats=NUM_REPEATS,
+                     baseline=False) -> float:
+    """
+    Time swap delta evaluation between every pair of the highest-degree cells of a netlist
+    :param f_name: Name of the netlist file
+    :param engine: Placement representation, see sim_anneal.get_placer_class
+    :param num_cells: Number of highest-degree cells to use
+    :param repeats: Number of passes over every pair
+    :param baseline: Time full_recompute_swap_delta instead of the engine's get_swap_delta
+    :return: float - Swap deltas evaluated per second
+    """
+    placer = sim_anneal.get_placer_class(engine)(f_name)
+    placer.initial_placement()
+
+    # Rank cells by the number of nets they belong to
+    if engine == "object":
+        cells = sorted(placer.cell_dict.values(), key=lambda cell: len(cell.nets), reverse=True)[:num_cells]
+    else:
+        cells = sorted(range(placer.num_cells_to_place),
+                       key=lambda cell: placer.cell_net_start[cell+1] - placer.cell_net_start[cell],
+                       reverse=True)[:num_cells]
+
+    if baseline:
+        def get_swap_delta(cell_a, cell_b):
+            return full_recompute_swap_delta(placer, cell_a, cell_b)
+    else:
+        get_swap_delta = placer.get_swap_delta
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for cell_a in cells:
+            for cell_b in cells:
+                if cell_a != cell_b:
+                    get_swap_delta(cell_a, cell_b)
+    elapsed = time.perf_counter() - start
+    return repeats*len(cells)*(len(cells)-1)/elapsed
+
+
+def main():
+    """
+    Report swap delta throughput for each benchmark and engine, with the full-recompute baseline and with the
+    engine's cached bounding boxes
+    """
+    for f_name in BENCH_FILE_NAMES:
+        for engine in BENCH_ENGINES:
+            baseline_rate = bench_swap_delta(f_name, engine, baseline=True)
+            rate = bench_swap_delta(f_name, engine)
+            print(f_name + " " + engine + ": " + str(round(baseline_rate)) + " swap deltas/s full recompute, " +
+                  str(round(rate)) + " swap deltas/s cached (" + str(round(rate/baseline_rate, 2)) + "x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Multilevel Simulated Annealing for large netlists.
+The netlist is coarsened level by level: cells are paired with the unpaired neighbour they share the most
+connection weight with (heavy-edge matching, each net of k cells weighing 1/(k-1) between each pair of its cells,
+normalized by cluster sizes), and every pair becomes one cell of the next level. A net keeps one pin per cluster
+it touches, and nets left inside a single cluster disappear. Each level is placed on a grid scaled to keep the
+original utilization.
+
+The coarsest netlist is annealed as usual. Its placement is then projected onto the next finer level, each cell
+taking the free site nearest the scaled location of its cluster, and that level is refined by annealing from a
+low temperature with a small range window (see Placer.warm_start), down to the original netlist. Refinement levels
+perform a number of moves per temperature in proportion to their number of cells rather than to n^(4/3), as the
+coarser levels have already settled the global structure. Every level is an ordinary placer using the usual
+Net/Cell model (or flat arrays) and HPWL cost.
+
+Example:
+    python multilevel.py ../benchmarks/synthetic-100k.txt -e array
+"""
+
+import argparse
+import random
+import time
+from array import array
+from math import ceil, sqrt
+
+import netlist
+import run_log
+import sim_anneal
+from sim_anneal import COOLING_FACTOR, INITIAL_TEMP_FACTOR, MOVES_PER_TEMP_FACTOR
+
+COARSEST_NUM_CELLS = 150  # Coarsening stops once a level has at most this many cells
+MIN_COARSENING = 0.1  # Coarsening stops once a level would remove less than this fraction of the cells
+MATCHING_MAX_PINS = 16  # Nets with more cells are ignored when matching, as they say little about which cells belong
+MAX_CLUSTER_GROWTH = 3  # A cluster holds at most this many times the average number of original cells per cell
+
+
+def match_cells(circuit: netlist.Netlist, cluster_sizes: list, rng: random.Random) -> (list, list):
+    """
+    Pair up strongly connected cells by heavy-edge matching, visiting cells in random order
+    :param circuit: Netlist to coarsen
+    :param cluster_sizes: list[int] - Number of original cells in each cell of the netlist
+    :param rng: Random number generator deciding the visiting order
+    :return: (list[int], list[int]) - Cluster ID of each cell, number of original cells in each cluster
+    """
+    num_cells = circuit.num_cells
+    net_start = circuit.net_start
+    net_pins = circuit.net_pins
+    cell_net_start, cell_nets = circuit.get_cell_nets()
+    max_size = MAX_CLUSTER_GROWTH * sum(cluster_sizes)/num_cells
+    cluster = [-1] * num_cells
+    new_sizes = []
+    order = list(range(num_cells))
+    rng.shuffle(order)
+    for cell in order:
+        if cluster[cell] >= 0:
+            continue
+        size = cluster_sizes[cell]
+        weights = {}
+        for net in cell_nets[cell_net_start[cell]:cell_net_start[cell+1]]:
+            start = net_start[net]
+            end = net_start[net+1]
+            if end - start < 2 or end - start > MATCHING_MAX_PINS:
+                continue
+            weight = 1/(end-start-1)
+            for other in net_pins[start:end]:
+                if other != cell and cluster[other] < 0 and size + cluster_sizes[other] <= max_size:
+                    weights[other] = weights.get(other, 0) + weight
+        best = -1
+        best_score = 0
+        for other, weight in weights.items():
+            score = weight/cluster_sizes[other]  # Prefer small neighbours, keeping clusters balanced
+            if score > best_score:
+                best = other
+                best_score = score
+        cluster[cell] = len(new_sizes)
+        if best >= 0:
+            cluster[best] = len(new_sizes)
+            new_sizes.append(size + cluster_sizes[best])
+        else:
+            new_sizes.append(size)
+    return cluster, new_sizes
+
+
+def coarsen(circuit: netlist.Netlist, cluster: list, num_clusters: int, original: netlist.Netlist) -> netlist.Netlist:
+    """
+    Build the netlist of the next coarser level
+    :param circuit: Netlist being coarsened
+    :param cluster: list[int] - Cluster ID of each cell, see match_cells
+    :param num_clusters: Number of clusters, the cells of the coarse netlist
+    :param original: Original netlist, whose grid is scaled to keep its utilization
+    :return: Netlist - One cell per cluster, one net per net touching at least two clusters
+    """
+    scale = sqrt(num_clusters/original.num_cells)
+    grid_width = max(1, round(original.grid_width*scale))
+    grid_height = max(1, round(original.grid_height*scale))
+    if grid_width*grid_height < num_clusters:
+        grid_height = ceil(num_clusters/grid_width)
+    net_start = circuit.net_start
+    net_pins = circuit.net_pins
+    coarse_start = array("i", [0])
+    coarse_pins = array("i")
+    for net in range(circuit.num_nets):
+        pins = []
+        seen = set()
+        for cell in net_pins[net_start[net]:net_start[net+1]]:
+            if cluster[cell] not in seen:
+                seen.add(cluster[cell])
+                pins.append(cluster[cell])  # Source first, as the cluster of the original source
+        if len(pins) >= 2:
+            coarse_pins.extend(pins)
+            coarse_start.append(len(coarse_pins))
+    coarse = netlist.Netlist(original.file_name, num_clusters, len(coarse_start)-1, grid_height, grid_width)
+    coarse.net_start = coarse_start
+    coarse.net_pins = coarse_pins
+    return coarse
+
+
+def find_free_site(occupied: list, grid_width: int, grid_height: int, x: int, y: int) -> (int, int):
+    """
+    Find the free site nearest a location, where vertical distance costs double as in HPWL, searching outwards in
+    square rings. Every site of a ring costs at least its radius, so the search goes on past the ring of the first free
+    site until no further ring can hold a cheaper one.
+    :param occupied: list[bool] - Is each site occupied, row-major (y*width+x)
+    :return: (int, int) - x,y of the site
+    """
+    best = None
+    best_distance = None
+    for radius in range(max(grid_width, grid_height)):
+        if best is not None and radius >= best_distance:
+            break
+        for site_y in range(max(y-radius, 0), min(y+radius, grid_height-1)+1):
+            # Whole rows at the top and bottom of the ring, only the two ends of the rows in between
+            if abs(site_y-y) == radius:
+                columns = range(max(x-radius, 0), min(x+radius, grid_width-1)+1)
+            else:
+                columns = [site_x for site_x in (x-radius, x+radius) if 0 <= site_x < grid_width]
+            for site_x in columns:
+                distance = abs(site_x-x) + 2*abs(site_y-y)
+                if not occupied[site_y*grid_width + site_x] and (best is None or distance < best_distance):
+                    best = (site_x, site_y)
+                    best_distance = distance
+    if best is None:
+        raise ValueError("No free site left on the grid")
+    return best
+
+
+def project(coarse_placement: list, cluster: list, coarse: netlist.Netlist, fine: netlist.Netlist) -> list:
+    """
+    Project a placement of a coarse netlist onto the next finer level. Cells are placed cluster by cluster, each on
+    the free site nearest its cluster's location scaled to the finer grid.
+    :param coarse_placement: list[(int, int)] - x,y of each coarse cell, indexed by cluster ID
+    :param cluster: list[int] - Cluster ID of each fine cell
+    :return: list[(int, int)] - x,y of each fine cell, indexed by cell ID
+    """
+    members = [[] for _ in range(coarse.num_cells)]
+    for cell, cluster_id in enumerate(cluster):
+        members[cluster_id].append(cell)
+    scale_x = fine.grid_width/coarse.grid_width
+    scale_y = fine.grid_height/coarse.grid_height
+    occupied = [False] * (fine.grid_width*fine.grid_height)
+    placement = [None] * fine.num_cells
+    for cluster_id, (coarse_x, coarse_y) in enumerate(coarse_placement):
+        target_x = min(int((coarse_x+0.5)*scale_x), fine.grid_width-1)
+        target_y = min(int((coarse_y+0.5)*scale_y), fine.grid_height-1)
+        for cell in members[cluster_id]:
+            x, y = find_free_site(occupied, fine.grid_width, fine.grid_height, target_x, target_y)
+            occupied[y*fine.grid_width + x] = True
+            placement[cell] = (x, y)
+    return placement
+
+
+def build_levels(circuit: netlist.Netlist, seed=0, coarsest_num_cells=COARSEST_NUM_CELLS) -> (list, list):
+    """
+    Coarsen a netlist until it is small enough or stops shrinking
+    :param circuit: Original netlist
+    :param seed: Random seed for matching
+    :param coarsest_num_cells: Coarsening stops once a level has at most this many cells
+    :return: (list[Netlist], list[list[int]]) - Netlist of each level, original first, and the cluster ID of each
+             cell of each level but the coarsest in the next level
+    """
+    rng = random.Random(seed)
+    levels = [circuit]
+    clusters = []
+    cluster_sizes = [1] * circuit.num_cells
+    while levels[-1].num_cells > coarsest_num_cells:
+        cluster, new_sizes = match_cells(levels[-1], cluster_sizes, rng)
+        if len(new_sizes) > (1-MIN_COARSENING)*levels[-1].num_cells:
+            break
+        levels.append(coarsen(levels[-1], cluster, len(new_sizes), circuit))
+        clusters.append(cluster)
+        cluster_sizes = new_sizes
+    return levels, clusters
+
+
+def multilevel_anneal(f_name: str, cooling_factor=COOLING_FACTOR, initial_temp_factor=INITIAL_TEMP_FACTOR,
+                      moves_per_temp_factor=MOVES_PER_TEMP_FACTOR, seed=0, engine="array",
+                      plot_mode=sim_anneal.PLOT_SAVE, schedule="geometric", log_format=run_log.LOG_CSV, log_dir=".",
+                      initial_placer=sim_anneal.INITIAL_RANDOM, coarsest_num_cells=COARSEST_NUM_CELLS):
+    """
+    Anneal a netlist by coarsening it, annealing the coarsest level, then projecting and refining level by level.
+    Only the original netlist's anneal is plotted and logged.
+    :param engine: Placement representation to anneal every level with, see sim_anneal.get_placer_class
+    :param plot_mode: How to output the cost plot, see sim_anneal.PLOT_* constants
+    :param schedule: Annealing schedule, see sim_anneal.get_schedule
+    :param log_format: Format of the per-temperature run log, see run_log.LOG_FORMATS
+    :param log_dir: Directory to write the run log to
+    :param initial_placer: How the coarsest level is placed before annealing, see sim_anneal.INITIAL_PLACERS
+    :param coarsest_num_cells: Coarsening stops once a level has at most this many cells
+    :return: (float, int, float) - final cost, total iterations over all levels, runtime in seconds
+    """
+    print("Running: " + f_name + "-" + str(cooling_factor) + "-" + str(initial_temp_factor) + "-" +
+          str(moves_per_temp_factor) + " multilevel")
+    start = time.time()
+    levels, clusters = build_levels(netlist.load_cached_netlist(sim_anneal.get_netlist_path(f_name)), seed,
+                                    coarsest_num_cells)
+    print("Levels: " + ", ".join(str(level.num_cells) for level in levels) + " cells")
+    placer_class = sim_anneal.get_placer_class(engine)
+
+    total_iters = 0
+    placement = None
+    coarsest_num_cells = levels[-1].num_cells
+    for level in range(len(levels)-1, -1, -1):
+        circuit = levels[level]
+        finest = level == 0
+        # Refinement levels perform moves_per_temp_factor * n * m^(1/3) moves per temperature rather than
+        # moves_per_temp_factor * n^(4/3), where m is the number of cells of the coarsest level. Rounded, as the
+        # factor is part of the run's name
+        level_moves_factor = round(moves_per_temp_factor * (coarsest_num_cells/circuit.num_cells)**(1/3), 2)
+        placer = placer_class(f_name, cooling_factor, initial_temp_factor, level_moves_factor, seed,
+                              plot_mode=plot_mode if finest else sim_anneal.PLOT_NONE, schedule=schedule,
+                              log_format=log_format if finest else run_log.LOG_NONE, log_dir=log_dir,
+                              initial_placer=initial_placer, circuit=circuit)
+        if placement is None:
+            placer.initial_placement()
+        else:
+            placer.initial_placement(project(placement, clusters[level], levels[level+1], circuit))
+        placer.sa_to_completion()
+        print("Level " + str(level) + " (" + str(circuit.num_cells) + " cells) cost: " + str(placer.current_cost))
+        total_iters += placer.total_iters
+        placement = placer.get_placement()
+
+    elapsed = time.time() - start
+    print("Final cost: " + str(placer.current_cost))
+    print("Total iterations: " + str(total_iters))
+    print("Took " + str(elapsed) + "s")
+    placer.wait_for_output()
+    return placer.current_cost, total_iters, elapsed
+
+
+def main():
+    """
+    Run a multilevel anneal on a single netlist from the command line
+    """
+    parser = argparse.ArgumentParser(description="Anneal a netlist by coarsening, annealing and refining it.")
+    parser.add_argument("netlist", help="benchmark name or path to a netlist file")
+    parser.add_argument("-c", "--cooling", type=float, default=COOLING_FACTOR, help="cooling factor")
+    parser.add_argument("-t", "--initial-temp", type=float, default=INITIAL_TEMP_FACTOR,
+                        help="initial temperature factor")
+    parser.add_argument("-m", "--moves", type=float, default=MOVES_PER_TEMP_FACTOR, help="moves per temperature factor")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    parser.add_argument("-e", "--engine", default="array", help="annealing engine")
+    parser.add_argument("--coarsest", type=int, default=COARSEST_NUM_CELLS,
+                        help="stop coarsening once a level has at most this many cells")
+    parser.add_argument("--run-log", choices=run_log.LOG_FORMATS, default=run_log.LOG_CSV,
+                        help="format of the per-temperature run log of the original netlist")
+    args = parser.parse_args()
+    multilevel_anneal(args.netlist, args.cooling, args.initial_temp, args.moves, args.seed, args.engine,
+                      log_format=args.run_log, coarsest_num_cells=args.coarsest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Netlist file parsing.
+A netlist file starts with a header line "<cells> <nets> <rows> <columns>", followed by one line per net giving
+the number of cells in the net, then the ID of its source cell and the IDs of its sink cells. A cell may appear in
+a net only once. Cells on no net are allowed, with a warning, as they still take up a site.
+Blank lines are ignored. Files are memory-mapped and parsed line by line straight into flat integer arrays.
+
+Parsed netlists can be cached in a binary file holding a fixed header followed by the raw int32 arrays.
+Cached netlists are memory-mapped and their arrays used in place, without tokenizing or copying.
+A cache file is rebuilt whenever its source file's size and modification time or content hash change. If only the
+modification time changed, the cache is kept and the new time written to its header, so the file is not hashed again.
+The header also records which warnings parsing raised, so they are raised again whenever the cache is loaded.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import warnings
+from array import array
+
+CACHE_DIR_NAME = ".netlist_cache"  # Directory created next to each netlist to hold its binary cache
+CACHE_MAGIC = b"NLCACHE3"  # Identifies a cache file and its format version, or the checks its netlist passed
+# Magic, source size, source mtime (ns), source SHA-1, cells, declared nets, rows, columns, nets, pins, warnings
+CACHE_HEADER = struct.Struct("=8sqq20s7q")
+CACHE_MTIME_OFFSET = 16  # Offset of the source mtime in the cache header
+WARN_NET_COUNT = 1  # Warning flag: the number of nets differs from the header
+WARN_NETLESS_CELLS = 2  # Warning flag: some cells are on no net
+
+
+class NetlistError(Exception):
+    """
+    A netlist file that could not be parsed, pointing at the offending line where there is one
+    """
+    def __init__(self, file_name: str, message: str, line_number=None):
+        self.file_name = file_name  # Path of the netlist file
+        self.message = message  # Description of the problem
+        self.line_number = line_number  # 1-based line number of the problem, None if not tied to a line
+        location = file_name if line_number is None else file_name + ":" + str(line_number)
+        super().__init__(location + ": " + message)
+
+
+class Netlist:
+    """
+    A parsed netlist, with the pins of every net stored in flat integer arrays.
+    The pins of net n are net_pins[net_start[n]:net_start[n+1]], source first.
+    """
+    def __init__(self, file_name: str, num_cells: int, num_declared_nets: int, grid_height: int, grid_width: int):
+        self.file_name = file_name  # Path of the netlist file
+        self.num_cells = num_cells  # Number of cells to be placed
+        self.num_declared_nets = num_declared_nets  # Number of nets stated in the header
+        self.grid_height = grid_height  # Number of rows of placement sites
+        self.grid_width = grid_width  # Number of columns of placement sites
+        self.net_start = array("i", [0])  # Index into net_pins of each net's first pin, plus a final end index
+        self.net_pins = array("i")  # Cell ID of every pin, net by net, source first
+        self.cell_net_start = None  # Index into cell_nets of each cell's first net, plus a final end index
+        self.cell_nets = None  # Net ID of every net of every cell, cell by cell
+        self.buffer = None  # Memory map backing the arrays, if loaded from a cache file
+        self.warning_flags = 0  # WARN_* flags of the warnings raised about the netlist
+
+    @property
+    def num_nets(self) -> int:
+        """
+        :return: int - Number of nets actually present in the file
+        """
+        return len(self.net_start) - 1
+
+    def cell_net_lists(self) -> list:
+        """
+        Invert the netlist
+        :return: list[list[int]] - IDs of the nets of each cell, in net order
+        """
+        cell_net_lists = [[] for _ in range(self.num_cells)]
+        net_start = self.net_start
+        net_pins = self.net_pins
+        for net in range(self.num_nets):
+            for cell in net_pins[net_start[net]:net_start[net+1]]:
+                cell_net_lists[cell].append(net)
+        return cell_net_lists
+
+    def get_cell_nets(self):
+        """
+        Get the nets of every cell in flat arrays, computing them on first use.
+        The nets of cell c are cell_nets[cell_net_start[c]:cell_net_start[c+1]].
+        :return: (sequence of int, sequence of int) - cell_net_start, cell_nets
+        """
+        if self.cell_nets is None:
+            cell_net_start = array("i", [0])
+            cell_nets = array("i")
+            for net_list in self.cell_net_lists():
+                cell_nets.extend(net_list)
+                cell_net_start.append(len(cell_nets))
+            self.cell_net_start = cell_net_start
+            self.cell_nets = cell_nets
+        return self.cell_net_start, self.cell_nets
+
+
+def load_netlist(path: str, stacklevel=1) -> Netlist:
+    """
+    Parse a netlist file
+    :param path: Path to the netlist file
+    :param stacklevel: Stack level of warnings about the netlist, relative to the caller of this function
+    :return: Netlist
+    :raises NetlistError: if the file is malformed or inconsistent with its header
+    """
+    with open(path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            raise NetlistError(path, "file is empty")
+        with data:
+            return parse_netlist(iter(data.readline, b""), path, stacklevel+1)
+
+
+def parse_netlist(lines, file_name="<netlist>", stacklevel=1) -> Netlist:
+    """
+    Parse the lines of a netlist, checking every pin against the header
+    :param lines: Iterable of bytes - Lines of the netlist file
+    :param file_name: Name to report in errors
+    :param stacklevel: Stack level of warnings about the netlist, relative to the caller of this function
+    :return: Netlist
+    :raises NetlistError: if the netlist is malformed or inconsistent with its header
+    """
+    lines = iter(lines)
+
+    # Header
+    header = next(lines, b"").split()
+    try:
+        header_values = [int(token) for token in header]
+    except ValueError:
+        raise NetlistError(file_name, "header must be integers '<cells> <nets> <rows> <columns>'", 1)
+    if len(header_values) != 4:
+        raise NetlistError(file_name, "header must be '<cells> <nets> <rows> <columns>', got " +
+                           str(len(header_values)) + " values", 1)
+    num_cells, num_declared_nets, grid_height, grid_width = header_values
+    if num_cells < 0 or num_declared_nets < 0 or grid_height < 1 or grid_width < 1:
+        raise NetlistError(file_name, "header values out of range", 1)
+    if num_cells > grid_height*grid_width:
+        raise NetlistError(file_name, "not enough sites (" + str(grid_height*grid_width) + ") for " +
+                           str(num_cells) + " cells", 1)
+    circuit = Netlist(file_name, num_cells, num_declared_nets, grid_height, grid_width)
+
+    # Nets
+    net_start = circuit.net_start
+    net_pins = circuit.net_pins
+    for line_number, line in enumerate(lines, 2):
+        tokens = line.split()
+        if not tokens:
+            continue
+        try:
+            values = list(map(int, tokens))
+        except ValueError:
+            raise NetlistError(file_name, "net line contains a non-integer token", line_number)
+        num_pins = values[0]
+        if num_pins < 1:
+            raise NetlistError(file_name, "net must contain at least one cell, got " + str(num_pins), line_number)
+        if len(values) - 1 != num_pins:
+            raise NetlistError(file_name, "net declares " + str(num_pins) + " cells but lists " +
+                               str(len(values) - 1), line_number)
+        del values[0]
+        if min(values) < 0 or max(values) >= num_cells:
+            bad_cell = min(values) if min(values) < 0 else max(values)
+            raise NetlistError(file_name, "cell ID " + str(bad_cell) + " out of range for " + str(num_cells) +
+                               " cells", line_number)
+        if len(set(values)) != num_pins:
+            # Bounding box updates count the pins of a net on each edge, so a cell listed twice would be counted twice
+            repeated_cell = next(cell for cell in values if values.count(cell) > 1)
+            raise NetlistError(file_name, "cell ID " + str(repeated_cell) + " appears more than once in the net",
+                               line_number)
+        net_pins.extend(values)
+        net_start.append(len(net_pins))
+
+    circuit.warning_flags = warn_about_netlist(circuit, stacklevel+1)
+    return circuit
+
+
+def warn_about_netlist(circuit: Netlist, stacklevel=1) -> int:
+    """
+    Warn about a netlist with a different number of nets than its header declares, or with cells on no net.
+    Neither is fatal.
+    :param stacklevel: Stack level of the warnings, relative to the caller of this function
+    :return: int - WARN_* flags of the warnings raised
+    """
+    flags = 0
+    if circuit.num_nets != circuit.num_declared_nets:
+        # The header count is informational (test.txt declares 20 nets but lists 5)
+        warnings.warn(circuit.file_name + " declares " + str(circuit.num_declared_nets) + " nets but contains " +
+                      str(circuit.num_nets), stacklevel=stacklevel+1)
+        flags |= WARN_NET_COUNT
+    connected_cells = set(circuit.net_pins)
+    if len(connected_cells) != circuit.num_cells:
+        netless_cell = next(cell for cell in range(circuit.num_cells) if cell not in connected_cells)
+        warnings.warn(circuit.file_name + " has " + str(circuit.num_cells-len(connected_cells)) +
+                      " cells on no net (e.g. cell " + str(netless_cell) +
+                      "), which are placed but do not affect the cost", stacklevel=stacklevel+1)
+        flags |= WARN_NETLESS_CELLS
+    return flags
+
+
+def get_cache_path(path: str) -> str:
+    """
+    Get the path of the binary cache file of a netlist
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME,
+                        os.path.basename(path) + ".bin")
+
+
+def load_cached_netlist(path: str, stacklevel=1) -> Netlist:
+    """
+    Load a netlist from its binary cache, parsing the text file and writing the cache if it is missing or stale.
+    Falls back to parsing without caching if the cache directory cannot be written.
+    :param path: Path to the netlist text file
+    :param stacklevel: Stack level of warnings about the netlist, relative to the caller of this function
+    :return: Netlist
+    :raises NetlistError: if the text file has to be parsed and is malformed
+    """
+    cache_path = get_cache_path(path)
+    stat = os.stat(path)
+    try:
+        circuit = read_cache(cache_path, path, stat, stacklevel+1)
+    except OSError:
+        circuit = None
+    if circuit is not None:
+        return circuit
+
+    circuit = load_netlist(path, stacklevel+1)
+    try:
+        write_cache(circuit, cache_path, stat)
+    except OSError:
+        pass
+    return circuit
+
+
+def _file_sha1(path: str) -> bytes:
+    """
+    :return: bytes - SHA-1 digest of a file's contents
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+
+def read_cache(cache_path: str, source_path: str, source_stat: os.stat_result, stacklevel=1):
+    """
+    Attach to a binary netlist cache file. The returned arrays are views into a read-only memory map.
+    Raises the warnings recorded when the netlist was parsed again, and records the source's modification time if
+    only that changed.
+    :param source_stat: Current status of the source text file, for checking the cache is up to date
+    :param stacklevel: Stack level of warnings about the netlist, relative to the caller of this function
+    :return: Netlist, or None if the cache is stale or not a cache file
+    """
+    with open(cache_path, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None
+    if len(data) < CACHE_HEADER.size:
+        data.close()
+        return None
+    magic, size, mtime_ns, sha1, num_cells, num_declared_nets, grid_height, grid_width, num_nets, num_pins, \
+        warning_flags = CACHE_HEADER.unpack_from(data)
+    expected_length = CACHE_HEADER.size + 4*(num_nets+1 + num_pins + num_cells+1 + num_pins)
+    if magic != CACHE_MAGIC or len(data) != expected_length or size != source_stat.st_size or \
+            (mtime_ns != source_stat.st_mtime_ns and sha1 != _file_sha1(source_path)):
+        data.close()
+        return None
+    if mtime_ns != source_stat.st_mtime_ns:
+        # Same content, e.g. the file was touched or checked out again. Best effort, the hash still guards the cache
+        try:
+            with open(cache_path, "r+b") as f:
+                f.seek(CACHE_MTIME_OFFSET)
+                f.write(struct.pack("=q", source_stat.st_mtime_ns))
+        except OSError:
+            pass
+
+    circuit = Netlist(source_path, num_cells, num_declared_nets, grid_height, grid_width)
+    circuit.buffer = data
+    view = memoryview(data)
+    offset = CACHE_HEADER.size
+    arrays = []
+    for length in (num_nets+1, num_pins, num_cells+1, num_pins):
+        arrays.append(view[offset:offset + 4*length].cast("i"))
+        offset += 4*length
+    circuit.net_start, circuit.net_pins, circuit.cell_net_start, circuit.cell_nets = arrays
+    if warning_flags:
+        circuit.warning_flags = warn_about_netlist(circuit, stacklevel+1)
+    return circuit
+
+
+def write_cache(circuit: Netlist, cache_path: str, source_stat: os.stat_result):
+    """
+    Write a binary netlist cache file.
+    The file is written under a temporary name and then renamed, so concurrent readers never see a partial file.
+    :param source_stat: Status of the source text file when it was parsed
+    """
+    cell_net_start, cell_nets = circuit.get_cell_nets()
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = cache_path + "." + str(os.getpid()) + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, source_stat.st_size, source_stat.st_mtime_ns,
+                                  _file_sha1(circuit.file_name), circuit.num_cells, circuit.num_declared_nets,
+                                  circuit.grid_height, circuit.grid_width, circuit.num_nets,
+                                  len(circuit.net_pins), circuit.warning_flags))
+        for values in (circuit.net_start, circuit.net_pins, cell_net_start, cell_nets):
+            f.write(array("i", values).tobytes())
+    os.replace(temp_path, cache_path)
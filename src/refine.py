@@ -0,0 +1,149 @@
+"""
+Greedy refinement run at the end of an anneal.
+Every cell's best improving move is kept in a priority queue ordered by gain. The best move is taken, and the cells
+on the nets of the moved cells are re-evaluated. A move can also open up a move for a cell on none of those nets,
+e.g. by vacating a site in its search box, so once the queue is empty every cell is swept again, until a sweep finds
+no improving move.
+
+A cell's wirelength is a separable convex function of its location, smallest anywhere in its optimal region: the
+median box of the bounding boxes of its nets without the cell. A cell is therefore only searched over the box
+between its location and its optimal region (plus a margin), rather than the whole window around it. The search
+never reaches further than GREEDY_WINDOW sites from the cell, like the original single pass.
+
+Refinement only uses the placer's delta, move and swap methods plus the helpers get_cell, get_cell_id,
+get_cell_location, get_net_bounds_without, get_cell_nets and get_net_cell_ids, so the object and array engines refine
+identically.
+"""
+
+import heapq
+
+GREEDY_WINDOW = 19  # Largest offset searched from a cell's location, in either direction
+GREEDY_MARGIN = 3  # Number of sites searched beyond the box between a cell and its optimal region
+
+
+def get_optimal_region(bounds: list) -> (int, int, int, int):
+    """
+    Find the locations minimizing a cell's wirelength: the median of the bounding box edges of its nets in each
+    dimension
+    :param bounds: list[(int, int, int, int)] - min_x, max_x, min_y, max_y of each net of the cell, without the cell
+    :return: (int, int, int, int) - min_x, max_x, min_y, max_y of the optimal region
+    """
+    num_nets = len(bounds)
+    edges_x = sorted([net_bounds[0] for net_bounds in bounds] + [net_bounds[1] for net_bounds in bounds])
+    edges_y = sorted([net_bounds[2] for net_bounds in bounds] + [net_bounds[3] for net_bounds in bounds])
+    return edges_x[num_nets-1], edges_x[num_nets], edges_y[num_nets-1], edges_y[num_nets]
+
+
+def find_best_move(placer, cell, margin=GREEDY_MARGIN, window=GREEDY_WINDOW):
+    """
+    Find a cell's most improving move, searching the box between its location and its optimal region
+    :param cell: Cell, in the placer's representation
+    :return: (float, int, int) - cost difference, x, y of the best move, None if no move improves the cost
+    """
+    x, y = placer.get_cell_location(cell)
+    bounds = placer.get_net_bounds_without(cell)
+    if not bounds:
+        return None
+    region_min_x, region_max_x, region_min_y, region_max_y = get_optimal_region(bounds)
+    if region_min_x <= x <= region_max_x and region_min_y <= y <= region_max_y:
+        # Already optimal for its own nets, any move away could only pay off through the cell it swaps with
+        search_margin = 0
+    else:
+        search_margin = margin
+    min_x = max(min(x, region_min_x) - search_margin, x - window, 0)
+    max_x = min(max(x, region_max_x) + search_margin, x + window, placer.grid_width - 1)
+    min_y = max(min(y, region_min_y) - search_margin, y - window, 0)
+    max_y = min(max(y, region_max_y) + search_margin, y + window, placer.grid_height - 1)
+
+    get_occupant = placer.get_occupant
+    best = None
+    best_delta = 0
+    for search_x in range(min_x, max_x+1):
+        for search_y in range(min_y, max_y+1):
+            if search_x == x and search_y == y:
+                continue
+            occupant = get_occupant(search_x, search_y)
+            if occupant is not None:
+                delta = placer.get_swap_delta(cell, occupant)
+            else:
+                delta = placer.get_move_delta(cell, search_x, search_y)
+            if delta < best_delta:
+                best_delta = delta
+                best = (delta, search_x, search_y)
+    return best
+
+
+def refine(placer, margin=GREEDY_MARGIN, window=GREEDY_WINDOW) -> int:
+    """
+    Take improving moves, best first, until a sweep over every cell finds no improving move within its search box
+    :param placer: Placer to refine in place
+    :param margin: Number of sites searched beyond the box between a cell and its optimal region
+    :param window: Largest offset searched from a cell's location
+    :return: int - Number of moves taken
+    """
+    num_cells = placer.num_cells_to_place
+    version = [0] * num_cells  # Incremented whenever a cell's queued move may have gone stale
+    num_moves = 0
+    while True:
+        # Sweep every cell. Sweeps after the first catch moves opened up by a commit away from the cell's nets, e.g.
+        # a site vacated or taken within its search box
+        queue = []  # (cost difference, cell ID, version, x, y) of each cell's best move
+        for cell_id in range(num_cells):
+            version[cell_id] += 1
+            best = find_best_move(placer, placer.get_cell(cell_id), margin, window)
+            if best is not None:
+                queue.append((best[0], cell_id, version[cell_id], best[1], best[2]))
+        if not queue:
+            return num_moves
+        heapq.heapify(queue)
+        num_moves += take_moves(placer, queue, version, margin, window)
+
+
+def take_moves(placer, queue: list, version: list, margin: int, window: int) -> int:
+    """
+    Take queued moves, best first, re-evaluating the cells of the nets of every moved cell, until the queue is empty
+    :param queue: list[(float, int, int, int, int)] - Heap of the cost difference, cell ID, version, x, y of each
+                  cell's best move
+    :param version: list[int] - Current version of each cell's queued move, queued moves of older versions are stale
+    :return: int - Number of moves taken
+    """
+    num_moves = 0
+    while queue:
+        delta, cell_id, cell_version, x, y = heapq.heappop(queue)
+        if cell_version != version[cell_id]:
+            continue  # Superseded by a later evaluation
+        cell = placer.get_cell(cell_id)
+        # The target site may have changed hands since the move was queued, so check the move still holds
+        occupant = placer.get_occupant(x, y)
+        if occupant is not None:
+            current_delta = placer.get_swap_delta(cell, occupant)
+        else:
+            current_delta = placer.get_move_delta(cell, x, y)
+        if current_delta != delta:
+            version[cell_id] += 1
+            best = find_best_move(placer, cell, margin, window)
+            if best is not None:
+                heapq.heappush(queue, (best[0], cell_id, version[cell_id], best[1], best[2]))
+            continue
+
+        nets = list(placer.get_cell_nets(cell))
+        dirty_ids = {cell_id}
+        if occupant is not None:
+            nets += placer.get_cell_nets(occupant)
+            dirty_ids.add(placer.get_cell_id(occupant))
+        if occupant is not None:
+            placer.swap(cell, occupant, delta)
+        else:
+            placer.move(cell, x, y, delta)
+        num_moves += 1
+
+        # Re-evaluate the cells of every net of the moved cells, as a move can change a net's edge pin counts without
+        # changing its bounding box. In ID order so that ties break the same way every time
+        for net in nets:
+            dirty_ids.update(placer.get_net_cell_ids(net))
+        for dirty_id in sorted(dirty_ids):
+            version[dirty_id] += 1
+            best = find_best_move(placer, placer.get_cell(dirty_id), margin, window)
+            if best is not None:
+                heapq.heappush(queue, (best[0], dirty_id, version[dirty_id], best[1], best[2]))
+    return num_moves
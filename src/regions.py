@@ -0,0 +1,194 @@
+"""
+Domain-decomposed parallel Simulated Annealing.
+Once the range window has shrunk enough for most moves to be local, the placement grid is cut into disjoint strips,
+and worker processes anneal ranged moves inside their own strip at the same time. Cells and target sites never
+leave a strip, so workers never move the same cell; a worker only sees other strips' cells at their positions from
+the start of the temperature. After every temperature the master gathers the moved cells, recomputes the exact HPWL
+and updates the schedule, then cuts new strips of nearly equal length, alternating between columns and rows so that
+cells can cross any boundary over time.
+"""
+
+import random
+import time
+from math import exp, ceil
+
+import run_log
+import sim_anneal
+import workers
+from array_placer import ArrayPlacer
+from sim_anneal import COOLING_FACTOR, INITIAL_TEMP_FACTOR, MOVES_PER_TEMP_FACTOR, COST_TRANSITION_RATIO
+
+DEFAULT_NUM_REGIONS = 4  # Default number of strips, one worker process each
+
+
+def anneal_region(placer: ArrayPlacer, rng: random.Random, axis: int, low: int, high: int, num_moves: int) -> int:
+    """
+    Perform ranged moves at the placer's temperature, keeping cells and targets within a strip of the grid
+    :param axis: 0 if the strip is a range of columns, 1 if it is a range of rows
+    :param low: First column/row of the strip
+    :param high: One past the last column/row of the strip
+    :param num_moves: Number of moves to attempt
+    :return: int - Number of accepted moves
+    """
+    cell_x = placer.cell_x
+    cell_y = placer.cell_y
+    site_occupant = placer.site_occupant
+    grid_width = placer.grid_width
+    half_length = placer.range_window_half_length
+    if axis == 0:
+        min_x_bound, max_x_bound = low, high-1
+        min_y_bound, max_y_bound = 0, placer.grid_height-1
+    else:
+        min_x_bound, max_x_bound = 0, grid_width-1
+        min_y_bound, max_y_bound = low, high-1
+
+    # Cells inside the strip
+    cells = []
+    for y in range(min_y_bound, max_y_bound+1):
+        for x in range(min_x_bound, max_x_bound+1):
+            occupant = site_occupant[y*grid_width + x]
+            if occupant >= 0:
+                cells.append(occupant)
+    num_cells = len(cells)
+    if num_cells == 0 or (max_x_bound-min_x_bound+1)*(max_y_bound-min_y_bound+1) < 2:
+        return 0
+
+    draw = rng.random
+    acceptance_table = placer.get_acceptance_table()
+    acceptances = 0
+    for _ in range(num_moves):
+        # Pick a random cell and a target in its range window, clipped to the strip, other than its own site
+        cell_a = cells[int(draw()*num_cells)]
+        x = cell_x[cell_a]
+        y = cell_y[cell_a]
+        min_x = max(x-half_length, min_x_bound)
+        min_y = max(y-half_length, min_y_bound)
+        window_width = min(x+half_length, max_x_bound) - min_x + 1
+        site = int(draw()*(window_width*(min(y+half_length, max_y_bound) - min_y + 1) - 1))
+        if site >= (y-min_y)*window_width + x-min_x:
+            site += 1
+        target_x = min_x + site % window_width
+        target_y = min_y + site // window_width
+
+        cell_b = site_occupant[target_y*grid_width + target_x]
+        if cell_b >= 0:
+            delta = placer.get_swap_delta(cell_a, cell_b)
+        else:
+            delta = placer.get_move_delta(cell_a, target_x, target_y)
+
+        if delta <= 0:
+            accept = True
+        elif delta < len(acceptance_table):
+            accept = draw() < acceptance_table[delta]
+        else:
+            accept = draw() < exp(-1*delta/placer.sa_temp)
+        if accept:
+            acceptances += 1
+            if cell_b >= 0:
+                placer.swap(cell_a, cell_b, delta)
+            else:
+                placer.move(cell_a, target_x, target_y, delta)
+    return acceptances
+
+
+def _region_worker(f_name: str, seed: int, conn):
+    """
+    Worker process body: hold a copy of the placement and anneal the strips it is sent
+    """
+    try:
+        placer = ArrayPlacer(f_name, plot_mode=sim_anneal.PLOT_NONE)
+        rng = random.Random(seed)
+        while True:
+            command = conn.recv()
+            if command[0] != "region":
+                break
+            _, placement, temperature, half_length, axis, low, high, num_moves = command
+            placer.set_placement(placement)
+            placer.sa_temp = temperature
+            placer.range_window_half_length = half_length
+            acceptances = anneal_region(placer, rng, axis, low, high, num_moves)
+            moved = [(cell, placer.cell_x[cell], placer.cell_y[cell]) for cell, (x, y) in enumerate(placement)
+                     if placer.cell_x[cell] != x or placer.cell_y[cell] != y]
+            conn.send(("ok", moved, acceptances))
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    conn.close()
+
+
+def get_strips(placer: ArrayPlacer, rng: random.Random, axis: int, num_regions: int) -> list:
+    """
+    Cut the grid into strips whose lengths differ by at most one, with the longer strips at random positions
+    :param axis: 0 to cut into ranges of columns, 1 for ranges of rows
+    :return: list[(int, int)] - First and one-past-last column/row of each strip
+    """
+    length = placer.grid_width if axis == 0 else placer.grid_height
+    phase = rng.randrange(num_regions)
+    cuts = [(strip*length + phase) // num_regions for strip in range(num_regions+1)]
+    return [(cuts[strip], cuts[strip+1]) for strip in range(num_regions)]
+
+
+def region_anneal(f_name: str, num_regions=DEFAULT_NUM_REGIONS, cooling_factor=COOLING_FACTOR,
+                  initial_temp_factor=INITIAL_TEMP_FACTOR, moves_per_temp_factor=MOVES_PER_TEMP_FACTOR, seed=0,
+                  plot_mode=sim_anneal.PLOT_SAVE, schedule="geometric", log_format=run_log.LOG_CSV, log_dir="."):
+    """
+    Anneal a netlist, spreading each temperature's moves across strips of the grid once moves are local.
+    Temperatures are explored serially while moves are global or the range window is wider than a strip.
+    :param num_regions: Number of strips (and worker processes)
+    :param plot_mode: How to output the cost plot, see sim_anneal.PLOT_* constants
+    :param schedule: Annealing schedule, see sim_anneal.get_schedule
+    :param log_format: Format of the per-temperature run log, see run_log.LOG_FORMATS
+    :param log_dir: Directory to write the run log to
+    :return: (float, int, float) - final cost, total iterations, runtime in seconds
+    """
+    print("Running: " + f_name + "-" + str(cooling_factor) + "-" + str(initial_temp_factor) + "-" +
+          str(moves_per_temp_factor) + " over " + str(num_regions) + " regions")
+    placer = ArrayPlacer(f_name, cooling_factor, initial_temp_factor, moves_per_temp_factor, seed,
+                         plot_mode=plot_mode, schedule=schedule, log_format=log_format, log_dir=log_dir)
+    placer.initial_placement()
+    rng = random.Random(seed)
+    min_strip_length = min(placer.grid_width, placer.grid_height) // num_regions
+
+    start = time.time()
+    conns = []
+    processes = []
+    try:
+        for region in range(num_regions):
+            conn, process = workers.start_worker(_region_worker, (f_name, seed+1+region), duplex=True)
+            conns.append(conn)
+            processes.append(process)
+
+        axis = 0
+        while not placer.placement_done:
+            if placer.prev_temp_cost_ratio >= COST_TRANSITION_RATIO or \
+                    2*placer.range_window_half_length + 1 > min_strip_length:
+                # Explore this temperature serially
+                num_temps = len(placer.temperature_history)
+                while len(placer.temperature_history) == num_temps and not placer.placement_done:
+                    placer.sa_step()
+                continue
+
+            # Explore this temperature in parallel strips
+            placement = placer.get_placement()
+            moves_per_region = ceil(placer.iters_per_temp/num_regions)
+            for conn, (low, high) in zip(conns, get_strips(placer, rng, axis, num_regions)):
+                conn.send(("region", placement, placer.sa_temp, placer.range_window_half_length, axis, low, high,
+                           moves_per_region))
+            for conn, process in zip(conns, processes):
+                moved, acceptances = workers.receive_ok(conn, process, "region worker")
+                for cell, x, y in moved:
+                    placement[cell] = (x, y)
+                placer.acceptances_this_temp += acceptances
+            placer.set_placement(placement)
+            placer.iters_this_temp = moves_per_region*num_regions
+            placer.update_temperature()
+            axis = 1 - axis
+
+        for conn in conns:
+            conn.send(("stop",))
+    finally:
+        workers.stop_workers(conns, processes)
+
+    elapsed = time.time() - start
+    print("Took " + str(elapsed) + "s")
+    placer.wait_for_output()
+    return placer.current_cost, placer.total_iters, elapsed
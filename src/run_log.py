@@ -0,0 +1,83 @@
+"""
+Streaming per-temperature logs of single anneals.
+A run log receives one record per temperature as the anneal progresses, plus records for the initial placement and
+the greedy final step. Every record is flushed as soon as it is written and nothing is buffered, so a run that
+crashes or is killed keeps everything logged so far. Records are CSV rows under a header row, one column per field,
+or JSON objects on separate lines.
+Log files are named after the run's hyperparameters, netlist, seed, start time and process ID, and are never
+overwritten, so parallel and repeated runs each get their own file. A run continued in another process can reopen
+its log to append to it.
+"""
+
+import csv
+import json
+import os
+import time
+
+LOG_CSV = "csv"  # Header row, then one CSV row per record
+LOG_JSONL = "jsonl"  # One JSON object per line
+LOG_NONE = "none"  # No log
+LOG_FORMATS = [LOG_CSV, LOG_JSONL, LOG_NONE]
+LOG_FIELDS = ["step", "total_iters", "temperature", "cost", "acceptances", "timestamp"]
+
+
+class RunLog:
+    """
+    An append-only log file receiving one record per temperature of an anneal
+    """
+    def __init__(self, path: str, log_format: str, append=False):
+        """
+        :param path: Path of the log file, which must not exist yet unless appending
+        :param log_format: LOG_CSV or LOG_JSONL
+        :param append: Append to an existing log file of the same format rather than creating one
+        :raises FileExistsError: if the file already exists and is not being appended to
+        """
+        if log_format not in (LOG_CSV, LOG_JSONL):
+            raise ValueError("Unknown run log format: " + str(log_format))
+        self.path = path  # Path of the log file
+        self.log_format = log_format  # LOG_CSV or LOG_JSONL
+        # Exclusive creation unless appending, so another run's log is never clobbered
+        self.file = open(path, "a" if append else "x", newline="")
+        self.writer = None  # CSV writer, if writing CSV
+        if log_format == LOG_CSV:
+            self.writer = csv.DictWriter(self.file, fieldnames=LOG_FIELDS)
+            if not append:
+                self.writer.writeheader()
+                self.file.flush()
+
+    def write(self, record: dict):
+        """
+        Append a record and flush it to the file
+        :param record: dict - Field name to value, see LOG_FIELDS
+        """
+        if self.writer is not None:
+            self.writer.writerow(record)
+        else:
+            self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        """
+        Close the log file
+        """
+        self.file.close()
+
+
+def open_run_log(log_dir: str, base_name: str, log_format: str) -> RunLog:
+    """
+    Create a new log file for a run, named from a base name, the current time and the process ID.
+    A numeric suffix is added in the unlikely case that the name is already taken.
+    :param log_dir: Directory to create the file in
+    :param base_name: Start of the file name, e.g. hyperparameters, netlist and seed
+    :param log_format: LOG_CSV or LOG_JSONL
+    :return: RunLog
+    """
+    stem = os.path.join(log_dir, base_name + "-" + time.strftime("%Y%m%d-%H%M%S") + "-" + str(os.getpid()))
+    suffix = ""
+    attempt = 0
+    while True:
+        try:
+            return RunLog(stem + suffix + "." + log_format, log_format)
+        except FileExistsError:
+            attempt += 1
+            suffix = "-" + str(attempt)
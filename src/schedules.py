@@ -0,0 +1,110 @@
+"""
+Annealing schedules.
+A schedule decides how many moves are performed at each temperature, how the range window and temperature change
+between temperatures, and when to stop. Placers hold one schedule instance each, see sim_anneal.get_schedule.
+"""
+
+from sim_anneal import COST_TRANSITION_RATIO, COST_EXIT_RATIO, TEMP_EXIT_RATIO
+
+# Adaptive schedule parameters
+TARGET_ACCEPTANCE_RATE = 0.44  # Acceptance rate the range window is steered towards
+ADAPTIVE_EXIT_FACTOR = 0.005  # Stop once the temperature falls below this fraction of the average cost per net
+STAGNATION_RATIO = 0.005  # Minimum relative improvement of the best cost for a temperature to count as progress
+STAGNATION_TEMPS = 2  # Stop after this many consecutive temperatures without progress
+STAGNATION_ACCEPTANCE_RATE = 0.15  # Only count temperatures accepting less than this fraction of moves as stagnant
+
+
+class GeometricSchedule:
+    """
+    The original schedule: a fixed number of moves per temperature, a fixed cooling factor, a range window that
+    grows or shrinks by one site at a time once moves are ranged, and an exit on low temperature and little progress
+    """
+    def get_moves_per_temp(self, placer) -> float:
+        """
+        :return: float - Number of moves to perform at each temperature
+        """
+        return placer.moves_per_temp_factor * (placer.num_cells_to_place ** (4 / 3))
+
+    def update_range_window(self, placer, acceptance_rate: float):
+        """
+        Adjust the placer's range window after a temperature
+        :param acceptance_rate: Fraction of moves accepted at the temperature just explored
+        """
+        if placer.prev_temp_cost_ratio < COST_TRANSITION_RATIO:
+            if acceptance_rate > TARGET_ACCEPTANCE_RATE:
+                if placer.range_window_half_length < placer.half_grid_max_dim:
+                    placer.range_window_half_length += 1
+            else:
+                if placer.range_window_half_length > 1:
+                    placer.range_window_half_length += -1
+
+    def get_next_temperature(self, placer, acceptance_rate: float) -> float:
+        """
+        :param acceptance_rate: Fraction of moves accepted at the temperature just explored
+        :return: float - The next temperature
+        """
+        return placer.sa_temp * placer.cooling_factor
+
+    def is_finished(self, placer) -> bool:
+        """
+        Check the exit condition, after the temperature has been reduced
+        :return: bool - True if annealing should stop
+        """
+        return (placer.prev_temp_cost-placer.current_cost)/placer.current_cost < COST_EXIT_RATIO and \
+            placer.sa_temp/placer.reference_temp < TEMP_EXIT_RATIO
+
+
+class AdaptiveSchedule(GeometricSchedule):
+    """
+    An acceptance-rate driven schedule after VPR.
+    The cooling factor follows the acceptance rate, cooling quickly when almost everything or almost nothing is
+    accepted and slowly in between. The range window is scaled continuously to steer the acceptance rate towards
+    44%. Annealing stops once the temperature is small relative to the average cost per net, or once the best cost
+    has stagnated for several cold temperatures (where few moves are accepted).
+    """
+    def __init__(self):
+        self.acceptance_rate = 1.0  # Acceptance rate at the most recently explored temperature
+        self.range_limit = None  # Unrounded range window half length
+        self.best_cost = float("inf")  # Lowest cost seen at the end of a temperature
+        self.num_stagnant_temps = 0  # Number of consecutive temperatures without progress on the best cost
+
+    def update_range_window(self, placer, acceptance_rate: float):
+        """
+        Scale the range window by (1 - 0.44 + acceptance rate)
+        :param acceptance_rate: Fraction of moves accepted at the temperature just explored
+        """
+        if self.range_limit is None:
+            self.range_limit = float(placer.range_window_half_length)
+        self.range_limit *= 1 - TARGET_ACCEPTANCE_RATE + acceptance_rate
+        self.range_limit = max(1.0, min(float(placer.half_grid_max_dim), self.range_limit))
+        placer.range_window_half_length = round(self.range_limit)
+
+    def get_next_temperature(self, placer, acceptance_rate: float) -> float:
+        """
+        :param acceptance_rate: Fraction of moves accepted at the temperature just explored
+        :return: float - The next temperature
+        """
+        self.acceptance_rate = acceptance_rate
+        if acceptance_rate > 0.96:
+            cooling_factor = 0.5
+        elif acceptance_rate > 0.8:
+            cooling_factor = placer.cooling_factor**2
+        else:
+            cooling_factor = placer.cooling_factor
+        return placer.sa_temp * cooling_factor
+
+    def is_finished(self, placer) -> bool:
+        """
+        Check the exit condition, after the temperature has been reduced
+        :return: bool - True if annealing should stop
+        """
+        if placer.current_cost < self.best_cost*(1-STAGNATION_RATIO) or \
+                self.acceptance_rate >= STAGNATION_ACCEPTANCE_RATE:
+            self.num_stagnant_temps = 0
+        else:
+            self.num_stagnant_temps += 1
+        self.best_cost = min(self.best_cost, placer.current_cost)
+
+        if placer.num_nets > 0 and placer.sa_temp < ADAPTIVE_EXIT_FACTOR * placer.current_cost/placer.num_nets:
+            return True
+        return self.num_stagnant_temps >= STAGNATION_TEMPS
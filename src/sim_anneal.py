@@ -1,58 +1,49 @@
 """
 Solution to UBC CPEN 513 Assignment 2.
 Implements Simulated Annealing.
-Uses Tkinter for GUI.
+The Tkinter GUI is in gui.py.
+Tkinter and matplotlib are only imported when a GUI or plot is requested, so headless runs never load them.
 """
 
+import copy
 import os
+import queue
 import random
+import threading
 import time
-import matplotlib.pyplot as plt
-from tkinter import *
 from math import exp, sqrt, ceil
 
+import checkpoint
+import netlist
+import refine
+import run_log
+
 # Constants
-file_name = "test.txt"
 FILE_DIR = "../benchmarks/"
+DEFAULT_FILE_NAME = "test.txt"
 
 # Hyperparameters
-cooling_factor = 0.8  # Coefficient for rate of anneal cooling
-initial_temp_factor = 10  # Coefficient for anneal initial temperature
-moves_per_temp_factor = 75  # Coefficient for number of moves to be performed at each temperature
+COOLING_FACTOR = 0.8  # Default coefficient for rate of anneal cooling
+INITIAL_TEMP_FACTOR = 10  # Default coefficient for anneal initial temperature
+MOVES_PER_TEMP_FACTOR = 75  # Default coefficient for number of moves to be performed at each temperature
 COST_TRANSITION_RATIO = 0.8  # Ratio for determining when to start using a range window for moves
 TEMP_EXIT_RATIO = 0.002  # Ratio for determining exit condition based on temperature
 COST_EXIT_RATIO = 0.005  # Ratio for determining exit condition based on cost
 MOVE_SAMPLE_SIZE = 50  # Initial number of moves to be performed to determine cost variance of moves
-hyperparam_string = str(cooling_factor) + "-" + str(initial_temp_factor) + "-" + str(moves_per_temp_factor) + "-"
-
-# Global variables
-num_cells_to_place = 0  # Number of cells in the circuit to be placed
-num_cell_connections = 0  # Number of connections to be routed, summed across all cells/nets
-grid_width = 0  # Width of the placement grid
-grid_height = 0  # Height of the placement grid
-half_grid_max_dim = 0  # Larger of width/height
-cell_dict = {}  # Dictionary of all cells, key is cell ID
-net_dict = {}  # Dictionary of all nets, key is net ID
-placement_grid = []  # 2D list of sites for placement
-placement_done = False  # Is the placement complete?
-cost_history = []  # History of costs at each temperature
-iter_history = []  # History of cumulative iterations performed at each temperature
-temperature_history = []  # History of exact temperature values
-acceptance_history = []  # History of number of accepted moves
-root = None  # Tkinter root
-unique_line_list = []  # List of unique lines across multiple nets
-# Simulated Annealing
-sa_temp = -1  # SA temperature
-sa_initial_temp = -1  # Starting SA temperature
-iters_per_temp = -1  # Number of iterations to perform at each temperature
-iters_this_temp = 0  # Number of iterations performed at the current temperature
-initial_cost = -1  # Cost of initial netlist placement
-current_cost = 0  # The estimated cost of the current placement
-prev_temp_cost = -1  # Cost at the end of exploring the previous temperature
-prev_temp_cost_ratio = float("inf")  # Cost ratio at the end of exploring the previous temperature
-total_iters = 0  # Cumulative number of iterations performed throughout program run
-acceptances_this_temp = 0  # Number of accepted moves at the current temperature
-range_window_half_length = -1  # Half the length of a side of the (square) range window
+QUADRATIC_START_ACCEPTANCE = 0.2  # Initial acceptance rate of uphill moves when starting from a quadratic placement
+QUADRATIC_START_WINDOW = 0.5  # Initial range window when starting from a quadratic placement, as a fraction of its max
+PROJECTED_START_ACCEPTANCE = 0.03  # Initial acceptance rate of uphill moves when starting from a given placement
+PROJECTED_START_WINDOW = 0.1  # Initial range window when starting from a given placement, as a fraction of its max
+
+# Initial placers
+INITIAL_RANDOM = "random"  # Cells dropped onto randomly shuffled sites
+INITIAL_QUADRATIC = "quadratic"  # Quadratic wirelength minimization, spread onto the grid (requires NumPy)
+INITIAL_PLACERS = [INITIAL_RANDOM, INITIAL_QUADRATIC]
+
+# Cost plot output modes
+PLOT_SHOW = "show"  # Save the plot and display it with pyplot, blocking until the window is closed
+PLOT_SAVE = "save"  # Save the plot from a background thread, without pyplot or a display
+PLOT_NONE = "none"  # Skip the plot entirely
 
 
 class Site:
@@ -62,8 +53,6 @@ class Site:
     def __init__(self, x: int, y: int):
         self.x = x  # x location
         self.y = y  # y location
-        self.canvas_id = -1  # ID of corresponding rectangle in Tkinter canvas
-        self.canvas_centre = (-1, -1)  # Geometric centre of Tkinter rectangle
         self.isOccupied = False  # Is the site occupied by a cell?
         self.occupant = None  # Reference to occupant cell
         pass
@@ -81,16 +70,6 @@ class Cell:
         pass
 
 
-class Line:
-    """
-    A wrapper class for Tkinter lines
-    """
-    def __init__(self, source: Cell, sink: Cell, canvas_id: int):
-        self.source = source  # Reference to source cell
-        self.sink = sink  # Reference to sink cell
-        self.canvas_id = canvas_id  # Tkinter ID of line
-
-
 class Net:
     """
     A collection of cells to be connected during routing
@@ -100,644 +79,908 @@ class Net:
         self.num_cells = num_cells  # Number of cells in this net
         self.source = None  # Reference to source cell
         self.sinks = []  # References to sink cells
-        self.lines = []  # References to Lines in this net
+        # Cached bounding box, kept up to date incrementally as the net's cells move
+        self.cost = 0.0  # HPWL of the bounding box
+        self.min_x = 0  # Leftmost pin x location
+        self.max_x = 0  # Rightmost pin x location
+        self.min_y = 0  # Highest pin y location
+        self.max_y = 0  # Lowest pin y location
+        self.num_min_x = 0  # Number of pins on the left edge
+        self.num_max_x = 0  # Number of pins on the right edge
+        self.num_min_y = 0  # Number of pins on the top edge
+        self.num_max_y = 0  # Number of pins on the bottom edge
+        self.stamp = 0  # Marker used to find nets shared by both cells of a swap
         pass
 
 
-def reset_globals():
-    """
-    Reset (most) global variables.
-    Used for repeated calls to this script from a parent script.
+class Placer:
     """
-    global num_cells_to_place
-    global num_cell_connections
-    global grid_width
-    global grid_height
-    global cell_dict
-    global net_dict
-    global placement_grid
-    global placement_done
-    global cost_history
-    global iter_history
-    global temperature_history
-    global root
-    global unique_line_list
-    global sa_temp
-    global sa_initial_temp
-    global iters_per_temp
-    global iters_this_temp
-    global current_cost
-    global prev_temp_cost
-    global total_iters
-
-    num_cells_to_place = 0
-    num_cell_connections = 0
-    grid_width = 0
-    grid_height = 0
-    cell_dict = {}
-    net_dict = {}
-    placement_grid = []
-    placement_done = False
-    cost_history = []
-    iter_history = []
-    temperature_history = []
-    root = None
-    unique_line_list = []
-    sa_temp = -1
-    sa_initial_temp = -1
-    iters_per_temp = -1
-    iters_this_temp = -1
-    current_cost = 0
-    prev_temp_cost = 0
-    total_iters = 0
-
-
-def quick_anneal(f_name, cool_fact, init_temp_fact, move_p_t_fact):
+    A self-contained Simulated Annealing placer for a single netlist.
+    All anneal state lives on the instance, so several placements can run side by side in one process.
     """
-    Perform an anneal without a GUI. Automatically exits after saving data.
-    For experimentation.
-    """
-    global FILE_DIR
-    global file_name
-    global num_cells_to_place
-    global num_cell_connections
-    global grid_width
-    global grid_height
-    global placement_grid
-    global cooling_factor
-    global initial_temp_factor
-    global moves_per_temp_factor
-    global hyperparam_string
-
-    reset_globals()
-
-    random.seed(0)  # Set random seed
-
-    file_name = f_name
-    cooling_factor = cool_fact
-    initial_temp_factor = init_temp_fact
-    moves_per_temp_factor = move_p_t_fact
-    hyperparam_string = str(cooling_factor) + "-" + str(initial_temp_factor) + "-" + str(moves_per_temp_factor) + "-"
-
-    print("Running: " + file_name + "-" + str(cooling_factor) + "-" + str(initial_temp_factor) + "-" +
-          str(moves_per_temp_factor))
-
-    file_path = FILE_DIR + f_name
-    script_path = os.path.dirname(__file__)
-    true_path = os.path.join(script_path, file_path)
-    routing_file = open(true_path, "r")
-
-    # Setup the routing grid/array
-    placement_grid = create_placement_grid(routing_file)
-
-    # Perform initial placement
-    initial_placement(None)
-
-    sa_to_completion(None)
-
-    
-def anneal(f_name: str):
-    """
-    Perform anneal with a GUI.
-    :param f_name: Name of file to open
-    :return: void
-    """
-    global FILE_DIR
-    global file_name
-    global num_cells_to_place
-    global num_cell_connections
-    global grid_width
-    global grid_height
-    global placement_grid
-    global root
-
-    random.seed(0)  # Set random seed
-
-    # Determine file to open
-    file_name = f_name
-    file_path = FILE_DIR + file_name
-    script_path = os.path.dirname(__file__)
-    true_path = os.path.join(script_path, file_path)
-    routing_file = open(true_path, "r")
-
-    # Setup the routing grid/array
-    placement_grid = create_placement_grid(routing_file)
-
-    # Create routing canvas in Tkinter
-    root = Tk()
-    root.columnconfigure(0, weight=1)
-    root.rowconfigure(0, weight=1)
-    site_length = 7
-    routing_canvas = Canvas(root, bg='white', width=grid_width*site_length, height=grid_height*site_length)
-    routing_canvas.grid(column=0, row=0, sticky=(N, W, E, S))
-    for x in range(grid_width):
-        for y in range(grid_height):
-            # Add a cell site rectangle to the canvas
-            top_left_x = site_length * x
-            top_left_y = site_length * y * 2
-            bottom_right_x = top_left_x + site_length
-            bottom_right_y = top_left_y + site_length
-            rectangle_colour = "white"
-            rectangle_coords = (top_left_x, top_left_y, bottom_right_x, bottom_right_y)
-            site = placement_grid[y][x]
-            site.canvas_id = routing_canvas.create_rectangle(rectangle_coords, fill=rectangle_colour)
-            site.canvas_centre = ((top_left_x+bottom_right_x)/2, (top_left_y+bottom_right_y)/2)
-            # Add a routing channel rectangle to the canvas
-            if y != grid_height-1:
-                top_left_y = bottom_right_y
-                bottom_right_y = top_left_y + site_length
-                rectangle_colour = "black"
-                rectangle_coords = (top_left_x, top_left_y, bottom_right_x, bottom_right_y)
-                routing_canvas.create_rectangle(rectangle_coords, fill=rectangle_colour)
-
-
-
-    # Perform initial placement
-    initial_placement(routing_canvas)
-
-    # Event bindings and Tkinter start
-    routing_canvas.focus_set()
-    routing_canvas.bind("<Key>", lambda event: key_handler(routing_canvas, event))
-    root.mainloop()
-
-
-def initial_placement(routing_canvas):
-    """
-    Perform an initial placement prior to Simulated Annealing
-    :param routing_canvas: Tkinter canvas
-    """
-    global placement_grid
-    global current_cost
-    global sa_temp
-    global moves_per_temp_factor
-    global num_cells_to_place
-    global iters_per_temp
-    global sa_initial_temp
-    global cost_history
-    global iter_history
-    global initial_cost
-
-    # Check if there are enough sites for the requisite number of cells
-    if num_cells_to_place > (grid_width*grid_height):
-        print("ERROR: Not enough space to place this circuit!")
-        exit()
-
-    # Get a list of all sites to place cells into
-    free_sites = []
-    for x in range(grid_width):
-        for y in range(grid_height):
-            free_sites.append((x, y))
-    random.shuffle(free_sites)  # Randomize order to avoid undesired initial placement structure
-
-    for net in net_dict.values():
-        # Place the net's source
-        if not net.source.isPlaced:
-            place_x, place_y = free_sites.pop()
-            placement_site = placement_grid[place_y][place_x]
-            placement_site.occupant = net.source
-            net.source.site = placement_site
-            placement_site.isOccupied = True
-            net.source.isPlaced = True
-
-        # Place the net's sinks
-        for sink in net.sinks:
-            if not sink.isPlaced:
+    engine = "object"  # Name of the annealing engine, see get_placer_class
+
+    def __init__(self, f_name: str, cooling_factor=COOLING_FACTOR, initial_temp_factor=INITIAL_TEMP_FACTOR,
+                 moves_per_temp_factor=MOVES_PER_TEMP_FACTOR, seed=0, plot_mode=PLOT_SHOW, schedule="geometric",
+                 log_format=run_log.LOG_CSV, log_dir=".", checkpoint_file=None,
+                 checkpoint_interval=checkpoint.CHECKPOINT_INTERVAL, initial_placer=INITIAL_RANDOM, circuit=None):
+        # Hyperparameters
+        self.file_name = f_name  # Name of the netlist file being placed
+        self.design_name = os.path.splitext(os.path.basename(f_name))[0]  # Netlist name used for output files
+        self.cooling_factor = cooling_factor  # Coefficient for rate of anneal cooling
+        self.initial_temp_factor = initial_temp_factor  # Coefficient for anneal initial temperature
+        self.moves_per_temp_factor = moves_per_temp_factor  # Coefficient for number of moves at each temperature
+        self.hyperparam_string = str(cooling_factor) + "-" + str(initial_temp_factor) + "-" + \
+            str(moves_per_temp_factor) + "-"
+        self.seed = seed  # Random seed of this placer
+        self.rng = random.Random(seed)  # Random number generator private to this placer
+        self.plot_mode = plot_mode  # How to output the cost plot at the end of the anneal, see PLOT_* constants
+        self.schedule = get_schedule(schedule)  # Annealing schedule, see get_schedule
+        if initial_placer not in INITIAL_PLACERS:
+            raise ValueError("Unknown initial placer: " + str(initial_placer))
+        self.initial_placer = initial_placer  # How cells are placed before annealing, see INITIAL_PLACERS
+        self.output_threads = []  # Background threads writing output files
+        self.log_format = log_format  # Format of the per-temperature run log, see run_log.LOG_FORMATS
+        self.log_dir = log_dir  # Directory to write the run log to
+        self.run_log = None  # Run log, opened when the first temperature is finished
+        self.num_logged = 0  # Number of history entries written to the run log
+        self.checkpoint_file = checkpoint_file  # File to checkpoint the anneal to, None for no checkpoints
+        self.checkpoint_interval = checkpoint_interval  # Minimum time between checkpoints in seconds
+        self.last_checkpoint_time = time.time()  # Time the most recent checkpoint was taken
+        self.checkpoint_thread = None  # Background thread writing the most recent checkpoint
+        # Netlist
+        if circuit is None:
+            circuit = netlist.load_cached_netlist(get_netlist_path(f_name))
+        self.circuit = circuit  # Parsed netlist being placed, normally loaded from f_name
+        self.num_cells_to_place = 0  # Number of cells in the circuit to be placed
+        self.num_cell_connections = 0  # Number of connections to be routed, summed across all cells/nets
+        self.num_nets = 0  # Number of nets in the circuit
+        self.grid_width = 0  # Width of the placement grid
+        self.grid_height = 0  # Height of the placement grid
+        self.half_grid_max_dim = 0  # Larger of width/height
+        self.cell_dict = {}  # Dictionary of all cells, key is cell ID
+        self.net_dict = {}  # Dictionary of all nets, key is net ID
+        self.placement_grid = []  # 2D list of sites for placement
+        self.placement_done = False  # Is the placement complete?
+        # History
+        self.cost_history = []  # History of costs at each temperature
+        self.iter_history = []  # History of cumulative iterations performed at each temperature
+        self.temperature_history = []  # History of exact temperature values
+        self.acceptance_history = []  # History of number of accepted moves
+        # GUI
+        self.snapshot_queue = None  # Queue to publish placement snapshots to for a GUI, None for no GUI
+        # Simulated Annealing
+        self.sa_temp = -1  # SA temperature
+        self.sa_initial_temp = -1  # Starting SA temperature
+        self.iters_per_temp = -1  # Number of iterations to perform at each temperature
+        # Number of iterations performed at the current temperature. Starts at 0, so every temperature performs
+        # exactly iters_per_temp moves (headless runs used to start at -1, an extra uncounted first move)
+        self.iters_this_temp = 0
+        self.initial_cost = -1  # Cost of initial netlist placement
+        self.reference_cost = -1  # Cost of a random placement, anneal progress is measured against it
+        self.reference_temp = -1  # Starting temperature of an anneal from a random placement
+        self.current_cost = 0  # The estimated cost of the current placement
+        self.prev_temp_cost = -1  # Cost at the end of exploring the previous temperature
+        self.prev_temp_cost_ratio = float("inf")  # Cost ratio at the end of exploring the previous temperature
+        self.total_iters = 0  # Cumulative number of iterations performed throughout program run
+        self.acceptances_this_temp = 0  # Number of accepted moves at the current temperature
+        self.range_window_half_length = -1  # Half the length of a side of the (square) range window
+        self.net_stamp = 0  # Most recent net marker value, see mark_shared_nets
+
+        # Setup the routing grid/array
+        self.create_placement_grid(circuit)
+
+    def initial_placement(self, start=None):
+        """
+        Perform an initial placement prior to Simulated Annealing
+        :param start: list[(int, int)] - Placement to anneal from instead of the initial placer's, x,y of each cell
+                      indexed by cell ID, e.g. projected from a coarser netlist. None to use the initial placer
+        """
+        # Check if there are enough sites for the requisite number of cells
+        if self.num_cells_to_place > (self.grid_width*self.grid_height):
+            print("ERROR: Not enough space to place this circuit!")
+            exit()
+
+        # Get a list of all sites to place cells into
+        free_sites = []
+        for x in range(self.grid_width):
+            for y in range(self.grid_height):
+                free_sites.append((x, y))
+        self.rng.shuffle(free_sites)  # Randomize order to avoid undesired initial placement structure
+
+        self.place_cells(free_sites)
+
+        # Find the initial cost
+        self.initial_cost = self.calculate_total_cost()
+        self.current_cost = self.initial_cost
+        self.prev_temp_cost = self.initial_cost
+
+        # Set the initial annealing temperature based on a sample of moves
+        initial_cost_list = []
+        for _ in range(MOVE_SAMPLE_SIZE):
+            cell_a, target_x, target_y = self.pick_random_move()
+            # Check if target site is occupied by a cell
+            cell_b = self.get_occupant(target_x, target_y)
+            if cell_b is not None:
+                initial_cost_list.append(self.get_swap_delta(cell_a, cell_b))
+            else:
+                initial_cost_list.append(self.get_move_delta(cell_a, target_x, target_y))
+        sample_cost_sum = 0
+        for cost in initial_cost_list:
+            sample_cost_sum += cost
+        mean_sample_cost = sample_cost_sum/MOVE_SAMPLE_SIZE
+        std_dev = 0
+        for cost in initial_cost_list:
+            std_dev += (cost-mean_sample_cost)**2
+        std_dev /= MOVE_SAMPLE_SIZE-1
+        std_dev = sqrt(std_dev)
+        self.sa_initial_temp = self.initial_temp_factor * std_dev
+        self.reference_cost = self.initial_cost
+        self.reference_temp = self.sa_initial_temp
+        if start is not None:
+            self.warm_start(start, PROJECTED_START_ACCEPTANCE, PROJECTED_START_WINDOW)
+        elif self.initial_placer == INITIAL_QUADRATIC:
+            import analytic  # Imported here as analytic requires NumPy
+            self.warm_start(analytic.quadratic_placement(self.circuit, self.get_placement()),
+                            QUADRATIC_START_ACCEPTANCE, QUADRATIC_START_WINDOW)
+        print("Initial temperature: " + str(self.sa_initial_temp))
+        self.sa_temp = self.sa_initial_temp
+
+        # Store for plotting
+        self.cost_history.append(self.initial_cost)
+        self.iter_history.append(self.total_iters)
+        self.temperature_history.append(self.sa_temp)
+
+        # Set the number of iterations at a given temperature
+        self.iters_per_temp = self.schedule.get_moves_per_temp(self)
+
+    def warm_start(self, placement: list, acceptance_rate: float, window: float):
+        """
+        Replace the random initial placement with a better one, and recalibrate the initial temperature and range
+        window for it. Most moves are local from the start, and the temperature is set so that about acceptance_rate
+        of a sample of the uphill ones would be accepted.
+        :param placement: list[(int, int)] - x,y of each cell, indexed by cell ID
+        :param acceptance_rate: Target initial acceptance rate of uphill moves
+        :param window: Initial range window, as a fraction of its maximum
+        """
+        self.set_placement(placement)
+        self.initial_cost = self.current_cost
+        self.prev_temp_cost = self.initial_cost
+        self.prev_temp_cost_ratio = self.initial_cost/self.reference_cost
+        self.range_window_half_length = max(1, round(window*self.half_grid_max_dim))
+        print("Starting placement cost: " + str(self.initial_cost))
+
+        sample = []
+        for _ in range(MOVE_SAMPLE_SIZE):
+            if self.prev_temp_cost_ratio < COST_TRANSITION_RATIO:
+                cell_a, target_x, target_y = self.pick_ranged_move()
+            else:
+                cell_a, target_x, target_y = self.pick_random_move()
+            cell_b = self.get_occupant(target_x, target_y)
+            if cell_b is not None:
+                sample.append(self.get_swap_delta(cell_a, cell_b))
+            else:
+                sample.append(self.get_move_delta(cell_a, target_x, target_y))
+        self.sa_initial_temp = get_temperature_for_acceptance(sample, acceptance_rate, self.reference_temp)
+
+    def place_cells(self, free_sites: list):
+        """
+        Place every cell into sites popped from a list of free sites: net by net, source first, then any cells on no
+        net in order of cell ID
+        :param free_sites: list[(int, int)] - Coordinates of unoccupied sites
+        """
+        cells = []
+        for net in self.net_dict.values():
+            cells.append(net.source)
+            cells.extend(net.sinks)
+        cells.extend(self.cell_dict.values())
+        for cell in cells:
+            if not cell.isPlaced:
                 place_x, place_y = free_sites.pop()
-                placement_site = placement_grid[place_y][place_x]
-                placement_site.occupant = sink
-                sink.site = placement_site
+                placement_site = self.placement_grid[place_y][place_x]
+                placement_site.occupant = cell
+                cell.site = placement_site
                 placement_site.isOccupied = True
-                sink.isPlaced = True
-
-        # Draw net on canvas
-        if routing_canvas is not None:
-            draw_net(routing_canvas, net)
-
-    # Find the initial cost
-    initial_cost = calculate_total_cost()
-    current_cost = initial_cost
-
-    # Set the initial annealing temperature based on a sample of moves
-    initial_cost_list = []
-    for _ in range(MOVE_SAMPLE_SIZE):
-        cell_a, target_x, target_y = pick_random_move()
-        # Check if target site is occupied by a cell
-        target_site = placement_grid[target_y][target_x]
-        if target_site.isOccupied:
-            cell_b = target_site.occupant
-            initial_cost_list.append(get_swap_delta(cell_a, cell_b))
+                cell.isPlaced = True
+
+    def get_occupant(self, x: int, y: int):
+        """
+        Get the cell occupying a site
+        :return: Cell - The occupant, or None if the site is empty
+        """
+        return self.placement_grid[y][x].occupant
+
+    def sa_to_completion(self):
+        """
+        Execute Simulated Annealing to completion.
+        :return: float - Runtime in seconds
+        """
+        start = time.time()  # Record time taken for full placement
+        while not self.placement_done:
+            self.sa_step()
+        end = time.time()
+        elapsed = end - start
+        print("Took " + str(elapsed) + "s")
+        return elapsed
+
+    def sa_multistep(self, n):
+        """
+        Perform multiple iterations of SA
+        :param n: Number of iterations
+        :return: void
+        """
+        if n != 1:
+            # Use an exponential series to make keyboard usage easier
+            # E.g. user types '2', perform 10^2=100 steps, type '6' to perform 10^10=1,000,000 steps
+            steps = 10**n
         else:
-            initial_cost_list.append(get_move_delta(cell_a, target_x, target_y))
-    sample_cost_sum = 0
-    for cost in initial_cost_list:
-        sample_cost_sum += cost
-    mean_sample_cost = sample_cost_sum/MOVE_SAMPLE_SIZE
-    std_dev = 0
-    for cost in initial_cost_list:
-        std_dev += (cost-mean_sample_cost)**2
-    std_dev /= MOVE_SAMPLE_SIZE-1
-    std_dev = sqrt(std_dev)
-    sa_initial_temp = initial_temp_factor * std_dev
-    print("Initial temperature: " + str(sa_initial_temp))
-    sa_temp = sa_initial_temp
-
-    # Store for plotting
-    cost_history.append(initial_cost)
-    iter_history.append(total_iters)
-    temperature_history.append(sa_temp)
-
-    # Set the number of iterations at a given temperature
-    iters_per_temp = moves_per_temp_factor * (num_cells_to_place ** (4 / 3))
-
-
-def draw_net(routing_canvas, net):
-    """
-    Draw a net on the canvas from scratch
-    """
-    global unique_line_list
-
-    # Check that net is fully placed
-    if not net.source.isPlaced:
-        return
-    for sink in net.sinks:
-        if not sink.isPlaced:
-            return
-
-    # Draw line between cells
-    for sink in net.sinks:
-        if routing_canvas is not None:
-            line_id = draw_line(routing_canvas, net.source, sink)
-            new_line = Line(net.source, sink, line_id)
+            # Special rule when user types '1', just progress through a single step for fine-grain observation
+            steps = n
+
+        # Perform the SA steps
+        for _ in range(steps):
+            if self.placement_done:
+                break
+            self.sa_step()
+
+    def sa_step(self):
+        """
+        Perform a single iteration of SA
+        :return: void
+        """
+        # Choose move randomly
+        if self.prev_temp_cost_ratio < COST_TRANSITION_RATIO:
+            cell_a, target_x, target_y = self.pick_ranged_move()
         else:
-            new_line = Line(net.source, sink, -1)
-        net.lines.append(new_line)
-        unique_line_list.append(new_line)
-
-
-def draw_line(routing_canvas, source: Cell, sink: Cell):
-    """
-    Draws a line between two placed cells
-    """
-
-    # Get line coordinates
-    source_centre = source.site.canvas_centre
-    source_x = source_centre[0]
-    source_y = source_centre[1]
-    sink_centre = sink.site.canvas_centre
-    sink_x = sink_centre[0]
-    sink_y = sink_centre[1]
-
-    # Draw the line
-    line_id = routing_canvas.create_line(source_x, source_y, sink_x, sink_y, fill='red', width=0.01)
-
-    return line_id
-
-
-def redraw_line(routing_canvas, line: Line):
-    """
-    Redraw an existing line.
-    Used when the line's source or sink has moved since last draw.
-    """
-    source_centre = line.source.site.canvas_centre
-    source_x = source_centre[0]
-    source_y = source_centre[1]
-    sink_centre = line.sink.site.canvas_centre
-    sink_x = sink_centre[0]
-    sink_y = sink_centre[1]
-    routing_canvas.coords(line.canvas_id, source_x, source_y, sink_x, sink_y)
-
-
-def key_handler(routing_canvas, event):
-    """
-    Accepts a key event and makes an appropriate decision.
-    :param routing_canvas: Tkinter canvas
-    :param event: Key event
-    :return: void
-    """
-
-    e_char = event.char
-    if e_char == '0':
-        sa_to_completion(routing_canvas)
-    elif str.isdigit(e_char):
-        sa_multistep(routing_canvas, int(e_char))
-    else:
-        pass
-
-
-def sa_to_completion(routing_canvas):
-    """
-    Execute Simulated Annealing to completion.
-    :param routing_canvas: Tkinter canvas
-    :return: void
-    """
-
-    start = time.time()  # Record time taken for full placement
-    while not placement_done:
-        sa_step(routing_canvas)
-    end = time.time()
-    elapsed = end - start
-    print("Took " + str(elapsed) + "s")
-
-    # Write results to file
-    outfile_name = hyperparam_string + str(file_name[:-4]) + ".csv"
-    with open(outfile_name, "w") as f:
-        for iters in iter_history:
-            f.write(str(iters) + ",")
-        f.write("\n")
-        for cost in cost_history:
-            f.write(str(cost) + ",")
-        f.write("\n")
-        for temp in temperature_history:
-            f.write(str(temp) + ", ")
-        f.write("\n")
-        for acceptance in acceptance_history:
-            f.write(str(acceptance) + ", ")
-        f.write("\n")
-        f.write(str(elapsed))
-
-
-def sa_multistep(routing_canvas, n):
-    """
-    Perform multiple iterations of SA
-    :param routing_canvas: Tkinter canvas
-    :param n: Number of iterations
-    :return: void
-    """
-
-    if n != 1:
-        # Use an exponential series to make keyboard usage easier
-        # E.g. user types '2', perform 10^2=100 steps, type '6' to perform 10^10=1,000,000 steps
-        steps = 10**n
-    else:
-        # Special rule when user types '1', just progress through a single step for fine-grain observation
-        steps = n
-
-    # Perform the SA steps
-    for _ in range(steps):
-        if placement_done:
-            break
-        sa_step(routing_canvas)
-
-    # Redraw lines on GUI to reflect current state of anneal
-    if routing_canvas is not None:
-        redraw_all_lines(routing_canvas)
-
+            cell_a, target_x, target_y = self.pick_random_move()
 
-def sa_step(routing_canvas):
-    """
-    Perform a single iteration of SA
-    :param routing_canvas: Tkinter canvas
-    :return: void
-    """
-    global placement_done
-    global iters_this_temp
-    global sa_temp
-    global sa_initial_temp
-    global current_cost
-    global total_iters
-    global prev_temp_cost
-    global root
-    global COST_TRANSITION_RATIO
-    global acceptances_this_temp
-    global range_window_half_length
-    global prev_temp_cost_ratio
-
-    # Choose move randomly
-    if prev_temp_cost_ratio < COST_TRANSITION_RATIO:
-        cell_a, target_x, target_y = pick_ranged_move()
-    else:
-        cell_a, target_x, target_y = pick_random_move()
-
-    # Check if target site is occupied by a cell
-    target_site = placement_grid[target_y][target_x]
-    cell_b = None
-    if target_site.isOccupied:
-        cell_b = target_site.occupant
-        # Calculate theoretical cost difference
-        delta = get_swap_delta(cell_a, cell_b)
-    else:
-        # Calculate theoretical cost difference
-        delta = get_move_delta(cell_a, target_x, target_y)
-
-    # Generate random decision boundary
-    decision_value = random.random()
-    decision_boundary = exp(-1*delta/sa_temp)
-
-    # Check if move will be taken
-    if decision_value < decision_boundary:
-        acceptances_this_temp += 1
+        # Check if target site is occupied by a cell
+        target_site = self.placement_grid[target_y][target_x]
+        cell_b = None
         if target_site.isOccupied:
-            swap(cell_a, cell_b, delta)
+            cell_b = target_site.occupant
+            # Calculate theoretical cost difference
+            delta = self.get_swap_delta(cell_a, cell_b)
         else:
-            move(cell_a, target_x, target_y, delta)
-
-    # Check for temperature update
-    iters_this_temp += 1
-    if iters_this_temp >= iters_per_temp:
-        if routing_canvas is not None:
-            redraw_all_lines(routing_canvas)
-        if root is not None:
-            root.update_idletasks()  # Update the Tkinter GUI
-
-        # Update range window
-        if prev_temp_cost_ratio < COST_TRANSITION_RATIO:
-            if acceptances_this_temp/iters_this_temp > 0.44:
-                if range_window_half_length < half_grid_max_dim:
-                    range_window_half_length += 1
+            # Calculate theoretical cost difference
+            delta = self.get_move_delta(cell_a, target_x, target_y)
+
+        # Check if move will be taken, improving moves are always taken without drawing a random decision value
+        if delta <= 0 or self.rng.random() < exp(-1*delta/self.sa_temp):
+            self.acceptances_this_temp += 1
+            if target_site.isOccupied:
+                self.swap(cell_a, cell_b, delta)
             else:
-                if range_window_half_length > 1:
-                    range_window_half_length += -1
-        acceptance_history.append(acceptances_this_temp)
-        acceptances_this_temp = 0
+                self.move(cell_a, target_x, target_y, delta)
+
+        # Check for temperature update
+        self.iters_this_temp += 1
+        if self.iters_this_temp >= self.iters_per_temp:
+            self.update_temperature()
+
+    def update_temperature(self):
+        """
+        Finish exploring the current temperature: adjust the range window, cool down and check for exit
+        """
+        acceptance_rate = self.acceptances_this_temp/self.iters_this_temp
+        self.update_range_window()
+        self.acceptance_history.append(self.acceptances_this_temp)
+        self.acceptances_this_temp = 0
 
         # Reduce temperature
-        sa_temp *= cooling_factor
-        total_iters += iters_this_temp
-        iters_this_temp = 0
+        self.sa_temp = self.schedule.get_next_temperature(self, acceptance_rate)
+        self.total_iters += self.iters_this_temp
+        self.iters_this_temp = 0
 
         # Heartbeat
-        print("Temperature: " + str(sa_temp) + "; Cost: " + str(current_cost) + "; Iterations: " + str(total_iters))
+        print("Temperature: " + str(self.sa_temp) + "; Cost: " + str(self.current_cost) + "; Iterations: " +
+              str(self.total_iters))
 
         # Store data
-        cost_history.append(current_cost)
-        iter_history.append(total_iters)
-        temperature_history.append(sa_temp)
+        self.cost_history.append(self.current_cost)
+        self.iter_history.append(self.total_iters)
+        self.temperature_history.append(self.sa_temp)
 
-        if (prev_temp_cost-current_cost)/current_cost < COST_EXIT_RATIO and \
-                sa_temp/sa_initial_temp < TEMP_EXIT_RATIO:
+        if self.schedule.is_finished(self):
             # Perform a greedy final step
-            greedy_optimization()
+            self.greedy_optimization()
 
             # Store data
-            cost_history.append(current_cost)
-            iter_history.append(total_iters)
-            temperature_history.append(sa_temp)
-
-            if routing_canvas is not None:
-                redraw_all_lines(routing_canvas)
+            self.cost_history.append(self.current_cost)
+            self.iter_history.append(self.total_iters)
+            self.temperature_history.append(self.sa_temp)
 
             # Placement is complete
-            placement_done = True
-            # Plot cost history and save data
-            plt.plot(iter_history, cost_history, '.', color="black")
+            self.placement_done = True
+            # Plot cost history, unless a GUI is showing the anneal and will plot it from its own thread
+            if self.snapshot_queue is None:
+                self.plot_cost_history()
+            print("Final cost: " + str(self.current_cost))
+            print("Total iterations: " + str(self.total_iters))
+
+        self.prev_temp_cost = self.current_cost  # Note the cost at this temp for the next temp's calculations
+        self.prev_temp_cost_ratio = self.prev_temp_cost/self.reference_cost
+
+        self.log_history()
+        if self.checkpoint_file is not None and \
+                (self.placement_done or time.time() - self.last_checkpoint_time >= self.checkpoint_interval):
+            self.save_checkpoint()
+        if self.snapshot_queue is not None:
+            self.publish_snapshot()
+
+    def publish_snapshot(self):
+        """
+        Put a snapshot of the anneal on the snapshot queue, replacing any snapshot the GUI has not taken yet.
+        Only the latest placement is worth drawing, so a slow GUI never holds up the anneal.
+        """
+        snapshot = {"placement": self.get_placement(), "cost": self.current_cost, "temperature": self.sa_temp,
+                    "total_iters": self.total_iters + self.iters_this_temp, "placement_done": self.placement_done}
+        try:
+            self.snapshot_queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.snapshot_queue.put(snapshot)
+
+    def log_history(self):
+        """
+        Write the history entries recorded since the last call to the run log, opening it on first use.
+        The log is closed once placement is complete.
+        """
+        if self.log_format == run_log.LOG_NONE:
+            return
+        if self.run_log is None:
+            self.run_log = run_log.open_run_log(self.log_dir, self.hyperparam_string + self.design_name + "-s" +
+                                                str(self.seed), self.log_format)
+        timestamp = time.time()
+        while self.num_logged < len(self.cost_history):
+            step = self.num_logged
+            # Entry 0 is the initial placement, entry k the end of temperature k, then the greedy final step
+            acceptances = self.acceptance_history[step-1] if 0 < step <= len(self.acceptance_history) else None
+            self.run_log.write({"step": step, "total_iters": self.iter_history[step],
+                                "temperature": self.temperature_history[step], "cost": self.cost_history[step],
+                                "acceptances": acceptances, "timestamp": timestamp})
+            self.num_logged += 1
+        if self.placement_done:
+            self.run_log.close()
+
+    def get_state(self) -> dict:
+        """
+        Capture everything needed to continue the anneal exactly where it stands, see set_state.
+        The state shares nothing mutable with the placer, so it can be written out while the anneal carries on.
+        :return: dict - Anneal state
+        """
+        return {"engine": self.engine,
+                "design_name": self.design_name,
+                "hyperparameters": [self.cooling_factor, self.initial_temp_factor, self.moves_per_temp_factor],
+                "seed": self.seed,
+                "placement": checkpoint.pack_placement(self.get_placement()),
+                "rng_state": self.rng.getstate(),
+                "schedule": copy.deepcopy(self.schedule),
+                "sa_temp": self.sa_temp,
+                "sa_initial_temp": self.sa_initial_temp,
+                "iters_per_temp": self.iters_per_temp,
+                "iters_this_temp": self.iters_this_temp,
+                "acceptances_this_temp": self.acceptances_this_temp,
+                "total_iters": self.total_iters,
+                "range_window_half_length": self.range_window_half_length,
+                "initial_cost": self.initial_cost,
+                "reference_cost": self.reference_cost,
+                "reference_temp": self.reference_temp,
+                "current_cost": self.current_cost,
+                "prev_temp_cost": self.prev_temp_cost,
+                "prev_temp_cost_ratio": self.prev_temp_cost_ratio,
+                "placement_done": self.placement_done,
+                "cost_history": list(self.cost_history),
+                "iter_history": list(self.iter_history),
+                "temperature_history": list(self.temperature_history),
+                "acceptance_history": list(self.acceptance_history)}
+
+    def set_state(self, state: dict):
+        """
+        Restore an anneal captured by get_state, in place of the initial placement.
+        The run log of the resumed anneal starts over with the full history.
+        :param state: dict - Anneal state of a placer with the same engine, netlist, hyperparameters and seed
+        """
+        if state["engine"] != self.engine or state["design_name"] != self.design_name or \
+                state["hyperparameters"] != [self.cooling_factor, self.initial_temp_factor,
+                                             self.moves_per_temp_factor] or state["seed"] != self.seed:
+            raise ValueError("Checkpoint of " + state["engine"] + " anneal of " + state["design_name"] + " with " +
+                             str(state["hyperparameters"]) + ", seed " + str(state["seed"]) +
+                             " does not match this placer")
+        self.set_placement(checkpoint.unpack_placement(state["placement"]))
+        self.rng.setstate(state["rng_state"])
+        self.schedule = state["schedule"]
+        for name in ["sa_temp", "sa_initial_temp", "iters_per_temp", "iters_this_temp", "acceptances_this_temp",
+                     "total_iters", "range_window_half_length", "initial_cost", "reference_cost", "reference_temp",
+                     "current_cost", "prev_temp_cost",
+                     "prev_temp_cost_ratio", "placement_done", "cost_history", "iter_history",
+                     "temperature_history", "acceptance_history"]:
+            setattr(self, name, state[name])
+        self.num_logged = 0
+
+    def save_checkpoint(self):
+        """
+        Write the anneal state to the checkpoint file from a background thread
+        """
+        state = self.get_state()
+        if self.checkpoint_thread is not None:
+            self.checkpoint_thread.join()  # Never let two writes to the same file overlap
+        self.checkpoint_thread = threading.Thread(target=checkpoint.write_checkpoint,
+                                                  args=(state, self.checkpoint_file))
+        self.checkpoint_thread.start()
+        self.output_threads.append(self.checkpoint_thread)
+        self.last_checkpoint_time = time.time()
+
+    def update_range_window(self):
+        """
+        Let the schedule adjust the range window based on the acceptance rate at the current temperature
+        """
+        self.schedule.update_range_window(self, self.acceptances_this_temp/self.iters_this_temp)
+
+    def get_placement(self) -> list:
+        """
+        Get the current location of every cell
+        :return: list[(int, int)] - x,y of each cell, indexed by cell ID
+        """
+        return [(self.cell_dict[cell_id].site.x, self.cell_dict[cell_id].site.y)
+                for cell_id in range(self.num_cells_to_place)]
+
+    def set_placement(self, placement: list):
+        """
+        Move every cell to a given location and recalculate the cost from scratch
+        :param placement: list[(int, int)] - x,y of each cell, indexed by cell ID
+        """
+        for row in self.placement_grid:
+            for site in row:
+                site.isOccupied = False
+                site.occupant = None
+        for cell_id, (x, y) in enumerate(placement):
+            cell = self.cell_dict[cell_id]
+            site = self.placement_grid[y][x]
+            cell.site = site
+            cell.isPlaced = True
+            site.isOccupied = True
+            site.occupant = cell
+        self.current_cost = self.calculate_total_cost()
+
+    def plot_cost_history(self):
+        """
+        Output a plot of cost against iterations according to the plot mode
+        """
+        if self.plot_mode == PLOT_NONE:
+            return
+        outplot_name = self.hyperparam_string + self.design_name + ".png"
+        if self.plot_mode == PLOT_SAVE:
+            # Copy the histories so the plot is unaffected by anything that happens after this point
+            thread = threading.Thread(target=save_cost_plot,
+                                      args=(list(self.iter_history), list(self.cost_history), outplot_name))
+            thread.start()
+            self.output_threads.append(thread)
+        else:
+            import matplotlib.pyplot as plt
+            plt.figure()
+            plt.plot(self.iter_history, self.cost_history, '.', color="black")
             plt.xlabel("Sim. Anneal. Iterations")
             plt.ylabel("HPWL Cost")
-            outplot_name = hyperparam_string + str(file_name[:-4]) + ".png"
             plt.savefig(outplot_name)
             plt.show()
-            print("Final cost: " + str(current_cost))
-            print("Total iterations: " + str(total_iters))
-
-        prev_temp_cost = current_cost  # Note the cost at this temp for the next temp's calculations
-        prev_temp_cost_ratio = prev_temp_cost/initial_cost
-
-
-def greedy_optimization():
-    """
-    Perform a greedy optimization that only takes good moves
-    """
-    global cell_dict
 
-    for cell in cell_dict.values():
-        # Find best adjacent move
+    def wait_for_output(self):
+        """
+        Block until every background output file has been written
+        """
+        for thread in self.output_threads:
+            thread.join()
+        self.output_threads = []
+
+    def greedy_optimization(self):
+        """
+        Perform a greedy optimization that only takes good moves, until no cell has an improving move left
+        """
+        refine.refine(self)
+
+    def get_cell(self, cell_id: int) -> Cell:
+        """
+        :return: Cell - The cell with a given ID
+        """
+        return self.cell_dict[cell_id]
+
+    def get_cell_id(self, cell: Cell) -> int:
+        """
+        :return: int - The ID of a cell
+        """
+        return cell.id
+
+    def get_cell_location(self, cell: Cell) -> (int, int):
+        """
+        :return: (int, int) - x,y of the cell
+        """
+        return cell.site.x, cell.site.y
+
+    def get_net_bounds_without(self, cell: Cell) -> list:
+        """
+        Get the bounding box of each of a cell's nets as if the cell were not part of it, skipping nets of one cell.
+        The cached bounding box is used unless the cell is alone on one of its edges.
+        :return: list[(int, int, int, int)] - min_x, max_x, min_y, max_y of each net
+        """
+        x = cell.site.x
+        y = cell.site.y
+        bounds = []
+        for net in cell.nets:
+            if net.num_cells < 2:
+                continue
+            if (x != net.min_x or net.num_min_x > 1) and (x != net.max_x or net.num_max_x > 1) and \
+                    (y != net.min_y or net.num_min_y > 1) and (y != net.max_y or net.num_max_y > 1):
+                bounds.append((net.min_x, net.max_x, net.min_y, net.max_y))
+                continue
+            pin_x = [pin.site.x for pin in [net.source] + net.sinks if pin is not cell]
+            pin_y = [pin.site.y for pin in [net.source] + net.sinks if pin is not cell]
+            bounds.append((min(pin_x), max(pin_x), min(pin_y), max(pin_y)))
+        return bounds
+
+    def get_cell_nets(self, cell: Cell) -> list[Net]:
+        """
+        :return: list[Net] - Nets a cell is part of
+        """
+        return cell.nets
+
+    def get_net_cell_ids(self, net: Net) -> list[int]:
+        """
+        :return: list[int] - IDs of the cells of a net
+        """
+        return [net.source.id] + [sink.id for sink in net.sinks]
+
+    def move(self, cell: Cell, x: int, y: int, delta: float):
+        """
+        Move a cell to an empty site
+        """
+        # Move the cell
+        old_site = cell.site
+        cell.site = self.placement_grid[y][x]
+        old_site.isOccupied = False
+        old_site.occupant = None
+        cell.site.isOccupied = True
+        cell.site.occupant = cell
+
+        # Update cached bounding boxes
+        for net in cell.nets:
+            shift_bounding_box(net, old_site.x, old_site.y, x, y)
+
+        # Update total cost
+        self.current_cost += delta
+
+    def swap(self, cell_a: Cell, cell_b: Cell, delta: float):
+        """
+        Swap the locations (occupied sites) of two cells
+        """
+        # Swap the cells
+        temp_site = cell_a.site
+        cell_a.site = cell_b.site
+        cell_b.site = temp_site
+        cell_a.site.occupant = cell_a
+        cell_b.site.occupant = cell_b
+
+        # Update cached bounding boxes, nets shared by both cells keep the same pin locations
+        a_x = cell_a.site.x
+        a_y = cell_a.site.y
+        b_x = cell_b.site.x
+        b_y = cell_b.site.y
+        shared = self.mark_shared_nets(cell_a, cell_b)
+        for net in cell_a.nets:
+            if net.stamp != shared:
+                shift_bounding_box(net, b_x, b_y, a_x, a_y)
+        for net in cell_b.nets:
+            if net.stamp != shared:
+                shift_bounding_box(net, a_x, a_y, b_x, b_y)
+
+        # Update total cost
+        self.current_cost += delta
+
+    def get_move_delta(self, cell: Cell, x: int, y: int) -> float:
+        """
+        Calculate the cost difference that would be incurred by moving a cell to an unoccpied site
+        :return: float - The cost difference
+        """
+        target_site = self.placement_grid[y][x]
+        delta = 0
+        for net in cell.nets:
+            delta += moved_cell_hpwl(net, cell, target_site) - net.cost
+        return delta
+
+    def get_swap_delta(self, cell_a: Cell, cell_b: Cell) -> float:
+        """
+        Calculate the cost difference that would be incurred by swapping two cells
+        :return: float - The cost difference
+        """
+        # Nets shared by both cells keep the same set of pin locations after a swap, so their cost is unchanged
+        site_a = cell_a.site
+        site_b = cell_b.site
+        shared = self.mark_shared_nets(cell_a, cell_b)
+        delta = 0
+        for net_a in cell_a.nets:
+            if net_a.stamp != shared:
+                delta += moved_cell_hpwl(net_a, cell_a, site_b) - net_a.cost
+        for net_b in cell_b.nets:
+            if net_b.stamp != shared:
+                delta += moved_cell_hpwl(net_b, cell_b, site_a) - net_b.cost
+        return delta
+
+    def get_cell_degree(self, cell: Cell) -> int:
+        """
+        :return: int - Number of nets a cell is part of
+        """
+        return len(cell.nets)
+
+    def mark_shared_nets(self, cell_a: Cell, cell_b: Cell) -> int:
+        """
+        Stamp the nets of two cells so that nets belonging to both can be recognized in constant time.
+        Marker values only ever increase, so stamps left over from earlier calls never match.
+        :return: int - The stamp carried by every net shared by both cells
+        """
+        self.net_stamp += 2
+        in_a = self.net_stamp - 1
+        shared = self.net_stamp
+        for net in cell_a.nets:
+            net.stamp = in_a
+        for net in cell_b.nets:
+            if net.stamp == in_a:
+                net.stamp = shared
+        return shared
+
+    def pick_ranged_move(self):
+        """
+        Pick a random cell and a random spot to move that cell to within a range window.
+        The target is drawn directly from the sites of the window other than the cell's own, so no draw is wasted.
+        :return: (Cell, int, int) - cell,x,y
+        """
+        draw = self.rng.random
+        # Get random cell
+        cell = self.cell_dict[int(draw()*self.num_cells_to_place)]
+
+        # Get range window centred around the cell
         cell_x = cell.site.x
         cell_y = cell.site.y
-        range_x = [cell_x]
-        range_y = [cell_y]
-        for offset in range(1, 20):
-            range_x.append(cell_x+offset)
-            range_x.append(cell_x-offset)
-            range_y.append(cell_y+offset)
-            range_y.append(cell_y-offset)
-        best_delta = 0
-        best_x = cell_x
-        best_y = cell_y
-        best_target_site = cell.site
-        for search_x in range_x:
-            if 0 <= search_x < grid_width:
-                for search_y in range_y:
-                    if 0 <= search_y < grid_height:
-                        target_site = placement_grid[search_y][search_x]
-                        if target_site is not cell.site:
-                            if target_site.isOccupied:
-                                delta = get_swap_delta(cell, target_site.occupant)
-                            else:
-                                delta = get_move_delta(cell, search_x, search_y)
-                            if delta < best_delta:
-                                best_delta = delta
-                                best_x = search_x
-                                best_y = search_y
-                                best_target_site = target_site
-        # Move cell to site (or swap cell with site's cell)
-        if best_target_site is not cell.site:
-            if best_target_site.isOccupied:
-                swap(cell, best_target_site.occupant, best_delta)
-            else:
-                move(cell, best_x, best_y, best_delta)
-
+        min_x = cell_x - self.range_window_half_length
+        if min_x < 0:
+            min_x = 0
+        max_x = cell_x + self.range_window_half_length
+        if max_x >= self.grid_width:
+            max_x = self.grid_width - 1
+        min_y = cell_y - self.range_window_half_length
+        if min_y < 0:
+            min_y = 0
+        max_y = cell_y + self.range_window_half_length
+        if max_y >= self.grid_height:
+            max_y = self.grid_height - 1
+
+        # Get a random site of the window, skipping over the cell's current location
+        window_width = max_x - min_x + 1
+        site = int(draw()*(window_width*(max_y-min_y+1) - 1))
+        if site >= (cell_y-min_y)*window_width + cell_x-min_x:
+            site += 1
+        return cell, min_x + site % window_width, min_y + site // window_width
+
+    def pick_random_move(self):
+        """
+        Pick a random cell and a random spot to move that cell to, other than its current location
+        :return: (Cell,int,int) - cell,x,y
+        """
+        draw = self.rng.random
+        # Get random cell
+        cell = self.cell_dict[int(draw()*self.num_cells_to_place)]
+
+        # Get a random site of the grid, skipping over the cell's current location
+        site = int(draw()*(self.grid_width*self.grid_height - 1))
+        if site >= cell.site.y*self.grid_width + cell.site.x:
+            site += 1
+        return cell, site % self.grid_width, site // self.grid_width
+
+    def pick_random_cell_pair(self):
+        """
+        Pick a random pair of distinct cells
+        :return: Cell 2-tuple
+        """
+        draw = self.rng.random
+        cell_a_idx = int(draw()*self.num_cells_to_place)
+        cell_b_idx = int(draw()*(self.num_cells_to_place - 1))
+        if cell_b_idx >= cell_a_idx:
+            cell_b_idx += 1
+        return self.cell_dict[cell_a_idx], self.cell_dict[cell_b_idx]
+
+    def create_placement_grid(self, circuit: netlist.Netlist) -> list[list[Site]]:
+        """
+        Create the 2D placement grid
+        :param circuit: Parsed netlist
+        :return: list[list[Cell]] - Routing grid
+        """
+        # Create the routing grid
+        self.num_cells_to_place = circuit.num_cells
+        self.num_cell_connections = circuit.num_declared_nets
+        self.grid_height = circuit.grid_height
+        self.grid_width = circuit.grid_width
+        if self.grid_height >= self.grid_width:
+            self.half_grid_max_dim = ceil(self.grid_height/2)
+        else:
+            self.half_grid_max_dim = ceil(self.grid_width/2)
+        self.range_window_half_length = self.half_grid_max_dim
+        placement_grid = []
+        # Create grid in column-major order
+        for _ in range(self.grid_height):
+            placement_grid.append([])
+        # Populate grid with sites
+        for cell_y, row in enumerate(placement_grid):
+            for cell_x in range(self.grid_width):
+                row.append(Site(x=cell_x, y=cell_y))
+        self.placement_grid = placement_grid
+
+        # Keep a cell dictionary
+        for cell_id in range(self.num_cells_to_place):
+            self.cell_dict[cell_id] = Cell(cell_id)
+
+        # Create nets
+        self.num_nets = circuit.num_nets
+        net_start = circuit.net_start
+        net_pins = circuit.net_pins
+        for net_id in range(circuit.num_nets):
+            pins = net_pins[net_start[net_id]:net_start[net_id+1]]
+            new_net = Net(net_id, len(pins))
+            self.net_dict[net_id] = new_net
+
+            # Add cells to net, source first
+            source_cell = self.cell_dict[pins[0]]
+            new_net.source = source_cell
+            source_cell.nets.append(new_net)
+            for sink_id in pins[1:]:
+                sink_cell = self.cell_dict[sink_id]
+                new_net.sinks.append(sink_cell)
+                sink_cell.nets.append(new_net)
 
-def redraw_all_lines(routing_canvas: Canvas):
-    """
-    Redraw all of the lines in the GUI from scratch.
-    """
-    global unique_line_list
+        return placement_grid
 
-    for line in unique_line_list:
-        redraw_line(routing_canvas, line)
+    def calculate_total_cost(self):
+        """
+        Calculate, from scratch, the total estimated cost of the circuit as currently placed.
+        Estimation done with HPWL
+        :return: int - HPWL cost for all nets
+        """
+        total_cost = 0
+        for net in self.net_dict.values():
+            reset_bounding_box(net)
+            total_cost += net.cost
+        return total_cost
 
 
-def move(cell: Cell, x: int, y: int, delta: float):
+def get_netlist_path(f_name: str) -> str:
     """
-    Move a cell to an empty site
+    Get the path of a netlist file.
+    Names of benchmarks are looked up in the benchmark directory, anything naming an existing file is used as-is.
+    :param f_name: Benchmark name (e.g. "cm151a.txt") or path to a netlist file
+    :return: str - Path to the netlist file
     """
-    global current_cost
-    global sa_temp
+    if os.path.isfile(f_name):
+        return f_name
+    return os.path.join(os.path.dirname(__file__), FILE_DIR + f_name)
 
-    # Move the cell
-    old_site = cell.site
-    cell.site = placement_grid[y][x]
-    old_site.isOccupied = False
-    old_site.occupant = None
-    cell.site.isOccupied = True
-    cell.site.occupant = cell
 
-    # Update total cost
-    current_cost += delta
+def get_placer_class(engine: str):
+    """
+    Get the placer implementation backing an annealing engine
+    :param engine: "object" for the Site/Cell/Net model, "array" for the flat array model,
+                   "batch" for vectorized blocks of moves over the flat array model (requires NumPy)
+    :return: type - Placer class
+    """
+    if engine == "object":
+        return Placer
+    elif engine == "array":
+        from array_placer import ArrayPlacer  # Imported here as array_placer builds on this module
+        return ArrayPlacer
+    elif engine == "batch":
+        from batch_anneal import BatchPlacer  # Imported here as batch_anneal requires NumPy
+        return BatchPlacer
+    else:
+        raise ValueError("Unknown annealing engine: " + str(engine))
 
 
-def swap(cell_a: Cell, cell_b: Cell, delta: float):
+def get_temperature_for_acceptance(deltas: list, acceptance_rate: float, max_temp: float) -> float:
     """
-    Swap the locations (occupied sites) of two cells
+    Find the temperature at which the cost-increasing moves of a sample would be accepted at a given average rate,
+    by bisection
+    :param deltas: Cost differences of the moves
+    :param acceptance_rate: Target fraction of the cost-increasing moves accepted
+    :param max_temp: Highest temperature to consider, returned if no move increases the cost
+    :return: float - Temperature
     """
-    global current_cost
+    uphill = [delta for delta in deltas if delta > 0]
+
+    def get_acceptance_rate(temp):
+        return sum(exp(-1*delta/temp) for delta in uphill)/len(uphill)
+
+    if not uphill or get_acceptance_rate(max_temp) <= acceptance_rate:
+        return max_temp
+    low = 0.0
+    high = max_temp
+    for _ in range(50):
+        temp = (low+high)/2
+        if get_acceptance_rate(temp) < acceptance_rate:
+            low = temp
+        else:
+            high = temp
+    return high
 
-    # Swap the cells
-    temp_site = cell_a.site
-    cell_a.site = cell_b.site
-    cell_b.site = temp_site
-    cell_a.site.occupant = cell_a
-    cell_b.site.occupant = cell_b
 
-    # Update total cost
-    current_cost += delta
+def get_schedule(name: str):
+    """
+    Create an annealing schedule
+    :param name: "geometric" for a fixed cooling factor, "adaptive" for VPR-style acceptance-rate driven cooling
+    :return: Schedule - A new schedule instance, schedules may keep per-anneal state
+    """
+    from schedules import GeometricSchedule, AdaptiveSchedule  # Imported here as schedules builds on this module
+    if name == "geometric":
+        return GeometricSchedule()
+    elif name == "adaptive":
+        return AdaptiveSchedule()
+    else:
+        raise ValueError("Unknown annealing schedule: " + str(name))
 
 
-def get_move_delta(cell: Cell, x: int, y: int) -> float:
+def quick_anneal(f_name, cool_fact, init_temp_fact, move_p_t_fact, seed=0, engine="array", plot_mode=PLOT_SAVE,
+                 schedule="geometric", stats_file=None, log_format=run_log.LOG_CSV, log_dir=".", checkpoint_file=None,
+                 checkpoint_interval=checkpoint.CHECKPOINT_INTERVAL, initial_placer=INITIAL_RANDOM):
     """
-    Calculate the cost difference that would be incurred by moving a cell to an unoccpied site
-    :return: float - The cost difference
+    Perform an anneal without a GUI. Automatically exits after saving data.
+    For experimentation. Never imports Tkinter, and only imports matplotlib if a plot is requested.
+    :param seed: Random seed for this run
+    :param engine: Placement representation to anneal with, see get_placer_class
+    :param plot_mode: How to output the cost plot, see PLOT_* constants
+    :param schedule: Annealing schedule, see get_schedule
+    :param stats_file: JSON lines file to write per-temperature stats records to, None to anneal uninstrumented
+    :param log_format: Format of the per-temperature run log, see run_log.LOG_FORMATS
+    :param log_dir: Directory to write the run log to
+    :param checkpoint_file: File to checkpoint the anneal to, None for no checkpoints. If the file exists, the anneal
+                            is resumed from it rather than started over
+    :param checkpoint_interval: Minimum time between checkpoints in seconds
+    :param initial_placer: How cells are placed before annealing, see INITIAL_PLACERS
+    :return: (float, int, float) - final cost, total iterations, runtime in seconds (since resuming, if resumed)
     """
-    # Get the initial cost sum of all the nets the cell is in
-    starting_cost = 0
-    for net in cell.nets:
-        starting_cost += hpwl(net)
+    print("Running: " + f_name + "-" + str(cool_fact) + "-" + str(init_temp_fact) + "-" + str(move_p_t_fact))
 
-    # Perform a temporary move
-    temp_site = cell.site
-    cell.site = placement_grid[y][x]
-
-    # Calculate new cost
-    final_cost = 0
-    for net in cell.nets:
-        final_cost += hpwl(net)
+    if stats_file is None:
+        placer_class = get_placer_class(engine)
+    else:
+        import stats  # Imported here as stats builds on this module
+        placer_class = stats.get_stats_class(engine)
+    placer = placer_class(f_name, cool_fact, init_temp_fact, move_p_t_fact, seed, plot_mode=plot_mode,
+                          schedule=schedule, log_format=log_format, log_dir=log_dir, checkpoint_file=checkpoint_file,
+                          checkpoint_interval=checkpoint_interval, initial_placer=initial_placer)
+
+    if checkpoint_file is not None and os.path.isfile(checkpoint_file):
+        placer.set_state(checkpoint.read_checkpoint(checkpoint_file))
+        print("Resuming from " + checkpoint_file + " at iteration " + str(placer.total_iters))
+    else:
+        # Perform initial placement
+        placer.initial_placement()
 
-    # Reverse the temporary move
-    cell.site = temp_site
+    elapsed = placer.sa_to_completion()
+    placer.wait_for_output()  # The plot is written off the timed path, but must exist before returning
+    if stats_file is not None:
+        stats.write_stats(placer.stats_history, stats_file)
 
-    return final_cost - starting_cost
+    return placer.current_cost, placer.total_iters, elapsed
 
 
-def get_swap_delta(cell_a: Cell, cell_b: Cell) -> float:
+def save_cost_plot(iter_history: list, cost_history: list, outplot_name: str):
     """
-    Calculate the cost difference that would be incurred by swapping two cells
-    :return: float - The cost difference
+    Save a plot of cost against iterations to an image file.
+    Uses a standalone Agg figure rather than pyplot, so it is safe to call from a background thread with no display.
     """
-    # Get the initial cost sum of all nets the target cells are found in
-    starting_cost = 0
-    unique_net_list = []  # cell_a and cell_b could share nets, need to avoid double entries
-    for net_a in cell_a.nets:
-        unique_net_list.append(net_a)
-    for net_b in cell_b.nets:
-        if net_b not in unique_net_list:
-            unique_net_list.append(net_b)
-    for unique_net in unique_net_list:
-        starting_cost += hpwl(unique_net)
-
-    # Perform a temporary swap
-    temp_site = cell_b.site
-    cell_b.site = cell_a.site
-    cell_a.site = temp_site
-
-    # Calculate new cost
-    final_cost = 0
-    for unique_net in unique_net_list:
-        final_cost += hpwl(unique_net)
-
-    # Reverse the temporary swap
-    cell_a.site = cell_b.site
-    cell_b.site = temp_site
-
-    return final_cost - starting_cost
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.add_subplot()
+    ax.plot(iter_history, cost_history, '.', color="black")
+    ax.set_xlabel("Sim. Anneal. Iterations")
+    ax.set_ylabel("HPWL Cost")
+    fig.savefig(outplot_name)
 
 
 def hpwl(net: Net) -> float:
@@ -769,166 +1012,112 @@ def hpwl(net: Net) -> float:
     return float((rightmost_x-leftmost_x) + 2*(lowest_y-highest_y))
 
 
-def pick_ranged_move():
-    """
-    Pick a random cell and a random spot to move that cell to within a range window
-    :return: (Cell, int, int) - cell,x,y
-    """
-    global range_window_half_length
-
-    # Get random cell
-    cell_idx = random.randrange(num_cells_to_place)
-    cell = cell_dict[cell_idx]
-
-    # Get range window centred around the cell
-    cell_x = cell.site.x
-    cell_y = cell.site.y
-    min_x = cell_x - range_window_half_length
-    if min_x < 0:
-        min_x = 0
-    max_x = cell_x + range_window_half_length
-    if max_x >= grid_width:
-        max_x = grid_width - 1
-    min_y = cell_y - range_window_half_length
-    if min_y < 0:
-        min_y = 0
-    max_y = cell_y + range_window_half_length
-    if max_y >= grid_height:
-        max_y = grid_height - 1
-
-    # Get random coordinates from inside the range window
-    target_x = random.randrange(min_x, max_x+1)
-    target_y = random.randrange(min_y, max_y+1)
-
-    # Ensure target is not the cell's current location
-    if target_x == cell_x and target_y == cell_y:
-        return pick_ranged_move()
-    else:
-        return cell, target_x, target_y
-
-
-def pick_random_move():
-    """
-    Pick a random cell and a random spot to move that cell to
-    :return: (Cell,int,int) - cell,x,y
-    """
-    # Get random cell
-    cell_idx = random.randrange(num_cells_to_place)
-    cell = cell_dict[cell_idx]
-
-    # Get random location coordinates
-    target_y = random.randrange(grid_height)
-    target_x = random.randrange(grid_width)
-
-    # Ensure target is not the cell's current location
-    if target_x == cell.site.x and target_y == cell.site.y:
-        return pick_random_move()
-    else:
-        return cell, target_x, target_y
-
-
-def pick_random_cell_pair():
+def reset_bounding_box(net: Net):
     """
-    Pick a random pair of cells
-    :return: Cell 2-tuple
+    Recalculate a net's cached bounding box, edge pin counts and HPWL from scratch
+    :param net: Net to rescan
     """
-    cell_a_idx = random.randrange(num_cells_to_place)
-    cell_b_idx = random.randrange(num_cells_to_place)
-
-    if cell_a_idx != cell_b_idx:
-        cell_a = cell_dict[cell_a_idx]
-        cell_b = cell_dict[cell_b_idx]
-        return cell_a, cell_b
-    else:
-        return pick_random_cell_pair()
-
-
-def create_placement_grid(routing_file) -> list[list[Site]]:
+    pin_x = [net.source.site.x]
+    pin_y = [net.source.site.y]
+    for sink in net.sinks:
+        pin_x.append(sink.site.x)
+        pin_y.append(sink.site.y)
+    net.min_x = min(pin_x)
+    net.max_x = max(pin_x)
+    net.min_y = min(pin_y)
+    net.max_y = max(pin_y)
+    net.num_min_x = pin_x.count(net.min_x)
+    net.num_max_x = pin_x.count(net.max_x)
+    net.num_min_y = pin_y.count(net.min_y)
+    net.num_max_y = pin_y.count(net.max_y)
+    net.cost = float((net.max_x-net.min_x) + 2*(net.max_y-net.min_y))
+
+
+def shift_bounding_box(net: Net, old_x: int, old_y: int, new_x: int, new_y: int):
     """
-    Create the 2D placement grid
-    :param routing_file: Path to the file with circuit info
-    :return: list[list[Cell]] - Routing grid
+    Update a net's cached bounding box after one of its pins has moved.
+    Only rescans the net if the pin was alone on an edge and moved inward.
+    :param net: Net whose pin moved
     """
-    global num_cells_to_place
-    global num_cell_connections
-    global grid_width
-    global grid_height
-    global cell_dict
-    global net_dict
-    global placement_grid
-    global range_window_half_length
-    global half_grid_max_dim
-
-    grid_line = routing_file.readline()
-
-    # Create the routing grid
-    num_cells_to_place = int(grid_line.split(' ')[0])
-    num_cell_connections = int(grid_line.split(' ')[1])
-    grid_height = int(grid_line.split(' ')[2])
-    grid_width = int(grid_line.split(' ')[3])
-    if grid_height >= grid_width:
-        half_grid_max_dim = ceil(grid_height/2)
+    # Remove the pin from its old location
+    if old_x == net.min_x:
+        net.num_min_x -= 1
+    if old_x == net.max_x:
+        net.num_max_x -= 1
+    if old_y == net.min_y:
+        net.num_min_y -= 1
+    if old_y == net.max_y:
+        net.num_max_y -= 1
+
+    # Add the pin at its new location
+    if new_x < net.min_x:
+        net.min_x = new_x
+        net.num_min_x = 1
+    elif new_x == net.min_x:
+        net.num_min_x += 1
+    if new_x > net.max_x:
+        net.max_x = new_x
+        net.num_max_x = 1
+    elif new_x == net.max_x:
+        net.num_max_x += 1
+    if new_y < net.min_y:
+        net.min_y = new_y
+        net.num_min_y = 1
+    elif new_y == net.min_y:
+        net.num_min_y += 1
+    if new_y > net.max_y:
+        net.max_y = new_y
+        net.num_max_y = 1
+    elif new_y == net.max_y:
+        net.num_max_y += 1
+
+    # An edge with no pins left has moved inward by an unknown amount
+    if net.num_min_x == 0 or net.num_max_x == 0 or net.num_min_y == 0 or net.num_max_y == 0:
+        reset_bounding_box(net)
     else:
-        half_grid_max_dim = ceil(grid_width/2)
-    range_window_half_length = half_grid_max_dim
-    placement_grid = []
-    # Create grid in column-major order
-    for _ in range(grid_height):
-        placement_grid.append([])
-    # Populate grid with sites
-    for cell_y, row in enumerate(placement_grid):
-        for cell_x in range(grid_width):
-            row.append(Site(x=cell_x, y=cell_y))
-
-    # Keep a cell dictionary
-    for cell_id in range(num_cells_to_place):
-        cell_dict[cell_id] = Cell(cell_id)
-
-    # Create nets
-    new_net_id = -1
-    for line_num, line in enumerate(routing_file):
-        net_tokens = line.split(' ')
-        new_net_id += 1
-
-        if len(net_tokens) < 2:
-            # Invalid line
-            new_net_id += -1
-            continue
-
-        num_cells_in_net = int(net_tokens[0])
-
-        # Create new net
-        new_net = Net(line_num, num_cells_in_net)
-        net_dict[line_num] = new_net
-
-        # Add cells to net
-        source_id = int(net_tokens[1])  # Add source cell first
-        source_cell = cell_dict[source_id]
-        new_net.source = source_cell
-        source_cell.nets.append(new_net)
-        for sink_idx in range(2, num_cells_in_net+1):
-            if net_tokens[sink_idx] == '\n' or net_tokens[sink_idx] == '':
-                continue
-            else:
-                sink_id = int(net_tokens[sink_idx])
-                sink_cell = cell_dict[sink_id]
-                new_net.sinks.append(sink_cell)
-                sink_cell.nets.append(new_net)
-
-    return placement_grid
+        net.cost = float((net.max_x-net.min_x) + 2*(net.max_y-net.min_y))
 
 
-def calculate_total_cost():
+def moved_cell_hpwl(net: Net, cell: Cell, site: Site) -> float:
     """
-    Calculate, from scratch, the total estimated cost of the circuit as currently placed.
-    Estimation done with HPWL
-    :return: int - HPWL cost for all nets
+    Calculate the HPWL a net would have if one of its cells moved to another site, using its cached bounding box.
+    Only rescans the net if the cell is alone on an edge and would move inward.
+    :param net: Net containing the cell
+    :param cell: Cell to move
+    :param site: Site to move the cell to
+    :return: float - HPWL after the move
     """
-    total_cost = 0
-    for net in net_dict.values():
-        total_cost += hpwl(net)
-    return total_cost
+    old_x = cell.site.x
+    old_y = cell.site.y
+    new_x = site.x
+    new_y = site.y
+    min_x = net.min_x
+    max_x = net.max_x
+    min_y = net.min_y
+    max_y = net.max_y
+
+    if (old_x == min_x and net.num_min_x == 1 and new_x > min_x) or \
+            (old_x == max_x and net.num_max_x == 1 and new_x < max_x) or \
+            (old_y == min_y and net.num_min_y == 1 and new_y > min_y) or \
+            (old_y == max_y and net.num_max_y == 1 and new_y < max_y):
+        # Edge pin moving inward, rescan with the cell temporarily moved
+        temp_site = cell.site
+        cell.site = site
+        cost = hpwl(net)
+        cell.site = temp_site
+        return cost
+
+    if new_x < min_x:
+        min_x = new_x
+    elif new_x > max_x:
+        max_x = new_x
+    if new_y < min_y:
+        min_y = new_y
+    elif new_y > max_y:
+        max_y = new_y
+    return float((max_x-min_x) + 2*(max_y-min_y))
 
 
 if __name__ == "__main__":
-    anneal()
+    import gui  # Imported here as gui imports Tkinter
+    gui.anneal(DEFAULT_FILE_NAME)
@@ -0,0 +1,279 @@
+"""
+Instrumentation for the annealing loop.
+An instrumented placer counts proposed and accepted moves by type, nets touched and (array engine) full net rescans,
+and times move generation, delta evaluation and commits, closing one TemperatureStats record per temperature.
+Instrumentation lives in a mixin applied on request (see get_stats_class), so uninstrumented placers run exactly the
+same code as before and pay nothing for it.
+"""
+
+import argparse
+import json
+import time
+
+import sim_anneal
+
+# Fields of a stats record, in output order
+STATS_FIELDS = ["phase", "temperature", "range_window_half_length", "random_proposed", "random_accepted",
+                "ranged_proposed", "ranged_accepted", "swaps_proposed", "swaps_accepted", "moves_proposed",
+                "moves_accepted", "nets_touched", "num_rescans", "pick_time", "swap_delta_time", "move_delta_time",
+                "hpwl_time", "commit_time", "total_time"]
+STATS_ENGINES = ["object", "array"]  # Engines that can be instrumented, the batch engine moves in blocks
+# Engines whose full net rescans can be counted, the object engine rescans nets in a module-level function
+RESCAN_ENGINES = ["array"]
+RESCAN_FIELDS = ["num_rescans", "hpwl_time"]  # Fields left as None for engines that do not count rescans
+
+
+class TemperatureStats:
+    """
+    Counters and timers for the moves made at one temperature, or during the greedy final step.
+    Times are in seconds. Delta times include the HPWL calculations they perform.
+    """
+    def __init__(self, temperature: float, range_window_half_length: int, phase="anneal", records_rescans=True):
+        self.phase = phase  # "anneal" for a temperature of the anneal, "greedy" for the greedy final step
+        self.temperature = temperature  # Temperature the moves were made at
+        self.range_window_half_length = range_window_half_length  # Range window at the start of the temperature
+        self.random_proposed = 0  # Number of moves proposed anywhere on the grid
+        self.random_accepted = 0  # Number of those moves accepted
+        self.ranged_proposed = 0  # Number of moves proposed within the range window
+        self.ranged_accepted = 0  # Number of those moves accepted
+        self.swaps_proposed = 0  # Number of swap deltas evaluated
+        self.swaps_accepted = 0  # Number of swaps committed
+        self.moves_proposed = 0  # Number of move-to-empty-site deltas evaluated
+        self.moves_accepted = 0  # Number of moves to empty sites committed
+        self.nets_touched = 0  # Number of nets whose cost was evaluated, summed across deltas
+        self.num_rescans = 0  # Number of nets rescanned in full, None if not recorded (see RESCAN_ENGINES)
+        self.pick_time = 0.0  # Time spent picking moves
+        self.swap_delta_time = 0.0  # Time spent in get_swap_delta
+        self.move_delta_time = 0.0  # Time spent in get_move_delta
+        self.hpwl_time = 0.0  # Time spent rescanning nets in full, None if not recorded
+        self.commit_time = 0.0  # Time spent committing accepted moves
+        self.total_time = 0.0  # Wall-clock time of the temperature
+        if not records_rescans:
+            for field in RESCAN_FIELDS:
+                setattr(self, field, None)
+
+    def as_row(self) -> dict:
+        """
+        :return: dict - The record's fields, keyed by STATS_FIELDS
+        """
+        return {field: getattr(self, field) for field in STATS_FIELDS}
+
+
+class StatsMixin:
+    """
+    Turns a placer into an instrumented placer.
+    The placer's stats_history gains one TemperatureStats record per temperature explored, plus one for the greedy
+    final step. Each instrumented call costs two perf_counter reads.
+    """
+    stats = None  # Record for the temperature being explored
+    stats_history = None  # Closed records, in order
+    stats_start = 0.0  # perf_counter value when the current record was opened
+    stats_ranged = False  # Was the most recent move picked within the range window?
+    records_rescans = True  # Does the placer count full net rescans? Set by get_stats_class
+
+    def open_stats(self, phase="anneal"):
+        """
+        Start a new record for the current temperature
+        """
+        if self.stats_history is None:
+            self.stats_history = []
+        self.stats = TemperatureStats(self.sa_temp, self.range_window_half_length, phase, self.records_rescans)
+        self.stats_start = time.perf_counter()
+
+    def close_stats(self):
+        """
+        Finish the current record and add it to the history
+        """
+        self.stats.total_time = time.perf_counter() - self.stats_start
+        self.stats_history.append(self.stats)
+
+    def initial_placement(self, start=None):
+        """
+        Perform the initial placement, leaving the moves sampled for the initial temperature out of the stats
+        """
+        self.open_stats()
+        super().initial_placement(start)
+        self.open_stats()
+
+    def set_state(self, state: dict):
+        """
+        Restore an anneal, counting from the point it is resumed at
+        """
+        super().set_state(state)
+        self.open_stats()
+
+    def update_temperature(self):
+        """
+        Close the record of the temperature just explored, then update the temperature
+        """
+        self.close_stats()
+        self.open_stats("greedy")  # Collects the greedy final step, if this is the last temperature
+        super().update_temperature()
+        if self.placement_done:
+            self.close_stats()
+        else:
+            self.open_stats()
+
+    def pick_random_move(self):
+        """
+        Pick a move anywhere on the grid, counting and timing it
+        """
+        start = time.perf_counter()
+        move = super().pick_random_move()
+        self.stats.pick_time += time.perf_counter() - start
+        self.stats.random_proposed += 1
+        self.stats_ranged = False
+        return move
+
+    def pick_ranged_move(self):
+        """
+        Pick a move within the range window, counting and timing it
+        """
+        start = time.perf_counter()
+        move = super().pick_ranged_move()
+        self.stats.pick_time += time.perf_counter() - start
+        self.stats.ranged_proposed += 1
+        self.stats_ranged = True
+        return move
+
+    def get_swap_delta(self, cell_a, cell_b):
+        """
+        Calculate a swap's cost difference, counting and timing it
+        """
+        start = time.perf_counter()
+        delta = super().get_swap_delta(cell_a, cell_b)
+        self.stats.swap_delta_time += time.perf_counter() - start
+        self.stats.swaps_proposed += 1
+        self.stats.nets_touched += self.get_cell_degree(cell_a) + self.get_cell_degree(cell_b)
+        return delta
+
+    def get_move_delta(self, cell, x, y):
+        """
+        Calculate a move's cost difference, counting and timing it
+        """
+        start = time.perf_counter()
+        delta = super().get_move_delta(cell, x, y)
+        self.stats.move_delta_time += time.perf_counter() - start
+        self.stats.moves_proposed += 1
+        self.stats.nets_touched += self.get_cell_degree(cell)
+        return delta
+
+    def net_hpwl(self, net):
+        """
+        Rescan a net in full, counting and timing it
+        """
+        start = time.perf_counter()
+        cost = super().net_hpwl(net)
+        self.stats.hpwl_time += time.perf_counter() - start
+        self.stats.num_rescans += 1
+        return cost
+
+    def swap(self, cell_a, cell_b, delta):
+        """
+        Commit a swap, counting and timing it
+        """
+        start = time.perf_counter()
+        super().swap(cell_a, cell_b, delta)
+        self.stats.commit_time += time.perf_counter() - start
+        self.stats.swaps_accepted += 1
+        self.count_accepted()
+
+    def move(self, cell, x, y, delta):
+        """
+        Commit a move to an empty site, counting and timing it
+        """
+        start = time.perf_counter()
+        super().move(cell, x, y, delta)
+        self.stats.commit_time += time.perf_counter() - start
+        self.stats.moves_accepted += 1
+        self.count_accepted()
+
+    def count_accepted(self):
+        """
+        Count an accepted move as random or ranged, greedy moves are neither
+        """
+        if self.stats.phase == "anneal":
+            if self.stats_ranged:
+                self.stats.ranged_accepted += 1
+            else:
+                self.stats.random_accepted += 1
+
+
+def get_stats_class(engine: str) -> type:
+    """
+    Get an instrumented version of the placer implementation backing an annealing engine
+    :param engine: "object" or "array", see sim_anneal.get_placer_class
+    :return: type - Instrumented placer class
+    """
+    if engine not in STATS_ENGINES:
+        raise ValueError("Engine cannot be instrumented: " + str(engine))
+    placer_class = sim_anneal.get_placer_class(engine)
+    return type("Stats" + placer_class.__name__, (StatsMixin, placer_class),
+                {"records_rescans": engine in RESCAN_ENGINES})
+
+
+def write_stats(stats_history: list, out_file_name: str):
+    """
+    Write stats records to a JSON lines file, one record per line
+    :param stats_history: list[TemperatureStats]
+    """
+    with open(out_file_name, "w") as f:
+        for stats in stats_history:
+            f.write(json.dumps(stats.as_row()) + "\n")
+
+
+def summarize(stats_history: list) -> TemperatureStats:
+    """
+    Sum the counters and timers of a set of records
+    :param stats_history: list[TemperatureStats]
+    :return: TemperatureStats - Totals, with the temperature and range window of the last record
+    """
+    records_rescans = stats_history[-1].num_rescans is not None
+    total = TemperatureStats(stats_history[-1].temperature, stats_history[-1].range_window_half_length, "total",
+                             records_rescans)
+    for stats in stats_history:
+        for field in STATS_FIELDS[3:]:
+            if records_rescans or field not in RESCAN_FIELDS:
+                setattr(total, field, getattr(total, field) + getattr(stats, field))
+    return total
+
+
+def main():
+    """
+    Anneal a single netlist with instrumentation and report where the time went
+    """
+    parser = argparse.ArgumentParser(description="Anneal a netlist with per-temperature instrumentation.")
+    parser.add_argument("netlist", help="benchmark name or path to a netlist file")
+    parser.add_argument("-e", "--engine", choices=STATS_ENGINES, default="array", help="annealing engine")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    parser.add_argument("-o", "--output", default=None, help="JSON lines file to write per-temperature records to")
+    args = parser.parse_args()
+
+    placer = get_stats_class(args.engine)(args.netlist, seed=args.seed, plot_mode=sim_anneal.PLOT_NONE)
+    placer.initial_placement()
+    placer.sa_to_completion()
+    if args.output is not None:
+        write_stats(placer.stats_history, args.output)
+
+    total = summarize(placer.stats_history)
+    proposed = total.swaps_proposed + total.moves_proposed
+    print("Temperatures: " + str(len(placer.stats_history) - 1))
+    print("Proposed: " + str(total.random_proposed) + " random, " + str(total.ranged_proposed) + " ranged; " +
+          str(total.swaps_proposed) + " swaps, " + str(total.moves_proposed) + " moves")
+    print("Accepted: " + str(total.random_accepted) + " random, " + str(total.ranged_accepted) + " ranged; " +
+          str(total.swaps_accepted) + " swaps, " + str(total.moves_accepted) + " moves")
+    if total.num_rescans is None:
+        print("Nets touched per delta: " + str(round(total.nets_touched/max(proposed, 1), 2)))
+    else:
+        print("Nets touched per delta: " + str(round(total.nets_touched/max(proposed, 1), 2)) +
+              "; full rescans: " + str(total.num_rescans))
+    for field in ["pick_time", "swap_delta_time", "move_delta_time", "hpwl_time", "commit_time"]:
+        if getattr(total, field) is None:
+            continue  # Not recorded by this engine
+        print(field + ": " + str(round(getattr(total, field), 3)) + "s (" +
+              str(round(100*getattr(total, field)/total.total_time, 1)) + "%)")
+    print("total_time: " + str(round(total.total_time, 3)) + "s")
+
+
+if __name__ == "__main__":
+    main()
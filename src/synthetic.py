@@ -0,0 +1,190 @@
+"""
+Synthetic netlist generation for scaling tests.
+Generated netlists use the benchmark file format, so they can be annealed like any file in benchmarks/.
+Every cell drives one net. The number of sinks of each net follows a chosen fanout distribution, and the grid is
+sized to give the requested utilization. Generation is deterministic for a given seed.
+
+Locality follows Rent's rule: cells are laid out on a virtual square grid in ID order, and the sinks of each net
+are drawn from a window around its source whose area S has a Pareto tail P(S > s) ~ s^(p-1). A block of B cells
+is then crossed by about B * B^(p-1) = B^p nets, where p is the Rent exponent. Exponents close to 1 give global,
+random nets; smaller exponents give more local nets. Real circuits typically have exponents of 0.5 to 0.75.
+
+Example:
+    python synthetic.py ../benchmarks/synthetic-100k.txt -n 100000 --rent 0.6
+"""
+
+import argparse
+import bisect
+import os
+import random
+from math import ceil, sqrt
+
+DEFAULT_MEAN_FANOUT = 3  # Default mean number of sinks per net
+DEFAULT_UTILIZATION = 0.6  # Default fraction of sites occupied by a cell
+DEFAULT_RENT_EXPONENT = 0.6  # Default Rent exponent, None for nets without locality
+FANOUT_DISTRIBUTIONS = ["fixed", "geometric", "powerlaw"]  # Supported distributions of sinks per net
+DEFAULT_FANOUT_DISTRIBUTION = "powerlaw"  # Mostly single-sink nets and a long tail, as in the benchmarks
+MAX_FANOUT = 1000  # Largest number of sinks drawn from the power law distribution
+WRITE_CHUNK_SIZE = 10000  # Number of net lines written at once
+
+
+def get_fanout_sampler(distribution: str, mean_fanout: float, max_fanout: int, rng: random.Random):
+    """
+    Get a function drawing the number of sinks of a net
+    :param distribution: One of FANOUT_DISTRIBUTIONS. "fixed" always gives round(mean_fanout) sinks, "geometric"
+                         gives 1 plus a geometric number of extra sinks, "powerlaw" gives k sinks with probability
+                         proportional to k^-alpha, alpha chosen to match the mean
+    :param mean_fanout: Mean number of sinks per net, at least 1
+    :param max_fanout: Largest number of sinks a net may have
+    :return: function - Takes no arguments and returns a number of sinks
+    """
+    if mean_fanout < 1:
+        raise ValueError("Mean fanout must be at least 1, got " + str(mean_fanout))
+    if distribution == "fixed":
+        num_sinks = min(round(mean_fanout), max_fanout)
+        return lambda: num_sinks
+    elif distribution == "geometric":
+        extra_probability = (mean_fanout-1)/mean_fanout
+
+        def sample_geometric():
+            num_sinks = 1
+            while num_sinks < max_fanout and rng.random() < extra_probability:
+                num_sinks += 1
+            return num_sinks
+        return sample_geometric
+    elif distribution == "powerlaw":
+        cdf = get_power_law_cdf(mean_fanout, min(max_fanout, MAX_FANOUT))
+        return lambda: bisect.bisect(cdf, rng.random()) + 1
+    else:
+        raise ValueError("Unknown fanout distribution: " + str(distribution))
+
+
+def get_power_law_cdf(mean_fanout: float, max_fanout: int) -> list:
+    """
+    Find the truncated power law over 1..max_fanout sinks with the requested mean, by bisection on its exponent
+    :return: list[float] - Cumulative probability of 1, 2, ... max_fanout sinks
+    """
+    sinks = range(1, max_fanout+1)
+    low, high = 0.0, 10.0  # The mean falls as the exponent rises
+    for _ in range(60):
+        alpha = (low+high)/2
+        weights = [k**-alpha for k in sinks]
+        if sum(k*weight for k, weight in zip(sinks, weights))/sum(weights) > mean_fanout:
+            low = alpha
+        else:
+            high = alpha
+    total = sum(weights)
+    cdf = []
+    cumulative = 0.0
+    for weight in weights:
+        cumulative += weight
+        cdf.append(cumulative/total)
+    cdf[-1] = 1.0
+    return cdf
+
+
+def generate_nets(num_cells: int, mean_fanout=DEFAULT_MEAN_FANOUT, seed=0, rent_exponent=DEFAULT_RENT_EXPONENT,
+                  fanout_distribution=DEFAULT_FANOUT_DISTRIBUTION):
+    """
+    Generate random nets, one driven by each cell in order of cell ID
+    :param num_cells: Number of cells, at least 2
+    :param mean_fanout: Mean number of sinks per net, at least 1
+    :param seed: Random seed
+    :param rent_exponent: Rent exponent in (0, 1) controlling locality, None to draw sinks from the whole netlist
+    :param fanout_distribution: Distribution of sinks per net, see get_fanout_sampler
+    :return: Generator of list[int] - Cell IDs of each net, source first
+    """
+    if num_cells < 2:
+        raise ValueError("A netlist needs at least 2 cells, got " + str(num_cells))
+    if rent_exponent is not None and not 0 < rent_exponent < 1:
+        raise ValueError("Rent exponent must be between 0 and 1, got " + str(rent_exponent))
+    rng = random.Random(seed)
+    randrange = rng.randrange
+    sample_fanout = get_fanout_sampler(fanout_distribution, mean_fanout, num_cells-1, rng)
+    side = ceil(sqrt(num_cells))  # Side of the virtual grid holding the cells in ID order
+
+    for source in range(num_cells):
+        num_sinks = sample_fanout()
+        sinks = set()
+        if rent_exponent is None or num_sinks*4 >= num_cells:
+            while len(sinks) < num_sinks:
+                sink = randrange(num_cells)
+                if sink != source:
+                    sinks.add(sink)
+        else:
+            # Draw the area of the window from a Pareto distribution, at least large enough to hold the sinks
+            min_area = num_sinks + 1
+            area = min_area * (1-rng.random())**(-1/(1-rent_exponent))
+            half_width = max(ceil(sqrt(min(area, num_cells))/2), ceil(sqrt(min_area)))
+            source_x = source % side
+            source_y = source // side
+            while True:
+                min_x = max(source_x-half_width, 0)
+                max_x = min(source_x+half_width, side-1)
+                min_y = max(source_y-half_width, 0)
+                max_y = min(source_y+half_width, side-1)
+                attempts = 0
+                while len(sinks) < num_sinks and attempts < 20*num_sinks:
+                    sink = randrange(min_y, max_y+1)*side + randrange(min_x, max_x+1)
+                    if sink != source and sink < num_cells:
+                        sinks.add(sink)
+                    attempts += 1
+                if len(sinks) == num_sinks:
+                    break
+                half_width *= 2  # The clipped window holds too few cells, widen it
+        yield [source] + sorted(sinks)
+
+
+def write_netlist(path: str, num_cells: int, mean_fanout=DEFAULT_MEAN_FANOUT, utilization=DEFAULT_UTILIZATION,
+                  seed=0, rent_exponent=DEFAULT_RENT_EXPONENT, fanout_distribution=DEFAULT_FANOUT_DISTRIBUTION):
+    """
+    Generate a synthetic netlist and write it in the benchmark file format.
+    Nets are written as they are generated, so memory use does not grow with the size of the netlist.
+    :param path: Path of the file to write
+    :param num_cells: Number of cells, at least 2
+    :param mean_fanout: Mean number of sinks per net
+    :param utilization: Fraction of sites occupied by a cell, in (0, 1]
+    :param seed: Random seed
+    :param rent_exponent: Rent exponent controlling locality, see generate_nets
+    :param fanout_distribution: Distribution of sinks per net, see get_fanout_sampler
+    """
+    if not 0 < utilization <= 1:
+        raise ValueError("Utilization must be in (0, 1], got " + str(utilization))
+    grid_size = ceil(sqrt(num_cells/utilization))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(str(num_cells) + " " + str(num_cells) + " " + str(grid_size) + " " + str(grid_size) + "\n")
+        lines = []
+        for net in generate_nets(num_cells, mean_fanout, seed, rent_exponent, fanout_distribution):
+            lines.append(str(len(net)) + " " + " ".join(map(str, net)) + "\n")
+            if len(lines) >= WRITE_CHUNK_SIZE:
+                f.writelines(lines)
+                lines = []
+        f.writelines(lines)
+
+
+def main():
+    """
+    Write a synthetic netlist from the command line
+    """
+    parser = argparse.ArgumentParser(description="Generate a synthetic netlist in the benchmark file format.")
+    parser.add_argument("output", help="path of the netlist file to write")
+    parser.add_argument("-n", "--cells", type=int, required=True, help="number of cells")
+    parser.add_argument("--fanout", type=float, default=DEFAULT_MEAN_FANOUT, help="mean number of sinks per net")
+    parser.add_argument("--distribution", choices=FANOUT_DISTRIBUTIONS, default=DEFAULT_FANOUT_DISTRIBUTION,
+                        help="distribution of sinks per net")
+    parser.add_argument("-u", "--utilization", type=float, default=DEFAULT_UTILIZATION,
+                        help="fraction of sites occupied by a cell")
+    parser.add_argument("--rent", type=float, default=DEFAULT_RENT_EXPONENT,
+                        help="Rent exponent in (0, 1), smaller is more local")
+    parser.add_argument("--global-nets", action="store_true", help="draw sinks from the whole netlist, no locality")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+    write_netlist(args.output, args.cells, args.fanout, args.utilization, args.seed,
+                  None if args.global_nets else args.rent, args.distribution)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Parallel tempering (replica exchange) for Simulated Annealing.
+Several replicas of the same netlist anneal in worker processes, each at its own rung of a ladder of temperatures.
+After each temperature's worth of moves, neighbouring rungs may exchange replicas, then the whole ladder cools
+by the usual cooling factor. Hot replicas keep exploring while cold ones refine, and good placements found by a
+hot replica migrate down the ladder.
+"""
+
+import argparse
+import random
+import time
+from math import exp
+
+import sim_anneal
+import workers
+from sim_anneal import COOLING_FACTOR, INITIAL_TEMP_FACTOR, MOVES_PER_TEMP_FACTOR, COST_EXIT_RATIO, \
+    TEMP_EXIT_RATIO
+
+DEFAULT_NUM_REPLICAS = 4  # Default number of replicas, one worker process each
+LADDER_SPREAD = 0.1  # Ratio of the coldest rung's temperature to the hottest rung's temperature
+
+
+class ReplicaMixin:
+    """
+    Turns a placer into a tempering replica.
+    Finishing a temperature only updates the range window and counters, cooling and the exit decision are left
+    to the tempering controller.
+    """
+    round_done = False  # Has the replica performed a full temperature's worth of moves?
+
+    def update_temperature(self):
+        """
+        Finish exploring the current temperature without cooling down
+        """
+        self.update_range_window()
+        self.acceptance_history.append(self.acceptances_this_temp)
+        self.acceptances_this_temp = 0
+        self.total_iters += self.iters_this_temp
+        self.iters_this_temp = 0
+        self.prev_temp_cost = self.current_cost
+        self.prev_temp_cost_ratio = self.prev_temp_cost/self.reference_cost
+        self.round_done = True
+
+
+def get_replica_class(engine: str) -> type:
+    """
+    Get a replica version of the placer implementation backing an annealing engine
+    :param engine: See sim_anneal.get_placer_class
+    :return: type - Replica placer class
+    """
+    placer_class = sim_anneal.get_placer_class(engine)
+    return type("Replica" + placer_class.__name__, (ReplicaMixin, placer_class), {})
+
+
+class TemperingResult:
+    """
+    The outcome of a parallel tempering run
+    """
+    def __init__(self, final_cost: float, placement: list, total_iters: int, runtime: float, num_rounds: int,
+                 num_exchanges: int):
+        self.final_cost = final_cost  # HPWL cost of the best placement found
+        self.placement = placement  # x,y of each cell in the best placement, indexed by cell ID
+        self.total_iters = total_iters  # Annealing iterations performed, summed across replicas
+        self.runtime = runtime  # Wall-clock time of the run in seconds
+        self.num_rounds = num_rounds  # Number of temperatures explored by each replica
+        self.num_exchanges = num_exchanges  # Number of accepted exchanges between neighbouring rungs
+
+
+def _replica_worker(f_name, cooling_factor, initial_temp_factor, moves_per_temp_factor, seed, engine, conn):
+    """
+    Worker process body: hold a replica and perform rounds of moves at the temperatures it is sent
+    """
+    try:
+        placer = get_replica_class(engine)(f_name, cooling_factor, initial_temp_factor, moves_per_temp_factor,
+                                           seed, plot_mode=sim_anneal.PLOT_NONE)
+        placer.initial_placement()
+        conn.send(("ok", placer.current_cost, placer.sa_initial_temp))
+        while True:
+            command = conn.recv()
+            if command[0] == "round":
+                placer.sa_temp = command[1]
+                placer.round_done = False
+                while not placer.round_done:
+                    placer.sa_step()
+                conn.send(("ok", placer.current_cost))
+            elif command[0] == "finish":
+                placer.greedy_optimization()
+                conn.send(("ok", placer.current_cost, placer.total_iters, placer.get_placement()))
+                break
+            else:
+                break
+    except Exception as e:
+        conn.send(("error", repr(e)))
+    conn.close()
+
+
+def parallel_temper(f_name: str, num_replicas=DEFAULT_NUM_REPLICAS, cooling_factor=COOLING_FACTOR,
+                    initial_temp_factor=INITIAL_TEMP_FACTOR, moves_per_temp_factor=MOVES_PER_TEMP_FACTOR, seed=0,
+                    engine="array", time_budget=None) -> TemperingResult:
+    """
+    Anneal a netlist with a ladder of replicas, each in its own worker process.
+    Every replica starts from its own initial placement (seeds seed, seed+1, ...). The hottest rung follows the
+    usual schedule from the initial temperature, the other rungs are geometrically colder, down to LADDER_SPREAD
+    times the hottest. The run ends on the usual exit condition for the hottest rung, or when the time budget runs
+    out, after which every replica performs the greedy final step and the best placement is returned.
+    :param num_replicas: Number of replicas (and worker processes)
+    :param seed: Random seed of the first replica, also used for exchange decisions
+    :param engine: Placement representation for the replicas, see sim_anneal.get_placer_class
+    :param time_budget: Wall-clock time after which to stop annealing in seconds, None for no limit
+    :return: TemperingResult
+    """
+    start = time.time()
+    rng = random.Random(seed)
+    conns = []
+    processes = []
+    try:
+        for replica in range(num_replicas):
+            conn, process = workers.start_worker(_replica_worker, (f_name, cooling_factor, initial_temp_factor,
+                                                                   moves_per_temp_factor, seed+replica, engine),
+                                                 duplex=True)
+            conns.append(conn)
+            processes.append(process)
+        replies = [workers.receive_ok(conn, process, "replica worker") for conn, process in zip(conns, processes)]
+        initial_temp = replies[0][1]
+
+        # Rung temperatures, hottest first, and the replica currently at each rung
+        if num_replicas > 1:
+            rung_temps = [initial_temp * LADDER_SPREAD**(rung/(num_replicas-1)) for rung in range(num_replicas)]
+        else:
+            rung_temps = [initial_temp]
+        ladder = list(range(num_replicas))
+
+        num_rounds = 0
+        num_exchanges = 0
+        prev_best_cost = float("inf")
+        while True:
+            # Explore the current temperatures
+            for rung, replica in enumerate(ladder):
+                conns[replica].send(("round", rung_temps[rung]))
+            costs = [workers.receive_ok(conn, process, "replica worker")[0]
+                     for conn, process in zip(conns, processes)]
+            num_rounds += 1
+
+            # Offer exchanges between neighbouring rungs, alternating between even and odd pairs
+            for rung in range(num_rounds % 2, num_replicas-1, 2):
+                hot = ladder[rung]
+                cold = ladder[rung+1]
+                exponent = (1/rung_temps[rung] - 1/rung_temps[rung+1]) * (costs[hot] - costs[cold])
+                if exponent >= 0 or rng.random() < exp(exponent):
+                    ladder[rung] = cold
+                    ladder[rung+1] = hot
+                    num_exchanges += 1
+
+            # Reduce temperatures
+            rung_temps = [temp*cooling_factor for temp in rung_temps]
+
+            # Heartbeat
+            best_cost = min(costs)
+            print("Temperature: " + str(rung_temps[0]) + "; Best cost: " + str(best_cost) + "; Exchanges: " +
+                  str(num_exchanges))
+
+            if time_budget is not None and time.time() - start >= time_budget:
+                break
+            if (prev_best_cost-best_cost)/best_cost < COST_EXIT_RATIO and \
+                    rung_temps[0]/initial_temp < TEMP_EXIT_RATIO:
+                break
+            prev_best_cost = best_cost
+
+        # Greedy final step on every replica, keep the best
+        for conn in conns:
+            conn.send(("finish",))
+        results = [workers.receive_ok(conn, process, "replica worker") for conn, process in zip(conns, processes)]
+    finally:
+        workers.stop_workers(conns, processes)
+
+    final_cost, _, placement = min(results, key=lambda result: result[0])
+    total_iters = sum(result[1] for result in results)
+    runtime = time.time() - start
+    print("Final cost: " + str(final_cost))
+    print("Total iterations: " + str(total_iters))
+    print("Took " + str(runtime) + "s")
+    return TemperingResult(final_cost, placement, total_iters, runtime, num_rounds, num_exchanges)
+
+
+def main():
+    """
+    Run parallel tempering on a single netlist from the command line
+    """
+    parser = argparse.ArgumentParser(description="Anneal a netlist with parallel tempering.")
+    parser.add_argument("netlist", help="benchmark name or path to a netlist file")
+    parser.add_argument("-n", "--replicas", type=int, default=DEFAULT_NUM_REPLICAS, help="number of replicas")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="random seed")
+    parser.add_argument("-e", "--engine", default="array", help="annealing engine")
+    parser.add_argument("--time-budget", type=float, default=None, help="wall-clock limit in seconds")
+    args = parser.parse_args()
+    parallel_temper(args.netlist, args.replicas, seed=args.seed, engine=args.engine, time_budget=args.time_budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Worker processes for the parallel drivers (grid search, successive halving, tempering, regions and the benchmark
+suite). Every worker is a daemon process given the child end of a pipe as its last argument, and replies with tuples
+whose first element is "ok" or "error". A worker that exits without replying is reported as an error.
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.connection import wait
+
+
+def start_worker(target, args: tuple, duplex=False):
+    """
+    Start a daemon worker process
+    :param target: Worker function, called with args followed by the child end of a new pipe
+    :param duplex: Can the parent send to the worker too? Otherwise the worker only replies
+    :return: (Connection, Process) - Parent end of the pipe, worker process
+    """
+    parent_conn, child_conn = multiprocessing.Pipe(duplex=duplex)
+    process = multiprocessing.Process(target=target, args=tuple(args) + (child_conn,), daemon=True)
+    process.start()
+    child_conn.close()  # Only the child holds its end, so the parent sees EOF if the worker dies
+    return parent_conn, process
+
+
+def receive(conn, process) -> tuple:
+    """
+    Receive a reply from a worker
+    :param conn: Parent end of the worker's pipe
+    :param process: Worker process
+    :return: tuple - The reply, or ("error", description) if the worker exited without one
+    """
+    try:
+        return conn.recv()
+    except EOFError:
+        process.join()
+        return "error", "worker exited with code " + str(process.exitcode)
+
+
+def receive_ok(conn, process, worker_name="worker") -> tuple:
+    """
+    Receive a successful reply from a worker
+    :param worker_name: Name of the worker in errors
+    :return: tuple - The reply without its "ok"
+    :raises RuntimeError: if the worker failed or exited
+    """
+    reply = receive(conn, process)
+    if reply[0] != "ok":
+        raise RuntimeError(worker_name + " failed: " + reply[1])
+    return reply[1:]
+
+
+def silence():
+    """
+    Discard the console output of the calling worker process. A worker runs a single task, so this is never undone
+    """
+    sys.stdout = open(os.devnull, "w")
+
+
+def stop_workers(conns: list, processes: list, grace=1.0):
+    """
+    Wait for workers to exit, terminating any that are still running after a grace period, and close their pipes
+    :param grace: Time to wait for the workers to exit in seconds
+    """
+    deadline = time.time() + grace
+    for process in processes:
+        process.join(timeout=max(0.0, deadline - time.time()))
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    for conn in conns:
+        conn.close()
+
+
+def iter_pool(target, tasks: list, num_workers: int, timeout=None):
+    """
+    Run every task in its own worker process, at most num_workers at a time, yielding each reply as it arrives.
+    A fresh process per task means tasks cannot corrupt each other.
+    :param target: Worker function, called with a task's arguments followed by the child end of a pipe, on which it
+                   sends a single reply
+    :param tasks: list[(object, tuple)] - Key identifying each task, and the arguments to call target with
+    :param num_workers: Maximum number of concurrent worker processes
+    :param timeout: Maximum runtime of a task in seconds, after which its worker is terminated, None for no limit
+    :return: Generator of (object, tuple, float) - Key of each task, the reply of its worker (("timeout",) if it was
+             terminated), and the task's wall-clock time in seconds
+    """
+    pending = list(reversed(tasks))
+    active = {}  # Parent end of pipe -> (key, process, start time)
+    while pending or active:
+        # Fill any free worker slots
+        while pending and len(active) < num_workers:
+            key, args = pending.pop()
+            conn, process = start_worker(target, args)
+            active[conn] = (key, process, time.time())
+
+        # Wait for a reply, a dead worker, or the nearest timeout
+        wait_time = None
+        if timeout is not None:
+            now = time.time()
+            wait_time = max(0.0, min(start + timeout - now for _, _, start in active.values()))
+        wait(list(active.keys()), timeout=wait_time)
+
+        now = time.time()
+        for conn in list(active.keys()):
+            key, process, start = active[conn]
+            if conn.poll():
+                reply = receive(conn, process)
+            elif timeout is not None and now - start >= timeout:
+                process.terminate()
+                reply = ("timeout",)
+            else:
+                continue
+            process.join()
+            conn.close()
+            del active[conn]
+            yield key, reply, now - start
@@ -0,0 +1,31 @@
+import pytest
+
+import batch_anneal
+import sim_anneal
+
+
+@pytest.mark.parametrize("ranged", [False, True])
+def test_blocks_match_array_engine(ranged):
+    # apex4 is large enough for blocks of MIN_BATCH_SIZE moves or more
+    assert batch_anneal.check_equivalence("apex4.txt", num_blocks=10, ranged=ranged)
+
+
+def test_small_netlist_matches_array_engine():
+    # cm151a is too small for blocks, so it anneals with the scalar path of the array engine
+    results = {}
+    for engine in ["array", "batch"]:
+        results[engine] = sim_anneal.quick_anneal("cm151a.txt", 0.8, 10, 25, 0, engine, sim_anneal.PLOT_NONE,
+                                                  log_format="none")[:2]
+    assert results["batch"] == results["array"]
+
+
+def test_anneal_keeps_cost_exact():
+    placer = batch_anneal.BatchPlacer("apex4.txt", 0.8, 10, 0.5, 0, plot_mode=sim_anneal.PLOT_NONE,
+                                      log_format="none")
+    placer.initial_placement()
+    assert placer.batch_size >= batch_anneal.MIN_BATCH_SIZE
+    for _ in range(100):
+        placer.sa_step()
+    placer.copy_arrays_to_lists()
+    assert placer.current_cost == placer.calculate_total_cost()
+    assert len(set(placer.get_placement())) == placer.num_cells_to_place
@@ -0,0 +1,31 @@
+import pytest
+
+import checkpoint
+import sim_anneal
+
+
+def make_placer(engine: str, f_name: str):
+    return sim_anneal.get_placer_class(engine)(f_name, 0.8, 10, 1, 0, plot_mode=sim_anneal.PLOT_NONE,
+                                               log_format="none")
+
+
+@pytest.mark.parametrize("engine, f_name", [("object", "alu2.txt"), ("array", "alu2.txt"), ("batch", "apex1.txt")])
+def test_resume_matches_straight_run(tmp_path, engine, f_name):
+    straight = make_placer(engine, f_name)
+    straight.initial_placement()
+    straight.sa_to_completion()
+
+    # Stop partway through a temperature, a few temperatures in
+    interrupted = make_placer(engine, f_name)
+    interrupted.initial_placement()
+    while len(interrupted.cost_history) < 5 or interrupted.iters_this_temp < interrupted.iters_per_temp/2:
+        interrupted.sa_step()
+    path = str(tmp_path / "anneal.ckpt")
+    checkpoint.write_checkpoint(interrupted.get_state(), path)
+
+    resumed = make_placer(engine, f_name)
+    resumed.set_state(checkpoint.read_checkpoint(path))
+    resumed.sa_to_completion()
+    assert resumed.total_iters == straight.total_iters
+    assert resumed.current_cost == straight.current_cost
+    assert resumed.get_placement() == straight.get_placement()
@@ -0,0 +1,52 @@
+import pytest
+
+import sim_anneal
+
+
+def anneal(engine: str, f_name: str, seed: int, moves_per_temp_factor: float):
+    placer = sim_anneal.get_placer_class(engine)(f_name, 0.8, 10, moves_per_temp_factor, seed,
+                                                 plot_mode=sim_anneal.PLOT_NONE, log_format="none")
+    placer.initial_placement()
+    placer.sa_to_completion()
+    return placer
+
+
+@pytest.mark.parametrize("f_name, seed, moves_per_temp_factor", [("cm151a.txt", 0, 25), ("cm151a.txt", 1, 25),
+                                                                 ("alu2.txt", 0, 2)])
+def test_object_and_array_engines_agree(f_name, seed, moves_per_temp_factor):
+    object_placer = anneal("object", f_name, seed, moves_per_temp_factor)
+    array_placer = anneal("array", f_name, seed, moves_per_temp_factor)
+    assert array_placer.total_iters == object_placer.total_iters
+    assert array_placer.current_cost == object_placer.current_cost
+    assert array_placer.get_placement() == object_placer.get_placement()
+    assert array_placer.cost_history == object_placer.cost_history
+
+
+def test_seed_regression():
+    # Changes whenever the random streams or the anneal change, update it deliberately
+    assert sim_anneal.quick_anneal("cm151a.txt", 0.8, 10, 25, 0, "array", sim_anneal.PLOT_NONE,
+                                   log_format="none")[:2] == (46.0, 43176)
+
+
+def get_cached_bounds(placer) -> list:
+    if placer.engine == "object":
+        return [(net.cost, net.min_x, net.max_x, net.min_y, net.max_y, net.num_min_x, net.num_max_x, net.num_min_y,
+                 net.num_max_y) for net in placer.net_dict.values()]
+    return list(zip(placer.net_cost, placer.net_min_x, placer.net_max_x, placer.net_min_y, placer.net_max_y,
+                    placer.net_num_min_x, placer.net_num_max_x, placer.net_num_min_y, placer.net_num_max_y))
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_incremental_cost_matches_full_recompute(engine):
+    # cps has high-fanout nets, so edge pins often move inward and force rescans
+    placer = sim_anneal.get_placer_class(engine)("cps.txt", 0.8, 10, 1, 0, plot_mode=sim_anneal.PLOT_NONE,
+                                                 log_format="none")
+    placer.initial_placement()
+    for _ in range(20):
+        for _ in range(1000):
+            placer.sa_step()
+        cost = placer.current_cost
+        cached_bounds = get_cached_bounds(placer)
+        # calculate_total_cost rescans every net, resetting the cached bounding boxes
+        assert placer.calculate_total_cost() == cost
+        assert get_cached_bounds(placer) == cached_bounds
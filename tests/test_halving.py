@@ -0,0 +1,21 @@
+import csv
+
+import grid_search
+import halving
+import sim_anneal
+
+
+def test_resumed_runs_append_to_their_own_log(tmp_path):
+    runs = grid_search.build_grid(["cm151a.txt"], [0.8, 0.9], [10], [5, 10, 25], plot_mode=sim_anneal.PLOT_NONE,
+                                  log_dir=str(tmp_path))
+    finished = list(halving.iter_halving_search(runs, 1, quiet=True))
+    assert len(finished) == len(runs)
+    assert any(run.status == "stopped" for run in finished)
+
+    # One log per run, whose steps carry on across rungs without repeating the history
+    logs = sorted(tmp_path.glob("*.csv"))
+    assert len(logs) == len(runs)
+    for path in logs:
+        with open(path, newline="") as f:
+            steps = [int(row["step"]) for row in csv.DictReader(f)]
+        assert steps == list(range(len(steps)))
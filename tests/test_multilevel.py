@@ -0,0 +1,57 @@
+import multilevel
+import netlist
+import sim_anneal
+
+# Cells 0 and 1 only share a net with each other, so coarsening pairs them into a cluster on no net
+NETLIST = """10 6 4 4
+2 0 1
+2 2 3
+3 3 4 5
+2 5 6
+3 6 7 8
+2 8 9
+"""
+
+
+def write_netlist(tmp_path) -> str:
+    path = tmp_path / "netless.txt"
+    path.write_text(NETLIST)
+    return str(path)
+
+
+def test_coarse_level_has_netless_cell(tmp_path):
+    circuit = netlist.load_netlist(write_netlist(tmp_path))
+    levels, clusters = multilevel.build_levels(circuit, coarsest_num_cells=4)
+    assert len(levels) > 1
+    coarse = levels[1]
+    assert clusters[0][0] == clusters[0][1]
+    assert clusters[0][0] not in set(coarse.net_pins)
+
+
+def test_object_engine_places_netless_cells(tmp_path):
+    path = write_netlist(tmp_path)
+    results = {}
+    for engine in ["object", "array"]:
+        results[engine] = multilevel.multilevel_anneal(path, 0.8, 10, 1, 0, engine, sim_anneal.PLOT_NONE,
+                                                       log_format="none", coarsest_num_cells=4)[:2]
+    assert results["object"] == results["array"]
+
+
+def test_initial_placement_places_every_cell(tmp_path):
+    circuit = netlist.load_netlist(write_netlist(tmp_path))
+    levels, _ = multilevel.build_levels(circuit, coarsest_num_cells=4)
+    for engine in ["object", "array"]:
+        placer = sim_anneal.get_placer_class(engine)("netless", plot_mode=sim_anneal.PLOT_NONE, log_format="none",
+                                                     circuit=levels[1])
+        placer.initial_placement()
+        placement = placer.get_placement()
+        assert all(0 <= x < levels[1].grid_width and 0 <= y < levels[1].grid_height for x, y in placement)
+        assert len(set(placement)) == levels[1].num_cells
+
+
+def test_find_free_site_looks_past_the_first_free_ring():
+    # From (3, 1), the free diagonal neighbour (4, 0) costs 1 + 2*1 = 3, the free site (5, 1) two columns away costs 2
+    occupied = [True] * (7*3)
+    occupied[0*7 + 4] = False
+    occupied[1*7 + 5] = False
+    assert multilevel.find_free_site(occupied, 7, 3, 3, 1) == (5, 1)
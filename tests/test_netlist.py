@@ -0,0 +1,133 @@
+import os
+import warnings
+
+import pytest
+
+import netlist
+
+
+def parse_error(lines) -> netlist.NetlistError:
+    with pytest.raises(netlist.NetlistError) as error:
+        netlist.parse_netlist(lines, "bad.txt")
+    return error.value
+
+
+def test_valid_netlist():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        circuit = netlist.parse_netlist([b"3 2 2 2\n", b"2 0 1\n", b"\n", b"2 1 2\n"])
+    assert (circuit.num_cells, circuit.num_nets, circuit.grid_height, circuit.grid_width) == (3, 2, 2, 2)
+    assert list(circuit.net_start) == [0, 2, 4]
+    assert list(circuit.net_pins) == [0, 1, 1, 2]
+
+
+def test_header_not_integers():
+    error = parse_error([b"3 two 2 2\n", b"2 0 1\n"])
+    assert error.message == "header must be integers '<cells> <nets> <rows> <columns>'"
+    assert error.line_number == 1
+    assert str(error) == "bad.txt:1: header must be integers '<cells> <nets> <rows> <columns>'"
+
+
+def test_header_wrong_length():
+    error = parse_error([b"3 1 2\n", b"2 0 1\n"])
+    assert error.message == "header must be '<cells> <nets> <rows> <columns>', got 3 values"
+    assert error.line_number == 1
+
+
+def test_header_out_of_range():
+    error = parse_error([b"3 1 0 2\n", b"2 0 1\n"])
+    assert error.message == "header values out of range"
+    assert error.line_number == 1
+
+
+def test_header_not_enough_sites():
+    error = parse_error([b"5 1 2 2\n", b"2 0 1\n"])
+    assert error.message == "not enough sites (4) for 5 cells"
+    assert error.line_number == 1
+
+
+def test_non_integer_token():
+    error = parse_error([b"3 2 2 2\n", b"2 0 1\n", b"2 1 x\n"])
+    assert error.message == "net line contains a non-integer token"
+    assert error.line_number == 3
+
+
+def test_empty_net():
+    error = parse_error([b"3 1 2 2\n", b"0\n"])
+    assert error.message == "net must contain at least one cell, got 0"
+    assert error.line_number == 2
+
+
+def test_pin_count_mismatch():
+    error = parse_error([b"3 1 2 2\n", b"3 0 1\n"])
+    assert error.message == "net declares 3 cells but lists 2"
+    assert error.line_number == 2
+
+
+def test_out_of_range_cell():
+    # Blank lines still count towards line numbers
+    error = parse_error([b"3 2 2 2\n", b"2 0 1\n", b"\n", b"2 1 3\n"])
+    assert error.message == "cell ID 3 out of range for 3 cells"
+    assert error.line_number == 4
+    error = parse_error([b"3 1 2 2\n", b"2 -1 1\n"])
+    assert error.message == "cell ID -1 out of range for 3 cells"
+    assert error.line_number == 2
+
+
+def test_repeated_cell():
+    error = parse_error([b"3 1 2 2\n", b"3 0 2 2\n"])
+    assert error.message == "cell ID 2 appears more than once in the net"
+    assert error.line_number == 2
+
+
+def test_empty_lines():
+    error = parse_error([])
+    assert error.message == "header must be '<cells> <nets> <rows> <columns>', got 0 values"
+    assert error.line_number == 1
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    with pytest.raises(netlist.NetlistError) as error:
+        netlist.load_netlist(str(path))
+    assert error.value.message == "file is empty"
+    assert error.value.line_number is None
+    assert str(error.value) == str(path) + ": file is empty"
+
+
+def test_declared_net_count_warning():
+    with pytest.warns(UserWarning, match=r"^bad\.txt declares 3 nets but contains 2$"):
+        netlist.parse_netlist([b"3 3 2 2\n", b"2 0 1\n", b"2 1 2\n"], "bad.txt")
+
+
+def test_netless_cell_warning():
+    with pytest.warns(UserWarning, match=r"^bad\.txt has 2 cells on no net \(e\.g\. cell 1\), which are placed"):
+        circuit = netlist.parse_netlist([b"4 1 2 2\n", b"2 0 2\n"], "bad.txt")
+    assert circuit.num_cells == 4
+
+
+def test_cache_hit_repeats_warnings(tmp_path):
+    path = tmp_path / "netless.txt"
+    path.write_bytes(b"4 2 2 2\n2 0 2\n")
+    for _ in range(2):  # Parsed and cached, then loaded from the cache
+        with pytest.warns(UserWarning) as record:
+            circuit = netlist.load_cached_netlist(str(path))
+        messages = [str(warning.message) for warning in record]
+        assert messages == [str(path) + " declares 2 nets but contains 1",
+                            str(path) + " has 2 cells on no net (e.g. cell 1), which are placed but do not affect "
+                                        "the cost"]
+        assert circuit.warning_flags == netlist.WARN_NET_COUNT | netlist.WARN_NETLESS_CELLS
+    assert circuit.buffer is not None
+
+
+def test_cache_records_new_mtime_of_same_content(tmp_path):
+    path = tmp_path / "touched.txt"
+    path.write_bytes(b"3 2 2 2\n2 0 1\n2 1 2\n")
+    netlist.load_cached_netlist(str(path))
+    mtime_ns = os.stat(path).st_mtime_ns + 10**9
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    circuit = netlist.load_cached_netlist(str(path))
+    assert circuit.buffer is not None
+    with open(netlist.get_cache_path(str(path)), "rb") as f:
+        assert netlist.CACHE_HEADER.unpack(f.read(netlist.CACHE_HEADER.size))[2] == mtime_ns
@@ -0,0 +1,45 @@
+import pytest
+
+import refine
+import sim_anneal
+
+
+@pytest.mark.parametrize("engine", ["object", "array"])
+def test_refine_reaches_local_optimum(engine):
+    placer = sim_anneal.get_placer_class(engine)("alu2.txt", 0.8, 10, 1, 0, plot_mode=sim_anneal.PLOT_NONE,
+                                                 log_format="none")
+    placer.initial_placement()
+
+    # Record the cost after every move refinement takes
+    costs = [placer.current_cost]
+    move = placer.move
+    swap = placer.swap
+
+    def recording_move(cell, x, y, delta):
+        move(cell, x, y, delta)
+        costs.append(placer.current_cost)
+
+    def recording_swap(cell_a, cell_b, delta):
+        swap(cell_a, cell_b, delta)
+        costs.append(placer.current_cost)
+
+    placer.move = recording_move
+    placer.swap = recording_swap
+    num_moves = refine.refine(placer)
+    assert num_moves == len(costs) - 1 > 0
+    assert all(cost < prev_cost for prev_cost, cost in zip(costs, costs[1:]))
+    assert placer.current_cost == placer.calculate_total_cost()
+
+    # No single move or swap improves the cost, anywhere on the grid rather than just within the search boxes
+    for cell_id in range(placer.num_cells_to_place):
+        cell = placer.get_cell(cell_id)
+        x, y = placer.get_cell_location(cell)
+        for search_x in range(placer.grid_width):
+            for search_y in range(placer.grid_height):
+                if search_x == x and search_y == y:
+                    continue
+                occupant = placer.get_occupant(search_x, search_y)
+                if occupant is not None:
+                    assert placer.get_swap_delta(cell, occupant) >= 0
+                else:
+                    assert placer.get_move_delta(cell, search_x, search_y) >= 0
@@ -0,0 +1,20 @@
+import random
+
+import pytest
+
+import regions
+import sim_anneal
+
+
+@pytest.mark.parametrize("axis", [0, 1])
+def test_strip_lengths_differ_by_at_most_one(axis):
+    # alu2 is 25 columns by 15 rows, neither divides evenly into 4 strips
+    placer = sim_anneal.get_placer_class("array")("alu2.txt", plot_mode=sim_anneal.PLOT_NONE, log_format="none")
+    length = placer.grid_width if axis == 0 else placer.grid_height
+    rng = random.Random(0)
+    for _ in range(20):
+        strips = regions.get_strips(placer, rng, axis, 4)
+        assert strips[0][0] == 0 and strips[-1][1] == length
+        assert all(strips[strip][1] == strips[strip+1][0] for strip in range(3))
+        lengths = [high - low for low, high in strips]
+        assert max(lengths) - min(lengths) <= 1